@@ -8,6 +8,7 @@ from rest_framework import viewsets, permissions, status , serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
+from project_ecommerce.pagination import KeysetPagination
 
 
 class ClienteViewSet(viewsets.ModelViewSet):
@@ -17,6 +18,8 @@ class ClienteViewSet(viewsets.ModelViewSet):
     queryset = Cliente.objects.select_related('usuario').all()
     serializer_class = ClienteDetailSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    ordering = ('-fecha_creacion', 'id')
     
     def get_serializer_class(self):
         """Usar serializer detallado para list y retrieve"""
@@ -25,15 +28,11 @@ class ClienteViewSet(viewsets.ModelViewSet):
         return ClienteSerializer
     
     def list(self, request, *args, **kwargs):
-        """Listar todos los clientes con información de usuario"""
-        queryset = self.get_queryset().order_by('-fecha_creacion')
-        serializer = self.get_serializer(queryset, many=True)
+        """Listar clientes con información de usuario (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'clientes': serializer.data
-        })
+        return Response(self.paginator.get_envelope('clientes', serializer.data))
     
     def retrieve(self, request, *args, **kwargs):
         """Obtener un cliente específico con información de usuario"""
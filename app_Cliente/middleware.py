@@ -0,0 +1,66 @@
+"""
+Cliente del usuario autenticado, resuelto una sola vez por petición.
+
+ClienteMiddleware agrega `request.cliente_actual`; no se consulta nada
+hasta que una vista lo usa, y cada dato se memoriza para el resto de la
+petición (get_queryset, get_or_create del carrito, serializers...). Como
+DRF autentica dentro de la vista y copia el usuario al HttpRequest, el
+usuario que se usa es el del token.
+
+El id del cliente sale del caché de tokens cuando está disponible (ver
+app_user/authentication.py), de modo que filtrar por cliente o por su
+carrito no agrega consultas.
+"""
+from django.utils.functional import cached_property
+
+from app_carrito.models import Carrito
+from app_user.authentication import get_cliente_id
+from .models import Cliente
+
+
+class ClienteActual:
+    """Cliente y carrito del usuario de la petición (None si no hay sesión o no es cliente)"""
+
+    def __init__(self, request):
+        self._request = request
+
+    @property
+    def autenticado(self):
+        user = getattr(self._request, 'user', None)
+        return bool(user and user.is_authenticated)
+
+    @cached_property
+    def cliente(self):
+        if not self.autenticado:
+            return None
+        return Cliente.objects.select_related('usuario').filter(usuario_id=self._request.user.pk).first()
+
+    @cached_property
+    def cliente_id(self):
+        if 'cliente' in self.__dict__:
+            return self.cliente.pk if self.cliente else None
+        return get_cliente_id(self._request) if self.autenticado else None
+
+    @cached_property
+    def carrito_id(self):
+        if self.cliente_id is None:
+            return None
+        return Carrito.objects.filter(cliente_id=self.cliente_id).values_list('id', flat=True).first()
+
+    def obtener_carrito(self):
+        """Carrito del cliente (se crea si no tiene); None si el usuario no es cliente"""
+        if self.cliente_id is None:
+            return None
+        if '_carrito' not in self.__dict__:
+            self._carrito, self.carrito_creado = Carrito.objects.get_or_create(cliente_id=self.cliente_id)
+            self.__dict__['carrito_id'] = self._carrito.pk
+        return self._carrito
+
+
+class ClienteMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.cliente_actual = ClienteActual(request)
+        return self.get_response(request)
@@ -1,3 +1,76 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app_carrito.models import Carrito
+from .middleware import ClienteActual
+from .models import Cliente
+
+
+class ClienteActualTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cliente')
+        self.cliente = Cliente.objects.create(usuario=self.user, telefono='123', fecha_nacimiento=date(1990, 1, 1))
+
+    def actual(self, user=None, auth=None):
+        request = RequestFactory().get('/')
+        request.user = user or self.user
+        request.auth = auth
+        return ClienteActual(request)
+
+    def test_una_consulta_por_dato(self):
+        actual = self.actual()
+        with self.assertNumQueries(1):
+            self.assertEqual(actual.cliente, self.cliente)
+            self.assertEqual(actual.cliente.usuario, self.user)
+            self.assertEqual(actual.cliente_id, self.cliente.pk)
+
+        actual = self.actual()
+        with self.assertNumQueries(1):
+            self.assertEqual(actual.cliente_id, self.cliente.pk)
+            self.assertEqual(actual.cliente_id, self.cliente.pk)
+
+    def test_carrito(self):
+        actual = self.actual()
+        with self.assertNumQueries(2):
+            self.assertIsNone(actual.carrito_id)
+            self.assertIsNone(actual.carrito_id)
+
+        carrito = actual.obtener_carrito()
+        self.assertTrue(actual.carrito_creado)
+        with self.assertNumQueries(0):
+            self.assertEqual(actual.obtener_carrito(), carrito)
+            self.assertEqual(actual.carrito_id, carrito.pk)
+
+    def test_usa_el_cliente_del_token_en_cache(self):
+        token = Token.objects.create(user=self.user)
+        token.cliente_id = self.cliente.pk
+        with self.assertNumQueries(0):
+            self.assertEqual(self.actual(auth=token).cliente_id, self.cliente.pk)
+
+    def test_sin_sesion_o_sin_cliente(self):
+        with self.assertNumQueries(0):
+            actual = self.actual(user=AnonymousUser())
+            self.assertEqual((actual.cliente, actual.cliente_id, actual.obtener_carrito()), (None, None, None))
+
+        actual = self.actual(user=User.objects.create_user('empleado'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(actual.cliente_id)
+            self.assertIsNone(actual.obtener_carrito())
+
+    @override_settings(AUTH_TOKEN_CACHE_ACTIVA=False)
+    def test_una_consulta_de_cliente_por_peticion(self):
+        Carrito.objects.create(cliente=self.cliente)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        with CaptureQueriesContext(connection) as capturadas:
+            response = client.get('/api/carrito/carritos/')
+        self.assertEqual(response.status_code, 200)
+        tabla = Cliente._meta.db_table
+        self.assertEqual(len([q for q in capturadas if f'FROM "{tabla}"' in q['sql']]), 1)
@@ -0,0 +1,210 @@
+"""
+Generador de datos para los benchmarks.
+
+`sembrar` carga un catálogo de N productos × M variantes × K imágenes (una
+fila de Inventario por variante), clientes con token, dirección y carrito
+con items, y un historial de pedidos repartido en los últimos días. Todo se
+inserta con bulk_create por lotes, así que las señales no corren: al final
+se reconstruyen los datos derivados (resumen diario de pedidos, vectores de
+búsqueda y snapshot de stock) igual que tras una carga masiva.
+
+Los datos son deterministas para una misma `semilla`, de modo que dos
+ejecuciones con la misma escala miden exactamente lo mismo.
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from app_carrito.models import Carrito, ItemCarrito
+from app_Cliente.models import Cliente, Direccion_Envio, Metodo_Pago
+from app_pedidos import resumenes
+from app_pedidos.models import Pedido
+from app_productos import historial
+from app_productos.busqueda import actualizar_vectores
+from app_productos.models import (
+    Categoria, Imagen_Producto, Inventario, Producto, Producto_Variantes, item_pedido
+)
+
+PREFIJO_USUARIO = 'bench_'
+USUARIO_ADMIN = f'{PREFIJO_USUARIO}admin'
+COLORES = ['negro', 'blanco', 'rojo', 'azul', 'verde', 'gris', 'beige', 'rosa']
+TALLAS = ['XS', 'S', 'M', 'L', 'XL', 'XXL', '38', '40', '42', '44']
+ESTADOS_PEDIDO = ['pendiente', 'procesando', 'enviado', 'entregado', 'cancelado']
+LOTE = 2000
+
+
+@dataclass
+class Escala:
+    productos: int = 200
+    variantes: int = 4
+    imagenes: int = 2
+    categorias: int = 10
+    clientes: int = 20
+    items_carrito: int = 5
+    pedidos: int = 1000
+    items_pedido: int = 3
+    dias: int = 90
+    semilla: int = 1
+
+    def como_dict(self):
+        return asdict(self)
+
+
+def agregar_argumentos_escala(parser):
+    """Opciones --productos, --variantes, ... de los comandos que siembran datos"""
+    for campo, valor in Escala().como_dict().items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, default=valor, dest=campo,
+                            help=f'(por defecto {valor})')
+
+
+def escala_desde_opciones(options):
+    return Escala(**{campo: max(0, options[campo]) for campo in Escala().como_dict()})
+
+
+def hay_datos():
+    return User.objects.filter(username=USUARIO_ADMIN).exists()
+
+
+def _crear(modelo, objetos):
+    return modelo.objects.bulk_create(objetos, batch_size=LOTE)
+
+
+@transaction.atomic
+def sembrar(escala):
+    """Cargar los datos de `escala`; retorna las filas creadas por modelo"""
+    azar = random.Random(escala.semilla)
+    ahora = timezone.now()
+
+    # Categorías: una raíz por cada 5 y el resto como subcategorías (save() arma la ruta)
+    categorias = []
+    for i in range(max(1, escala.categorias)):
+        padre = categorias[(i // 5) * 5] if i % 5 else None
+        categoria = Categoria(nombre=f'Categoría {i}', descripcion='Categoría de benchmark', id_padre=padre)
+        categoria.save()
+        categorias.append(categoria)
+
+    productos = _crear(Producto, [
+        Producto(
+            nombre=f'Producto {i}',
+            Categoria=categorias[i % len(categorias)],
+            descripcion=f'Descripción del producto {i} para el benchmark del catálogo',
+        )
+        for i in range(escala.productos)
+    ])
+
+    # Stock holgado y dentro de los umbrales: el checkout no se queda sin stock ni abre alertas
+    total_variantes = escala.productos * escala.variantes
+    inventarios = _crear(Inventario, [
+        Inventario(stock=100000, stock_minimo=5, stock_maximo=1000000, ubicacion_almacen=f'A-{i % 50}')
+        for i in range(total_variantes)
+    ])
+    variantes = _crear(Producto_Variantes, [
+        Producto_Variantes(
+            producto=productos[i // escala.variantes],
+            color=COLORES[i % len(COLORES)],
+            talla=TALLAS[(i // len(COLORES)) % len(TALLAS)],
+            precio_unitario=Decimal(azar.randint(500, 50000)) / 100,
+            Inventario_id=inventarios[i],
+        )
+        for i in range(total_variantes)
+    ])
+    imagenes = _crear(Imagen_Producto, [
+        Imagen_Producto(
+            imagen=f'productos/bench/{variante.pk}_{k}.jpg',
+            texto=f'Imagen {k} de la variante {variante.pk}',
+            es_principal=k == 0,
+            Producto_categoria=variante,
+        )
+        for variante in variantes
+        for k in range(escala.imagenes)
+    ])
+
+    # Clientes: usuario sin contraseña utilizable, token, cliente, dirección y carrito
+    admin, *usuarios = _crear(User, [
+        User(username=USUARIO_ADMIN, is_staff=True, is_superuser=True, password='!')
+    ] + [
+        User(username=f'{PREFIJO_USUARIO}cliente_{i}', email=f'cliente_{i}@bench.local', password='!')
+        for i in range(escala.clientes)
+    ])
+    _crear(Token, [Token(key=Token.generate_key(), user=usuario) for usuario in [admin, *usuarios]])
+    clientes = _crear(Cliente, [
+        Cliente(telefono=f'7000{i:04d}', fecha_nacimiento=ahora.date() - timedelta(days=9000 + i), usuario=usuario)
+        for i, usuario in enumerate(usuarios)
+    ])
+    direcciones = _crear(Direccion_Envio, [
+        Direccion_Envio(calle=f'Calle {i}', ciudad='Ciudad', estado='Estado', codigo_postal='0000',
+                        Pais='País', Cliente=cliente)
+        for i, cliente in enumerate(clientes)
+    ])
+    metodos_pago = _crear(Metodo_Pago, [Metodo_Pago(tipo_pago='por_pagar'), Metodo_Pago(tipo_pago='qr')])
+    carritos = _crear(Carrito, [Carrito(cliente=cliente) for cliente in clientes])
+    items_carrito = _crear(ItemCarrito, [
+        ItemCarrito(carrito=carrito, producto_variante=azar.choice(variantes), cantidad=azar.randint(1, 3))
+        for carrito in carritos
+        for _ in range(escala.items_carrito)
+    ]) if variantes else []
+
+    # Pedidos: fecha_pedido es auto_now_add, así que se reparte en los últimos días con bulk_update
+    pedidos = _crear(Pedido, [
+        Pedido(
+            direccion_envio=azar.choice(direcciones) if direcciones else None,
+            metodo_pago=azar.choice(metodos_pago),
+            estado=azar.choice(ESTADOS_PEDIDO),
+            numero_pedido=f'BENCH-{i:08d}',
+            costo_envio=Decimal('0'),
+            tipo_pedido=azar.choice(['online', 'presencial']),
+        )
+        for i in range(escala.pedidos)
+    ])
+    items = []
+    hoy = ahora.date()
+    for pedido in pedidos:
+        subtotal = Decimal('0')
+        for _ in range(escala.items_pedido if variantes else 0):
+            variante = azar.choice(variantes)
+            cantidad = azar.randint(1, 4)
+            items.append(item_pedido(
+                Producto_variante=variante, pedido=pedido, cantidad=cantidad,
+                precio_unitario=variante.precio_unitario, subtotal=variante.precio_unitario * cantidad,
+            ))
+            subtotal += variante.precio_unitario * cantidad
+        pedido.subtotal = pedido.monto_total = subtotal
+        pedido.fecha_pedido = hoy - timedelta(days=azar.randrange(max(1, escala.dias)))
+    _crear(item_pedido, items)
+    Pedido.objects.bulk_update(pedidos, ['subtotal', 'monto_total', 'fecha_pedido'], batch_size=LOTE)
+
+    # Derivados que normalmente mantienen las señales
+    resumenes.reconstruir()
+    actualizar_vectores()
+    historial.tomar_snapshot()
+
+    return {
+        'categorias': len(categorias),
+        'productos': len(productos),
+        'variantes': len(variantes),
+        'imagenes': len(imagenes),
+        'clientes': len(clientes),
+        'items_carrito': len(items_carrito),
+        'pedidos': len(pedidos),
+        'items_pedido': len(items),
+    }
+
+
+def contar():
+    """Filas actuales de cada modelo sembrado (para reportar la escala de una base reutilizada)"""
+    return {
+        'categorias': Categoria.objects.count(),
+        'productos': Producto.objects.count(),
+        'variantes': Producto_Variantes.objects.count(),
+        'imagenes': Imagen_Producto.objects.count(),
+        'clientes': Cliente.objects.count(),
+        'items_carrito': ItemCarrito.objects.count(),
+        'pedidos': Pedido.objects.count(),
+        'items_pedido': item_pedido.objects.count(),
+    }
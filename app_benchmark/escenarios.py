@@ -0,0 +1,246 @@
+"""
+Escenarios de benchmark sobre los endpoints más usados.
+
+Cada escenario hace la misma petición HTTP que un cliente real (APIClient
+con token, pasando por todos los middlewares) `repeticiones` veces después
+de `calentamiento` peticiones descartadas, y reporta:
+    - latencia p50/p95/promedio/mín/máx en milisegundos
+    - consultas SQL por petición (mediana y máximo)
+    - pico de memoria de Python durante una petición (tracemalloc, medido
+      en una petición aparte porque el rastreo la hace más lenta)
+    - tamaño de la respuesta en bytes
+
+`preparar` corre antes de cada petición y no se mide (ej. invalidar el
+caché del catálogo o volver a llenar el carrito para el checkout).
+
+El resultado es un dict serializable a JSON; `comparar` contrasta dos
+corridas y marca como regresión un p95 que crece más de `umbral` % o más
+consultas por petición.
+"""
+import contextlib
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.db import connections
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app_carrito.models import Carrito, ItemCarrito
+from app_Cliente.models import Direccion_Envio, Metodo_Pago
+from app_productos import cache
+from app_productos.models import Producto_Variantes
+from .datos import PREFIJO_USUARIO, USUARIO_ADMIN
+
+ITEMS_CHECKOUT = 3
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    metodo: str
+    ruta: str
+    # 'cliente' (el primer cliente sembrado), 'comprador' (el último) o 'admin'
+    usuario: str = 'cliente'
+    datos: Optional[Callable] = None
+    preparar: Optional[Callable] = None
+    descripcion: str = ''
+
+
+class Contexto:
+    """Usuarios y datos sembrados que necesitan los escenarios"""
+
+    def __init__(self):
+        tokens = dict(
+            Token.objects.filter(user__username__startswith=PREFIJO_USUARIO)
+            .values_list('user__username', 'key')
+        )
+        clientes = sorted(
+            (nombre for nombre in tokens if nombre != USUARIO_ADMIN),
+            key=lambda nombre: int(nombre.rsplit('_', 1)[1])
+        )
+        if USUARIO_ADMIN not in tokens or not clientes:
+            raise ValueError('No hay datos de benchmark sembrados')
+        self.tokens = {'admin': tokens[USUARIO_ADMIN], 'cliente': tokens[clientes[0]], 'comprador': tokens[clientes[-1]]}
+        self.carrito_comprador = Carrito.objects.get(cliente__usuario__username=clientes[-1])
+        self.direccion_comprador = Direccion_Envio.objects.filter(Cliente_id=self.carrito_comprador.cliente_id).first()
+        self.metodo_pago = Metodo_Pago.objects.order_by('pk').first()
+        self.variantes = list(Producto_Variantes.objects.order_by('pk').values_list('pk', flat=True)[:ITEMS_CHECKOUT])
+        self._clientes_http = {}
+
+    def cliente_http(self, usuario):
+        if usuario not in self._clientes_http:
+            cliente = APIClient()
+            if usuario:
+                cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[usuario]}')
+            self._clientes_http[usuario] = cliente
+        return self._clientes_http[usuario]
+
+
+def _invalidar_catalogo(contexto):
+    cache.invalidar()
+
+
+def _llenar_carrito(contexto):
+    ItemCarrito.objects.bulk_create([
+        ItemCarrito(carrito=contexto.carrito_comprador, producto_variante_id=variante_id, cantidad=1)
+        for variante_id in contexto.variantes
+    ])
+
+
+def _datos_checkout(contexto):
+    return {
+        'direccion_envio': contexto.direccion_comprador.pk if contexto.direccion_comprador else None,
+        'metodo_pago': contexto.metodo_pago.pk if contexto.metodo_pago else None,
+    }
+
+
+ESCENARIOS = [
+    Escenario('productos_lista', 'get', '/api/productos/productos/', preparar=_invalidar_catalogo,
+              descripcion='ProductoViewSet.list sin caché'),
+    Escenario('productos_lista_cache', 'get', '/api/productos/productos/',
+              descripcion='ProductoViewSet.list con el caché del catálogo caliente'),
+    Escenario('variantes_lista', 'get', '/api/productos/variantes/',
+              descripcion='ProductoCategoriaViewSet.list'),
+    Escenario('carrito_mi_carrito', 'get', '/api/carrito/carritos/mi_carrito/',
+              descripcion='CarritoViewSet.mi_carrito'),
+    Escenario('pedidos_lista', 'get', '/api/pedidos/pedidos/', usuario='admin',
+              descripcion='PedidoViewSet.list'),
+    Escenario('pedidos_estadisticas', 'get', '/api/pedidos/pedidos/estadisticas/', usuario='admin',
+              descripcion='PedidoViewSet.estadisticas'),
+    Escenario('checkout', 'post', '/api/carrito/carritos/checkout/', usuario='comprador',
+              datos=_datos_checkout, preparar=_llenar_carrito,
+              descripcion=f'CarritoViewSet.checkout de {ITEMS_CHECKOUT} items'),
+]
+NOMBRES = [escenario.nombre for escenario in ESCENARIOS]
+
+
+# ----------------------------------------------------------------------
+# Medición
+# ----------------------------------------------------------------------
+class _Contador:
+    __slots__ = ('consultas',)
+
+    def __init__(self):
+        self.consultas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+
+def percentil(valores, q):
+    """Percentil q (0-1) con interpolación lineal entre los valores ordenados"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * q
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def _peticion(escenario, contexto):
+    if escenario.preparar:
+        escenario.preparar(contexto)
+    metodo = getattr(contexto.cliente_http(escenario.usuario), escenario.metodo)
+    argumentos = {'data': escenario.datos(contexto), 'format': 'json'} if escenario.datos else {}
+    contador = _Contador()
+    with contextlib.ExitStack() as stack:
+        for conexion in connections.all():
+            stack.enter_context(conexion.execute_wrapper(contador))
+        inicio = time.perf_counter()
+        response = metodo(escenario.ruta, **argumentos)
+        duracion = time.perf_counter() - inicio
+    return response, duracion, contador.consultas
+
+
+def _memoria_pico(escenario, contexto):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        _peticion(escenario, contexto)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir(escenario, contexto, repeticiones=30, calentamiento=3):
+    for _ in range(calentamiento):
+        _peticion(escenario, contexto)
+
+    tiempos, consultas, errores = [], [], 0
+    status = tamano = None
+    for _ in range(repeticiones):
+        response, duracion, cantidad = _peticion(escenario, contexto)
+        tiempos.append(duracion * 1000)
+        consultas.append(cantidad)
+        status, tamano = response.status_code, len(response.content)
+        if status >= 400:
+            errores += 1
+
+    return {
+        'descripcion': escenario.descripcion,
+        'metodo': escenario.metodo.upper(),
+        'ruta': escenario.ruta,
+        'status': status,
+        'errores': errores,
+        'repeticiones': repeticiones,
+        'p50_ms': round(percentil(tiempos, 0.5), 2),
+        'p95_ms': round(percentil(tiempos, 0.95), 2),
+        'promedio_ms': round(statistics.fmean(tiempos), 2),
+        'min_ms': round(min(tiempos), 2),
+        'max_ms': round(max(tiempos), 2),
+        'consultas': statistics.median_low(consultas),
+        'consultas_max': max(consultas),
+        'memoria_pico_kb': round(_memoria_pico(escenario, contexto) / 1024, 1),
+        'bytes': tamano,
+    }
+
+
+def ejecutar(nombres=None, repeticiones=30, calentamiento=3, al_terminar=None):
+    """Medir los escenarios `nombres` (todos si es None); retorna {nombre: resultado}"""
+    contexto = Contexto()
+    # El caché puede tener respuestas de otra base: se parte de uno vacío
+    cache.invalidar()
+    resultados = {}
+    for escenario in ESCENARIOS:
+        if nombres and escenario.nombre not in nombres:
+            continue
+        resultados[escenario.nombre] = medir(escenario, contexto, repeticiones, calentamiento)
+        if al_terminar:
+            al_terminar(escenario.nombre, resultados[escenario.nombre])
+    return resultados
+
+
+# ----------------------------------------------------------------------
+# Comparación
+# ----------------------------------------------------------------------
+def _variacion(actual, anterior):
+    if actual is None or not anterior:
+        return None
+    return round((actual - anterior) / anterior * 100, 1)
+
+
+def comparar(actual, anterior, umbral=10):
+    """Filas {escenario, variaciones %, regresion} de los escenarios presentes en ambas corridas"""
+    filas = []
+    for nombre, resultado in actual['escenarios'].items():
+        previo = anterior.get('escenarios', {}).get(nombre)
+        if not previo:
+            continue
+        fila = {
+            'escenario': nombre,
+            'p50_pct': _variacion(resultado['p50_ms'], previo['p50_ms']),
+            'p95_pct': _variacion(resultado['p95_ms'], previo['p95_ms']),
+            'consultas_antes': previo['consultas'],
+            'consultas': resultado['consultas'],
+            'memoria_pct': _variacion(resultado['memoria_pico_kb'], previo['memoria_pico_kb']),
+        }
+        fila['regresion'] = (
+            (fila['p95_pct'] or 0) > umbral or resultado['consultas'] > previo['consultas']
+        )
+        filas.append(fila)
+    return filas
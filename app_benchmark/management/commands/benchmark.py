@@ -0,0 +1,147 @@
+"""
+Mide latencia (p50/p95), consultas por petición y pico de memoria de los
+endpoints de catálogo, carrito, pedidos y checkout (ver app_benchmark/escenarios.py).
+
+Por defecto crea una base de pruebas (test_<NAME>, como `manage.py test`),
+la siembra a la escala indicada, corre los escenarios y la elimina; con
+--keepdb la conserva y las corridas siguientes reutilizan los datos. Con
+--bd-actual mide sobre la base configurada, que debe haberse sembrado antes
+con `sembrar_benchmark`. Se usan los cachés configurados: apuntar el
+comando a un Redis compartido invalida su caché de catálogo.
+
+Uso:
+    python manage.py benchmark
+    python manage.py benchmark --productos 2000 --variantes 6 --pedidos 20000 --salida antes.json
+    python manage.py benchmark --escenarios productos_lista checkout --repeticiones 50
+    python manage.py benchmark --keepdb --salida despues.json --comparar antes.json --umbral 15 --estricto
+"""
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+from app_benchmark import datos, escenarios
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _porcentaje(valor):
+    return '-' if valor is None else f'{valor:+.1f}%'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de los endpoints principales con datos sembrados (salida JSON comparable)'
+
+    def add_arguments(self, parser):
+        datos.agregar_argumentos_escala(parser)
+        parser.add_argument('--escenarios', nargs='+', choices=escenarios.NOMBRES,
+                            help='Escenarios a medir (por defecto todos)')
+        parser.add_argument('--repeticiones', type=int, default=30, help='Peticiones medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=3, help='Peticiones descartadas al inicio')
+        parser.add_argument('--salida', metavar='RUTA', help='Guardar el resultado en un archivo JSON')
+        parser.add_argument('--comparar', metavar='RUTA', help='JSON de una corrida anterior para comparar')
+        parser.add_argument('--umbral', type=float, default=10,
+                            help='Aumento del p95 (%%) a partir del cual se marca una regresión')
+        parser.add_argument('--estricto', action='store_true',
+                            help='Terminar con error si hay regresiones')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Conservar la base de pruebas (y sus datos) entre corridas')
+        parser.add_argument('--bd-actual', action='store_true',
+                            help='Medir sobre la base configurada en lugar de una de pruebas')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='No preguntar antes de borrar una base de pruebas existente')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        configuracion = None
+        if not options['bd_actual']:
+            configuracion = setup_databases(verbosity=0, interactive=options['interactive'], keepdb=options['keepdb'])
+        try:
+            resultado = self.ejecutar(options)
+        finally:
+            if configuracion is not None:
+                teardown_databases(configuracion, verbosity=0, keepdb=options['keepdb'])
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Resultado guardado en {options["salida"]}')
+
+        if anterior is not None:
+            self.mostrar_comparacion(resultado, anterior, options)
+
+    def ejecutar(self, options):
+        if datos.hay_datos():
+            self.stdout.write('Usando los datos de benchmark existentes')
+        elif options['bd_actual']:
+            raise CommandError('La base no tiene datos de benchmark: ejecute antes `sembrar_benchmark`')
+        else:
+            self.stdout.write('Sembrando datos...')
+            datos.sembrar(datos.escala_desde_opciones(options))
+        filas = datos.contar()
+        self.stdout.write('Escala: ' + ', '.join(f'{modelo}: {total}' for modelo, total in filas.items()))
+
+        self.stdout.write(f'{"escenario":<24}{"p50 ms":>10}{"p95 ms":>10}{"consultas":>11}{"memoria KB":>12}{"status":>8}')
+        # Igual que en producción: sin el registro de consultas de DEBUG
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            resultados = escenarios.ejecutar(
+                options['escenarios'], max(1, options['repeticiones']), max(0, options['calentamiento']),
+                al_terminar=self.mostrar_escenario
+            )
+
+        return {
+            'fecha': timezone.now().isoformat(),
+            'commit': _commit(),
+            'entorno': {
+                'motor': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'plataforma': platform.platform(),
+            },
+            'escala': filas,
+            'repeticiones': max(1, options['repeticiones']),
+            'calentamiento': max(0, options['calentamiento']),
+            'escenarios': resultados,
+        }
+
+    def mostrar_escenario(self, nombre, resultado):
+        linea = (f'{nombre:<24}{resultado["p50_ms"]:>10}{resultado["p95_ms"]:>10}'
+                 f'{resultado["consultas"]:>11}{resultado["memoria_pico_kb"]:>12}{resultado["status"]:>8}')
+        if resultado['errores']:
+            self.stdout.write(self.style.WARNING(f'{linea}  ({resultado["errores"]} respuestas con error)'))
+        else:
+            self.stdout.write(linea)
+
+    def mostrar_comparacion(self, resultado, anterior, options):
+        filas = escenarios.comparar(resultado, anterior, umbral=options['umbral'])
+        self.stdout.write(f'\nComparación con {options["comparar"]} (commit {anterior.get("commit") or "?"})')
+        self.stdout.write(f'{"escenario":<24}{"p50":>9}{"p95":>9}{"consultas":>14}{"memoria":>10}')
+        for fila in filas:
+            linea = (f'{fila["escenario"]:<24}{_porcentaje(fila["p50_pct"]):>9}{_porcentaje(fila["p95_pct"]):>9}'
+                     f'{str(fila["consultas_antes"]) + " -> " + str(fila["consultas"]):>14}'
+                     f'{_porcentaje(fila["memoria_pct"]):>10}')
+            self.stdout.write(self.style.ERROR(f'{linea}  REGRESIÓN') if fila['regresion'] else linea)
+
+        regresiones = [fila['escenario'] for fila in filas if fila['regresion']]
+        if regresiones and options['estricto']:
+            raise CommandError(f'Regresiones en: {", ".join(regresiones)}')
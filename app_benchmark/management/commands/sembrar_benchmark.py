@@ -0,0 +1,26 @@
+"""
+Siembra en la base de datos configurada el dataset de los benchmarks
+(productos × variantes × imágenes, clientes con carrito y pedidos).
+Útil para explorar los endpoints a mano con un volumen realista; el
+comando `benchmark` siembra su propia base de pruebas y no necesita esto.
+
+Uso:
+    python manage.py sembrar_benchmark
+    python manage.py sembrar_benchmark --productos 5000 --variantes 6 --imagenes 3 --pedidos 50000
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app_benchmark.datos import agregar_argumentos_escala, escala_desde_opciones, hay_datos, sembrar
+
+
+class Command(BaseCommand):
+    help = 'Siembra productos, variantes, imágenes, carritos y pedidos de benchmark a la escala indicada'
+
+    def add_arguments(self, parser):
+        agregar_argumentos_escala(parser)
+
+    def handle(self, *args, **options):
+        if hay_datos():
+            raise CommandError('La base ya tiene datos de benchmark (usuarios bench_*)')
+        filas = sembrar(escala_desde_opciones(options))
+        self.stdout.write('Filas creadas: ' + ', '.join(f'{modelo}: {total}' for modelo, total in filas.items()))
@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from . import datos, escenarios
+
+ESCALA_MINIMA = datos.Escala(productos=3, variantes=2, imagenes=1, categorias=2, clientes=2, items_carrito=2,
+                             pedidos=6, items_pedido=2, dias=3)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.salida = os.path.join(directorio, 'resultado.json')
+
+    def test_sembrar(self):
+        creadas = datos.sembrar(ESCALA_MINIMA)
+
+        self.assertEqual(
+            (creadas['productos'], creadas['variantes'], creadas['pedidos'], creadas['items_pedido']), (3, 6, 6, 12)
+        )
+        self.assertEqual(datos.contar(), creadas)
+        self.assertTrue(datos.hay_datos())
+
+    def test_benchmark_sobre_la_base_sembrada(self):
+        datos.sembrar(ESCALA_MINIMA)
+
+        call_command('benchmark', '--bd-actual', '--repeticiones', '2', '--calentamiento', '0',
+                     '--salida', self.salida, stdout=io.StringIO())
+
+        with open(self.salida, encoding='utf-8') as archivo:
+            resultado = json.load(archivo)
+        self.assertEqual(resultado['escala']['variantes'], 6)
+        self.assertEqual(set(resultado['escenarios']), set(escenarios.NOMBRES))
+        for nombre, medicion in resultado['escenarios'].items():
+            self.assertEqual(medicion['errores'], 0, nombre)
+            self.assertEqual(medicion['repeticiones'], 2)
+            self.assertLessEqual(medicion['p50_ms'], medicion['p95_ms'])
+        self.assertGreater(resultado['escenarios']['productos_lista']['consultas'], 0)
+        self.assertEqual(resultado['escenarios']['productos_lista_cache']['consultas'], 0)
+
+    def test_comparar_marca_regresiones(self):
+        anterior = {'escenarios': {
+            'lista': {'p50_ms': 10, 'p95_ms': 20, 'consultas': 3, 'memoria_pico_kb': 100},
+            'detalle': {'p50_ms': 10, 'p95_ms': 20, 'consultas': 3, 'memoria_pico_kb': 100},
+        }}
+        actual = {'escenarios': {
+            'lista': {'p50_ms': 10, 'p95_ms': 21, 'consultas': 3, 'memoria_pico_kb': 100},
+            'detalle': {'p50_ms': 10, 'p95_ms': 20, 'consultas': 4, 'memoria_pico_kb': 100},
+            'nuevo': {'p50_ms': 1, 'p95_ms': 1, 'consultas': 1, 'memoria_pico_kb': 1},
+        }}
+
+        filas = {fila['escenario']: fila for fila in escenarios.comparar(actual, anterior, umbral=10)}
+        self.assertEqual(set(filas), {'lista', 'detalle'})
+        self.assertEqual((filas['lista']['p95_pct'], filas['lista']['regresion']), (5.0, False))
+        self.assertTrue(filas['detalle']['regresion'])
+
+    def test_sin_datos_sembrados(self):
+        with self.assertRaisesMessage(CommandError, 'sembrar_benchmark'):
+            call_command('benchmark', '--bd-actual', stdout=io.StringIO())
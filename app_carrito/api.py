@@ -1,16 +1,25 @@
+import logging
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated , AllowAny
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from .models import Carrito, ItemCarrito
 from .serializers import (
     CarritoSerializer, 
     ItemCarritoSerializer, 
-    AgregarItemCarritoSerializer
+    AgregarItemCarritoSerializer,
+    CheckoutSerializer
 )
 from app_productos.models import Producto_Variantes
-from app_Cliente.models import Cliente
+from app_productos.stock import StockInsuficiente
+from .reservas import reservar_item, liberar_item, liberar_carrito
+from .checkout import procesar_checkout, CarritoVacio, DireccionInvalida
+from app_pedidos.serializers import PedidoSerializer
+
+logger = logging.getLogger(__name__)
 
 class CarritoViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar carritos - Requiere autenticación"""
@@ -24,34 +33,32 @@ class CarritoViewSet(viewsets.ModelViewSet):
             return Carrito.objects.none()
         
         try:
-            cliente = Cliente.objects.get(user=self.request.user)
-            return Carrito.objects.filter(cliente=cliente)
-        except Cliente.DoesNotExist:
-            print(f"⚠️ Usuario {self.request.user} existe pero no tiene registro de Cliente")
-            return Carrito.objects.none()
+            cliente_id = self.request.cliente_actual.cliente_id
+            if cliente_id is None:
+                logger.warning('Usuario %s sin registro de Cliente', self.request.user.pk)
+                return Carrito.objects.none()
+            return CarritoSerializer.setup_eager_loading(Carrito.objects.filter(cliente_id=cliente_id))
         except Exception as e:
-            print(f"❌ Error en get_queryset: {type(e).__name__}: {str(e)}")
+            logger.exception('Error en get_queryset (carrito)')
             return Carrito.objects.none()
     
     def get_or_create_carrito(self):
         """Obtiene o crea un carrito para el cliente autenticado"""
         if not self.request.user or not self.request.user.is_authenticated:
-            print("⚠️ Usuario no autenticado intentando acceder al carrito")
+            logger.info('Usuario no autenticado intentando acceder al carrito')
             return None
             
         try:
-            cliente = Cliente.objects.get(user=self.request.user)
-            carrito, created = Carrito.objects.get_or_create(cliente=cliente)
-            if created:
-                print(f"✅ Carrito creado para cliente {cliente.id}")
+            cliente_actual = self.request.cliente_actual
+            carrito = cliente_actual.obtener_carrito()
+            if carrito is None:
+                logger.warning('Usuario %s sin registro de Cliente', self.request.user.pk)
+                return None
+            if cliente_actual.carrito_creado:
+                logger.info('Carrito creado para el cliente %s', cliente_actual.cliente_id)
             return carrito
-        except Cliente.DoesNotExist:
-            print(f"❌ Usuario {self.request.user.email} no tiene registro de Cliente")
-            return None
         except Exception as e:
-            print(f"❌ Error en get_or_create_carrito: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en get_or_create_carrito (carrito)')
             return None
     
     def list(self, request, *args, **kwargs):
@@ -71,9 +78,7 @@ class CarritoViewSet(viewsets.ModelViewSet):
                 'carritos': serializer.data
             })
         except Exception as e:
-            print(f"❌ Error en list: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en list (carrito)')
             return Response({
                 'success': False,
                 'message': str(e),
@@ -91,15 +96,15 @@ class CarritoViewSet(viewsets.ModelViewSet):
                     'message': 'Cliente no encontrado. Verifica que tengas un perfil de cliente.'
                 }, status=status.HTTP_404_NOT_FOUND)
             
+            # Volver a leerlo con los totales anotados y los items precargados
+            carrito = CarritoSerializer.setup_eager_loading(Carrito.objects.filter(pk=carrito.pk)).get()
             serializer = self.get_serializer(carrito)
             return Response({
                 'success': True,
                 'carrito': serializer.data
             })
         except Exception as e:
-            print(f"❌ Error en mi_carrito: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en mi_carrito (carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -124,62 +129,52 @@ class CarritoViewSet(viewsets.ModelViewSet):
             try:
                 producto_variante = Producto_Variantes.objects.get(id=producto_variante_id)
                 
-                # Nota: Validaciones de stock comentadas porque Producto_Variantes no tiene campo 'stock'
-                # TODO: Agregar campo 'stock' al modelo o implementar lógica con tabla Inventario
-                # Verificar stock disponible
-                # if not hasattr(producto_variante, 'stock'):
-                #     print("⚠️ WARNING: Producto_Variantes no tiene campo 'stock'")
-                # elif producto_variante.stock < cantidad:
-                #     return Response({
-                #         'success': False,
-                #         'message': f'Stock insuficiente. Disponible: {producto_variante.stock}'
-                #     }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Buscar si ya existe el item en el carrito
-                item_existente = ItemCarrito.objects.filter(
-                    carrito=carrito, 
-                    producto_variante=producto_variante
-                ).first()
+                # El item y su reserva de stock se guardan en la misma transacción:
+                # si no hay stock suficiente no queda ningún cambio en el carrito
+                with transaction.atomic():
+                    # Buscar si ya existe el item en el carrito
+                    item_existente = ItemCarrito.objects.select_for_update().filter(
+                        carrito=carrito, 
+                        producto_variante=producto_variante
+                    ).first()
+                    
+                    if item_existente:
+                        # Actualizar cantidad
+                        item_existente.cantidad = item_existente.cantidad + cantidad
+                        item_existente.save()
+                        item = item_existente
+                    else:
+                        # Crear nuevo item
+                        item = ItemCarrito.objects.create(
+                            carrito=carrito,
+                            producto_variante=producto_variante,
+                            cantidad=cantidad
+                        )
+                    reservar_item(item, item.cantidad)
                 
+                item_serializer = ItemCarritoSerializer(item)
                 if item_existente:
-                    # Actualizar cantidad
-                    nueva_cantidad = item_existente.cantidad + cantidad
-                    # Validación de stock desactivada (campo no existe en el modelo)
-                    # if nueva_cantidad > producto_variante.stock:
-                    #     return Response({
-                    #         'success': False,
-                    #         'message': f'Cantidad total excede el stock. Disponible: {producto_variante.stock}'
-                    #     }, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    item_existente.cantidad = nueva_cantidad
-                    item_existente.save()
-                    item_serializer = ItemCarritoSerializer(item_existente)
-                    
                     return Response({
                         'success': True,
                         'message': 'Cantidad actualizada en el carrito',
                         'item': item_serializer.data
                     })
-                else:
-                    # Crear nuevo item
-                    nuevo_item = ItemCarrito.objects.create(
-                        carrito=carrito,
-                        producto_variante=producto_variante,
-                        cantidad=cantidad
-                    )
-                    item_serializer = ItemCarritoSerializer(nuevo_item)
-                    
-                    return Response({
-                        'success': True,
-                        'message': 'Producto agregado al carrito',
-                        'item': item_serializer.data
-                    }, status=status.HTTP_201_CREATED)
+                return Response({
+                    'success': True,
+                    'message': 'Producto agregado al carrito',
+                    'item': item_serializer.data
+                }, status=status.HTTP_201_CREATED)
                     
             except Producto_Variantes.DoesNotExist:
                 return Response({
                     'success': False,
                     'message': 'Producto no encontrado'
                 }, status=status.HTTP_404_NOT_FOUND)
+            except StockInsuficiente as e:
+                return Response({
+                    'success': False,
+                    'message': f'Stock insuficiente. Disponible: {e.disponible}'
+                }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': False,
@@ -209,15 +204,10 @@ class CarritoViewSet(viewsets.ModelViewSet):
                     'message': 'La cantidad debe ser mayor a 0'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Validación de stock desactivada (campo no existe en el modelo)
-            # if hasattr(item.producto_variante, 'stock') and nueva_cantidad > item.producto_variante.stock:
-            #     return Response({
-            #         'success': False,
-            #         'message': f'Stock insuficiente. Disponible: {item.producto_variante.stock}'
-            #     }, status=status.HTTP_400_BAD_REQUEST)
-            
-            item.cantidad = nueva_cantidad
-            item.save()
+            with transaction.atomic():
+                item.cantidad = nueva_cantidad
+                item.save()
+                reservar_item(item, nueva_cantidad)
             
             serializer = ItemCarritoSerializer(item)
             return Response({
@@ -231,6 +221,11 @@ class CarritoViewSet(viewsets.ModelViewSet):
                 'success': False,
                 'message': 'Item no encontrado en tu carrito'
             }, status=status.HTTP_404_NOT_FOUND)
+        except StockInsuficiente as e:
+            return Response({
+                'success': False,
+                'message': f'Stock insuficiente. Disponible: {e.disponible}'
+            }, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['delete'])
     def eliminar_item(self, request):
@@ -246,7 +241,9 @@ class CarritoViewSet(viewsets.ModelViewSet):
         try:
             carrito = self.get_or_create_carrito()
             item = ItemCarrito.objects.get(id=item_id, carrito=carrito)
-            item.delete()
+            with transaction.atomic():
+                liberar_item(item)
+                item.delete()
             
             return Response({
                 'success': True,
@@ -264,7 +261,9 @@ class CarritoViewSet(viewsets.ModelViewSet):
         """Vacía completamente el carrito"""
         carrito = self.get_or_create_carrito()
         if carrito:
-            ItemCarrito.objects.filter(carrito=carrito).delete()
+            with transaction.atomic():
+                liberar_carrito(carrito)
+                ItemCarrito.objects.filter(carrito=carrito).delete()
             return Response({
                 'success': True,
                 'message': 'Carrito vaciado exitosamente'
@@ -273,4 +272,45 @@ class CarritoViewSet(viewsets.ModelViewSet):
         return Response({
             'success': False,
             'message': 'No se pudo vaciar el carrito'
-        }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """
+        Convierte el carrito en un Pedido en una sola transacción.
+        Precios, subtotal y monto_total se calculan en el servidor.
+        """
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Datos inválidos',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        carrito = self.get_or_create_carrito()
+        if not carrito:
+            return Response({
+                'success': False,
+                'message': 'Cliente no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            pedido = procesar_checkout(carrito, **serializer.validated_data)
+        except (DireccionInvalida, CarritoVacio) as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except StockInsuficiente as e:
+            return Response({
+                'success': False,
+                'message': f'Stock insuficiente. Disponible: {e.disponible}',
+                'inventario_id': e.inventario_id
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'success': True,
+            'message': 'Pedido creado exitosamente',
+            'pedido': PedidoSerializer(pedido).data
+        }, status=status.HTTP_201_CREATED)
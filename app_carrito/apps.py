@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppCarritoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_carrito'
+
+    def ready(self):
+        from . import signals  # noqa: F401
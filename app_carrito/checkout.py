@@ -0,0 +1,140 @@
+"""
+Conversión de un Carrito en Pedido en una sola transacción.
+
+El número de consultas no depende de la cantidad de items: los precios
+salen de Producto_Variantes en la misma consulta que los items, el stock
+se descuenta por lote (ver app_productos.stock) y las líneas del pedido
+se insertan con bulk_create.
+
+El Pedido no tiene cliente propio: queda asociado a través de su
+direccion_envio (ver PedidoViewSet.por_cliente), por eso el checkout exige
+una dirección del cliente dueño del carrito.
+"""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from app_pedidos.models import Pedido
+from app_productos.models import item_pedido
+from app_productos.stock import descontar_stock_lote, reponer_stock_lote
+from .models import Carrito, ItemCarrito, ReservaStock
+
+
+class CarritoVacio(Exception):
+    """El carrito no tiene items para convertir en pedido"""
+
+
+class DireccionInvalida(Exception):
+    """Falta la dirección de envío o no pertenece al cliente del carrito"""
+
+
+def procesar_checkout(carrito, direccion_envio, metodo_pago=None, costo_envio=Decimal('0'),
+                      nota=None, tipo_pedido='online', transaccion_id=None):
+    """
+    Crear el Pedido del carrito, descontar stock y vaciar el carrito.
+    Lanza DireccionInvalida, CarritoVacio o StockInsuficiente (en cuyo caso
+    no se modifica nada).
+    """
+    if direccion_envio is None or direccion_envio.Cliente_id != carrito.cliente_id:
+        raise DireccionInvalida('La dirección de envío no pertenece al cliente')
+
+    with transaction.atomic():
+        # Bloquear el carrito: dos checkouts simultáneos del mismo carrito se serializan
+        Carrito.objects.select_for_update().filter(pk=carrito.pk).values_list('pk').get()
+
+        # Bloquear las reservas activas antes de leerlas: así expirar_reservas,
+        # liberar_item o vaciar el carrito no pueden devolver su stock mientras
+        # se cuentan como apartadas (las que ya se devolvieron no se leen)
+        bloqueadas = list(ReservaStock.objects.select_for_update().filter(carrito=carrito, estado='activa'))
+        reservas = {reserva.item_id: reserva for reserva in bloqueadas if reserva.item_id}
+
+        items = list(
+            ItemCarrito.objects.filter(carrito=carrito)
+            .select_related('producto_variante')
+            .order_by('id')
+        )
+        items = [item for item in items if item.producto_variante_id]
+        if not items:
+            raise CarritoVacio('El carrito está vacío')
+
+        # Unidades que faltan descontar (items sin reserva activa) y que sobran
+        # (reservas de otro inventario o de items que ya no están en el carrito)
+        faltantes = defaultdict(int)
+        sobrantes = defaultdict(int)
+        reservas_confirmadas = []
+        reservas_liberadas = []
+        for item in items:
+            inventario_id = item.producto_variante.Inventario_id_id
+            if inventario_id is None:
+                continue
+            reserva = reservas.get(item.pk)
+            reservado = 0
+            if reserva:
+                if reserva.inventario_id == inventario_id:
+                    reservado = reserva.cantidad
+                    reservas_confirmadas.append(reserva.pk)
+                else:
+                    sobrantes[reserva.inventario_id] += reserva.cantidad
+                    reservas_liberadas.append(reserva.pk)
+            diferencia = item.cantidad - reservado
+            if diferencia > 0:
+                faltantes[inventario_id] += diferencia
+            elif diferencia < 0:
+                sobrantes[inventario_id] -= diferencia
+        usadas = set(reservas_confirmadas) | set(reservas_liberadas)
+        for reserva in bloqueadas:
+            if reserva.pk not in usadas:
+                sobrantes[reserva.inventario_id] += reserva.cantidad
+                reservas_liberadas.append(reserva.pk)
+
+        numero_pedido = f"PED-{uuid.uuid4().hex[:10].upper()}"
+        descontar_stock_lote(faltantes, 'venta', f'pedido:{numero_pedido}')
+        reponer_stock_lote(sobrantes, 'liberacion', f'pedido:{numero_pedido}')
+
+        # Totales calculados en el servidor con los precios vigentes
+        lineas = []
+        subtotal = Decimal('0.00')
+        for item in items:
+            precio = item.producto_variante.precio_unitario
+            importe = precio * item.cantidad
+            subtotal += importe
+            lineas.append((item, precio, importe))
+        costo_envio = costo_envio or Decimal('0.00')
+
+        pedido = Pedido.objects.create(
+            direccion_envio=direccion_envio,
+            metodo_pago=metodo_pago,
+            estado='pendiente',
+            numero_pedido=numero_pedido,
+            subtotal=subtotal,
+            costo_envio=costo_envio,
+            monto_total=subtotal + costo_envio,
+            nota=nota,
+            tipo_pedido=tipo_pedido,
+            transaccion_id=transaccion_id,
+        )
+        item_pedido.objects.bulk_create([
+            item_pedido(
+                pedido=pedido,
+                Producto_variante_id=item.producto_variante_id,
+                cantidad=item.cantidad,
+                precio_unitario=precio,
+                subtotal=importe,
+            )
+            for item, precio, importe in lineas
+        ])
+
+        if reservas_liberadas:
+            ReservaStock.objects.filter(pk__in=reservas_liberadas).update(estado='liberada')
+        if reservas_confirmadas:
+            confirmadas = ReservaStock.objects.filter(
+                pk__in=reservas_confirmadas, estado='activa'
+            ).update(estado='confirmada')
+            if confirmadas != len(reservas_confirmadas):
+                # No debería ocurrir con las reservas bloqueadas: se revierte todo
+                raise RuntimeError('Una reserva del carrito cambió durante el checkout')
+        ItemCarrito.objects.filter(carrito=carrito).delete()
+
+    return pedido
@@ -1,13 +1,19 @@
 """
 API CRUD para ItemCarrito - Gestión directa de items del carrito
 """
+import logging
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Carrito, ItemCarrito
-from .serializers import ItemCarritoSerializer
+from .models import ItemCarrito
+from .serializers import ItemCarritoSerializer, calcular_totales
+from django.db import transaction
 from app_productos.models import Producto_Variantes
-from app_Cliente.models import Cliente
+from app_productos.stock import StockInsuficiente
+from .reservas import reservar_item, liberar_item
+
+logger = logging.getLogger(__name__)
 
 
 class ItemCarritoViewSet(viewsets.ModelViewSet):
@@ -29,31 +35,24 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
             return ItemCarrito.objects.none()
         
         try:
-            cliente = Cliente.objects.get(user=self.request.user)
-            carrito = Carrito.objects.filter(cliente=cliente).first()
-            if carrito:
-                return ItemCarrito.objects.filter(carrito=carrito).select_related(
-                    'producto_variante', 
-                    'producto_variante__producto'
-                )
-            return ItemCarrito.objects.none()
-        except Cliente.DoesNotExist:
-            print(f"⚠️ Usuario {self.request.user} no tiene Cliente asociado")
-            return ItemCarrito.objects.none()
+            cliente_id = self.request.cliente_actual.cliente_id
+            if cliente_id is None:
+                logger.warning('Usuario %s sin registro de Cliente', self.request.user.pk)
+                return ItemCarrito.objects.none()
+            # Un solo JOIN en lugar de buscar primero el carrito
+            return ItemCarritoSerializer.setup_eager_loading(
+                ItemCarrito.objects.filter(carrito__cliente_id=cliente_id).order_by('id')
+            )
         except Exception as e:
-            print(f"❌ Error en get_queryset: {e}")
+            logger.exception('Error en get_queryset (items del carrito)')
             return ItemCarrito.objects.none()
     
     def get_carrito(self):
         """Obtiene o crea el carrito del usuario autenticado"""
         try:
-            cliente = Cliente.objects.get(user=self.request.user)
-            carrito, created = Carrito.objects.get_or_create(cliente=cliente)
-            return carrito
-        except Cliente.DoesNotExist:
-            return None
+            return self.request.cliente_actual.obtener_carrito()
         except Exception as e:
-            print(f"❌ Error obteniendo carrito: {e}")
+            logger.exception('Error obteniendo el carrito')
             return None
     
     def list(self, request, *args, **kwargs):
@@ -70,27 +69,22 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
+            items = list(queryset)
+            serializer = self.get_serializer(items, many=True)
             
-            # Calcular totales
-            total_items = sum(item.cantidad for item in queryset)
-            total_precio = sum(
-                float(item.cantidad * item.producto_variante.precio_unitario) 
-                for item in queryset
-            )
+            # Totales calculados en la base de datos con un único aggregate
+            totales = calcular_totales(queryset)
             
             return Response({
                 'success': True,
-                'count': queryset.count(),
-                'total_items': total_items,
-                'total_precio': total_precio,
+                'count': len(items),
+                'total_items': totales['total_items'],
+                'total_precio': totales['total_precio'],
                 'items': serializer.data
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
-            print(f"❌ Error en list: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en list (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e),
@@ -115,7 +109,7 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                 'message': 'Item no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"❌ Error en retrieve: {e}")
+            logger.exception('Error en retrieve (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -158,40 +152,49 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                     'message': 'Producto no encontrado'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Verificar si ya existe en el carrito
-            item_existente = ItemCarrito.objects.filter(
-                carrito=carrito,
-                producto_variante=producto_variante
-            ).first()
+            # Item y reserva de stock en la misma transacción
+            with transaction.atomic():
+                # Verificar si ya existe en el carrito
+                item_existente = ItemCarrito.objects.select_for_update().filter(
+                    carrito=carrito,
+                    producto_variante=producto_variante
+                ).first()
+                
+                if item_existente:
+                    # Actualizar cantidad existente
+                    item_existente.cantidad += cantidad
+                    item_existente.save()
+                    item = item_existente
+                else:
+                    # Crear nuevo item
+                    item = ItemCarrito.objects.create(
+                        carrito=carrito,
+                        producto_variante=producto_variante,
+                        cantidad=cantidad
+                    )
+                reservar_item(item, item.cantidad)
             
+            serializer = self.get_serializer(item)
             if item_existente:
-                # Actualizar cantidad existente
-                item_existente.cantidad += cantidad
-                item_existente.save()
-                serializer = self.get_serializer(item_existente)
                 return Response({
                     'success': True,
                     'message': 'Cantidad actualizada en el carrito',
                     'item': serializer.data
                 }, status=status.HTTP_200_OK)
             else:
-                # Crear nuevo item
-                nuevo_item = ItemCarrito.objects.create(
-                    carrito=carrito,
-                    producto_variante=producto_variante,
-                    cantidad=cantidad
-                )
-                serializer = self.get_serializer(nuevo_item)
                 return Response({
                     'success': True,
                     'message': 'Producto agregado al carrito',
                     'item': serializer.data
                 }, status=status.HTTP_201_CREATED)
                 
+        except StockInsuficiente as e:
+            return Response({
+                'success': False,
+                'message': f'Stock insuficiente. Disponible: {e.disponible}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"❌ Error en create: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en create (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -224,8 +227,10 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                     'message': 'La cantidad debe ser mayor a 0'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            instance.cantidad = cantidad
-            instance.save()
+            with transaction.atomic():
+                instance.cantidad = cantidad
+                instance.save()
+                reservar_item(instance, cantidad)
             
             serializer = self.get_serializer(instance)
             return Response({
@@ -239,8 +244,13 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                 'success': False,
                 'message': 'Item no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
+        except StockInsuficiente as e:
+            return Response({
+                'success': False,
+                'message': f'Stock insuficiente. Disponible: {e.disponible}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"❌ Error en update: {e}")
+            logger.exception('Error en update (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -267,8 +277,10 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                         'message': 'La cantidad debe ser mayor a 0'
                     }, status=status.HTTP_400_BAD_REQUEST)
                 
-                instance.cantidad = cantidad
-                instance.save()
+                with transaction.atomic():
+                    instance.cantidad = cantidad
+                    instance.save()
+                    reservar_item(instance, cantidad)
             
             serializer = self.get_serializer(instance)
             return Response({
@@ -282,8 +294,13 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                 'success': False,
                 'message': 'Item no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
+        except StockInsuficiente as e:
+            return Response({
+                'success': False,
+                'message': f'Stock insuficiente. Disponible: {e.disponible}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"❌ Error en partial_update: {e}")
+            logger.exception('Error en partial_update (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -297,7 +314,9 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
         try:
             instance = self.get_object()
             producto_nombre = instance.producto_variante.producto.nombre
-            instance.delete()
+            with transaction.atomic():
+                liberar_item(instance)
+                instance.delete()
             
             return Response({
                 'success': True,
@@ -310,7 +329,7 @@ class ItemCarritoViewSet(viewsets.ModelViewSet):
                 'message': 'Item no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            print(f"❌ Error en destroy: {e}")
+            logger.exception('Error en destroy (items del carrito)')
             return Response({
                 'success': False,
                 'message': str(e)
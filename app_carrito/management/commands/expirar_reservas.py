@@ -0,0 +1,32 @@
+"""
+Devuelve al inventario el stock de las reservas de carrito vencidas.
+
+Uso:
+    python manage.py expirar_reservas              # una pasada (cron)
+    python manage.py expirar_reservas --loop 30    # proceso en segundo plano, cada 30 s
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_carrito.reservas import expirar_reservas
+
+
+class Command(BaseCommand):
+    help = 'Expira las reservas de stock vencidas y devuelve las unidades al inventario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, default=0, metavar='SEGUNDOS',
+                            help='Repetir cada N segundos en lugar de ejecutar una sola vez')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Reservas procesadas por transacción')
+
+    def handle(self, *args, **options):
+        intervalo = options['loop']
+        while True:
+            expiradas = expirar_reservas(lote=options['lote'])
+            if expiradas or not intervalo:
+                self.stdout.write(f'Reservas expiradas: {expiradas}')
+            if not intervalo:
+                break
+            time.sleep(intervalo)
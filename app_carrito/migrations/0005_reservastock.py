@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_carrito', '0004_alter_itemcarrito_producto_variante'),
+        ('app_productos', '0011_categoria_ruta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('confirmada', 'Confirmada'), ('liberada', 'Liberada'), ('expirada', 'Expirada')], default='activa', max_length=20)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('expira_en', models.DateTimeField()),
+                ('carrito', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app_carrito.carrito')),
+                ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_productos.inventario')),
+                ('item', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reserva', to='app_carrito.itemcarrito')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'expira_en'], name='reserva_estado_expira_idx'), models.Index(fields=['carrito', 'estado'], name='reserva_carrito_estado_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,15 @@
 from django.db import models
 from app_Cliente.models import Cliente
-from app_productos.models import Producto_Variantes
+from app_productos.models import Producto_Variantes, Inventario
 # Create your models here.
 
+ESTADOS_RESERVA = [
+    ('activa', 'Activa'),
+    ('confirmada', 'Confirmada'),
+    ('liberada', 'Liberada'),
+    ('expirada', 'Expirada'),
+]
+
 
 class Carrito(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
@@ -14,3 +21,21 @@ class ItemCarrito(models.Model):
     producto_variante = models.ForeignKey(Producto_Variantes, on_delete=models.CASCADE , null=True, blank=True)
     cantidad = models.PositiveIntegerField(default=1)
 
+class ReservaStock(models.Model):
+    """
+    Unidades de un Inventario apartadas para un item del carrito.
+    El stock se descuenta al reservar y se devuelve al liberar o expirar.
+    """
+    item = models.OneToOneField(ItemCarrito, related_name='reserva', on_delete=models.SET_NULL, null=True, blank=True)
+    carrito = models.ForeignKey(Carrito, related_name='reservas', on_delete=models.CASCADE)
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE)
+    cantidad = models.PositiveIntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADOS_RESERVA, default='activa')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira_en = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'expira_en'], name='reserva_estado_expira_idx'),
+            models.Index(fields=['carrito', 'estado'], name='reserva_carrito_estado_idx'),
+        ]
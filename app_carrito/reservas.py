@@ -0,0 +1,127 @@
+"""
+Motor de reservas de stock para el carrito.
+
+Cada item del carrito cuya variante tiene Inventario mantiene una
+ReservaStock con las unidades apartadas. Al reservar se descuenta el
+stock con un UPDATE condicional (ver app_productos.stock), de modo que
+bajo carga concurrente nunca se vende más de lo disponible. Las reservas
+vencen tras RESERVA_STOCK_MINUTOS y el comando `expirar_reservas`
+devuelve su stock al inventario.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from app_productos.stock import descontar_stock, reponer_stock, reponer_stock_lote
+from .models import ItemCarrito, ReservaStock
+
+
+def get_ttl():
+    return timedelta(minutes=getattr(settings, 'RESERVA_STOCK_MINUTOS', 15))
+
+
+def reservar_item(item, cantidad):
+    """
+    Ajustar la reserva del item a `cantidad` unidades.
+    Solo se descuenta (o devuelve) la diferencia con lo ya reservado.
+    Lanza StockInsuficiente si no hay unidades para cubrir el aumento.
+    Las variantes sin inventario asociado no se controlan (devuelve None),
+    tampoco un item que ya se eliminó.
+    """
+    variante = item.producto_variante
+    inventario_id = variante.Inventario_id_id if variante else None
+    if inventario_id is None:
+        return None
+
+    with transaction.atomic():
+        # Bloquear el item primero: si todavía no tiene reserva no hay fila que
+        # bloquear y dos primeras reservas concurrentes descontarían dos veces
+        if not ItemCarrito.objects.select_for_update().filter(pk=item.pk).values_list('pk').first():
+            return None
+        reserva = ReservaStock.objects.select_for_update().filter(item=item).first()
+        reservado = 0
+        if reserva and reserva.estado == 'activa':
+            if reserva.inventario_id == inventario_id:
+                reservado = reserva.cantidad
+            else:
+                # La variante cambió de inventario: se devuelve todo al anterior
+                reponer_stock(reserva.inventario_id, reserva.cantidad, referencia=f'carrito:{item.carrito_id}')
+
+        diferencia = cantidad - reservado
+        referencia = f'carrito:{item.carrito_id}'
+        if diferencia > 0:
+            descontar_stock(inventario_id, diferencia, 'reserva', referencia, variante.pk)
+        elif diferencia < 0:
+            reponer_stock(inventario_id, -diferencia, 'liberacion', referencia, variante.pk)
+
+        expira_en = timezone.now() + get_ttl()
+        if reserva:
+            reserva.inventario_id = inventario_id
+            reserva.cantidad = cantidad
+            reserva.estado = 'activa'
+            reserva.expira_en = expira_en
+            reserva.save(update_fields=['inventario', 'cantidad', 'estado', 'expira_en'])
+        else:
+            reserva = ReservaStock.objects.create(
+                item=item,
+                carrito_id=item.carrito_id,
+                inventario_id=inventario_id,
+                cantidad=cantidad,
+                expira_en=expira_en
+            )
+    return reserva
+
+
+def liberar_item(item):
+    """Devolver al inventario las unidades reservadas por un item"""
+    with transaction.atomic():
+        reserva = ReservaStock.objects.select_for_update().filter(item=item, estado='activa').first()
+        if reserva:
+            reponer_stock(
+                reserva.inventario_id, reserva.cantidad,
+                referencia=f'carrito:{reserva.carrito_id}', variante_id=item.producto_variante_id
+            )
+            reserva.estado = 'liberada'
+            reserva.save(update_fields=['estado'])
+
+
+def _devolver_reservas(queryset, nuevo_estado, lote, skip_locked):
+    """
+    Devolver el stock de las reservas activas del queryset, por lotes.
+    Agrupa por inventario para hacer un solo UPDATE por lote.
+    Con skip_locked=True (expiración en segundo plano) se saltan las reservas
+    que otra transacción está modificando en ese momento.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            reservas = list(
+                queryset.filter(estado='activa')
+                .select_for_update(skip_locked=skip_locked)
+                .values_list('id', 'inventario_id', 'cantidad')[:lote]
+            )
+            if not reservas:
+                break
+            por_inventario = defaultdict(int)
+            for _, inventario_id, cantidad in reservas:
+                por_inventario[inventario_id] += cantidad
+            reponer_stock_lote(por_inventario, 'liberacion', f'reservas:{nuevo_estado}')
+            ReservaStock.objects.filter(id__in=[r[0] for r in reservas]).update(estado=nuevo_estado)
+        total += len(reservas)
+        if len(reservas) < lote:
+            break
+    return total
+
+
+def liberar_carrito(carrito, lote=500):
+    """Liberar todas las reservas activas de un carrito"""
+    return _devolver_reservas(ReservaStock.objects.filter(carrito=carrito), 'liberada', lote, skip_locked=False)
+
+
+def expirar_reservas(ahora=None, lote=500):
+    """Devolver el stock de las reservas vencidas. Retorna cuántas se expiraron."""
+    ahora = ahora or timezone.now()
+    return _devolver_reservas(ReservaStock.objects.filter(expira_en__lte=ahora), 'expirada', lote, skip_locked=True)
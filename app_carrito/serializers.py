@@ -1,7 +1,41 @@
+from decimal import Decimal
 from rest_framework import serializers
+from django.db.models import DecimalField, F, IntegerField, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 from .models import Carrito, ItemCarrito
 from app_productos.models import Producto, Producto_Variantes, Imagen_Producto
-from app_Cliente.models import Cliente
+from app_productos.derivados import srcset
+from app_Cliente.models import Cliente, Direccion_Envio, Metodo_Pago
+from app_pedidos.models import TIPO_PEDIDO
+
+CENTAVOS = Decimal('0.01')
+
+
+def expresiones_totales(prefijo=''):
+    """
+    Expresiones SQL para total_items y total_precio de un conjunto de items.
+    Con prefijo='items__' sirven para annotate() sobre Carrito; sin prefijo,
+    para aggregate() sobre ItemCarrito. El total se mantiene en Decimal.
+    """
+    return {
+        'total_items': Coalesce(Sum(f'{prefijo}cantidad'), Value(0), output_field=IntegerField()),
+        'total_precio': Coalesce(
+            Sum(
+                F(f'{prefijo}cantidad') * F(f'{prefijo}producto_variante__precio_unitario'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+    }
+
+
+def calcular_totales(queryset):
+    """Totales de un queryset de ItemCarrito con un único aggregate"""
+    totales = queryset.order_by().aggregate(**expresiones_totales())
+    totales['total_precio'] = totales['total_precio'].quantize(CENTAVOS)
+    return totales
+
 
 class ProductoBasicoSerializer(serializers.ModelSerializer):
     """Serializer básico para mostrar info del producto en el carrito"""
@@ -23,9 +57,26 @@ class ProductoCategoriaBasicoSerializer(serializers.ModelSerializer):
             'imagenes', 'imagen_principal'
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset, prefijo=''):
+        """
+        Precargar las imágenes de las variantes.
+        `prefijo` permite usarlo desde los items del carrito (ej. 'producto_variante__').
+        """
+        return queryset.prefetch_related(
+            Prefetch(f'{prefijo}imagen_producto_set', queryset=Imagen_Producto.objects.order_by('id'))
+        )
+    
+    def _imagenes_precargadas(self, obj):
+        if 'imagen_producto_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            return list(obj.imagen_producto_set.all())
+        return None
+    
     def get_imagenes(self, obj):
-        """Obtiene todas las imágenes de la variante"""
-        imagenes = Imagen_Producto.objects.filter(Producto_categoria=obj)
+        """Obtiene todas las imágenes de la variante (usa el prefetch si existe)"""
+        imagenes = self._imagenes_precargadas(obj)
+        if imagenes is None:
+            imagenes = Imagen_Producto.objects.filter(Producto_categoria=obj)
         result = []
         for img in imagenes:
             url = img.imagen.url if img.imagen else None
@@ -33,6 +84,7 @@ class ProductoCategoriaBasicoSerializer(serializers.ModelSerializer):
                 result.append({
                     'id': img.id,
                     'url': url,
+                    'srcset': srcset(img),
                     'texto': img.texto,
                     'es_principal': img.es_principal
                 })
@@ -40,6 +92,13 @@ class ProductoCategoriaBasicoSerializer(serializers.ModelSerializer):
     
     def get_imagen_principal(self, obj):
         """Obtiene la imagen principal de la variante"""
+        imagenes = self._imagenes_precargadas(obj)
+        if imagenes is not None:
+            # Principal si existe; si no, la primera disponible (mismo criterio que abajo)
+            imagen = next((img for img in imagenes if img.es_principal), None)
+            if not (imagen and imagen.imagen):
+                imagen = imagenes[0] if imagenes else None
+            return imagen.imagen.url if imagen and imagen.imagen else None
         try:
             imagen = Imagen_Producto.objects.filter(
                 Producto_categoria=obj,
@@ -66,9 +125,17 @@ class ItemCarritoSerializer(serializers.ModelSerializer):
         fields = ['id', 'carrito', 'producto_variante', 'cantidad', 'variante_info', 'subtotal']
         read_only_fields = ['carrito']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Precargar variante, producto e imágenes de cada item"""
+        queryset = queryset.select_related('producto_variante', 'producto_variante__producto')
+        return ProductoCategoriaBasicoSerializer.setup_eager_loading(queryset, prefijo='producto_variante__')
+    
     def get_subtotal(self, obj):
-        """Calcula el subtotal del item"""
-        return float(obj.cantidad * obj.producto_variante.precio_unitario)
+        """Calcula el subtotal del item (Decimal exacto)"""
+        if not obj.producto_variante:
+            return Decimal('0.00')
+        return obj.cantidad * obj.producto_variante.precio_unitario
     
     def validate_cantidad(self, value):
         """Valida que la cantidad sea positiva"""
@@ -76,13 +143,8 @@ class ItemCarritoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La cantidad debe ser mayor a 0")
         return value
     
-    # Nota: La validación de stock está comentada porque Producto_Variantes
-    # no tiene campo 'stock'. Debe agregarse al modelo o usar Inventario.
-    # def validate_producto_variante(self, value):
-    #     """Valida que el producto tenga stock disponible"""
-    #     if not hasattr(value, 'stock') or not value.stock or value.stock <= 0:
-    #         raise serializers.ValidationError("Producto sin stock disponible")
-    #     return value
+    # Nota: el stock se controla con ReservaStock (ver app_carrito/reservas.py)
+    # al crear o modificar el item, no en la validación del serializer.
 
 class CarritoSerializer(serializers.ModelSerializer):
     """Serializer completo del carrito con todos sus items"""
@@ -95,17 +157,33 @@ class CarritoSerializer(serializers.ModelSerializer):
         fields = ['id', 'cliente', 'fecha_creacion', 'fecha_modificacion', 'items', 'total_items', 'total_precio']
         read_only_fields = ['cliente', 'fecha_creacion', 'fecha_modificacion']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Anotar los totales (calculados en la base de datos) y precargar los items.
+        El número de consultas no depende de la cantidad de items.
+        """
+        items = ItemCarritoSerializer.setup_eager_loading(ItemCarrito.objects.order_by('id'))
+        return queryset.annotate(**expresiones_totales('items__')).prefetch_related(
+            Prefetch('items', queryset=items)
+        )
+    
+    def _totales(self, obj):
+        """Totales anotados por setup_eager_loading; si faltan, un único aggregate"""
+        if not hasattr(obj, 'total_precio'):
+            totales = calcular_totales(ItemCarrito.objects.filter(carrito=obj))
+            obj.total_items = totales['total_items']
+            obj.total_precio = totales['total_precio']
+        # SQLite suma los decimales como float; en PostgreSQL es exacto
+        return obj.total_items, obj.total_precio.quantize(CENTAVOS)
+    
     def get_total_items(self, obj):
         """Cuenta total de items en el carrito (suma de cantidades)"""
-        total = sum(item.cantidad for item in obj.items.all())
-        return total
+        return self._totales(obj)[0]
     
     def get_total_precio(self, obj):
         """Calcula el precio total del carrito"""
-        total = 0
-        for item in obj.items.all():
-            total += float(item.cantidad * item.producto_variante.precio_unitario)
-        return float(total)
+        return self._totales(obj)[1]
 
 class AgregarItemCarritoSerializer(serializers.Serializer):
     """Serializer para agregar items al carrito"""
@@ -119,11 +197,25 @@ class AgregarItemCarritoSerializer(serializers.Serializer):
     
     def validate_producto_variante_id(self, value):
         try:
-            producto = Producto_Variantes.objects.get(id=value)
-            # Nota: Validación de stock desactivada porque el modelo no tiene ese campo
-            # TODO: Agregar campo 'stock' a Producto_Variantes o implementar lógica con Inventario
-            # if not producto.stock or producto.stock <= 0:
-            #     raise serializers.ValidationError("Producto sin stock disponible")
+            producto = Producto_Variantes.objects.select_related('Inventario_id').get(id=value)
+            # Chequeo rápido; la garantía real la da la reserva atómica en la vista
+            if producto.Inventario_id and producto.Inventario_id.stock <= 0:
+                raise serializers.ValidationError("Producto sin stock disponible")
             return value
         except Producto_Variantes.DoesNotExist:
-            raise serializers.ValidationError("Producto no encontrado")
\ No newline at end of file
+            raise serializers.ValidationError("Producto no encontrado")
+
+class CheckoutSerializer(serializers.Serializer):
+    """Datos para convertir el carrito en pedido (los montos se calculan en el servidor)"""
+    # Obligatoria: es lo que asocia el pedido al cliente
+    direccion_envio = serializers.PrimaryKeyRelatedField(queryset=Direccion_Envio.objects.all())
+    metodo_pago = serializers.PrimaryKeyRelatedField(queryset=Metodo_Pago.objects.all(), required=False, allow_null=True)
+    costo_envio = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=0)
+    nota = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    tipo_pedido = serializers.ChoiceField(choices=TIPO_PEDIDO, required=False, default='online')
+    transaccion_id = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    
+    def validate_costo_envio(self, value):
+        if value < 0:
+            raise serializers.ValidationError("El costo de envío no puede ser negativo")
+        return value
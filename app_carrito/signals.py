@@ -0,0 +1,17 @@
+"""
+Señales de app_carrito.
+Al eliminar un Carrito (directamente o en cascada desde su Cliente) se
+devuelve al inventario el stock de sus reservas activas antes de que la
+cascada borre las filas de ReservaStock.
+"""
+from django.db.models.signals import pre_delete
+
+from .models import Carrito
+from .reservas import liberar_carrito
+
+
+def liberar_reservas_carrito(sender, instance, **kwargs):
+    liberar_carrito(instance)
+
+
+pre_delete.connect(liberar_reservas_carrito, sender=Carrito, dispatch_uid='carrito_liberar_reservas')
@@ -1,3 +1,235 @@
-from django.test import TestCase
+import threading
+from datetime import date
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app_Cliente.models import Cliente, Direccion_Envio
+from app_pedidos.models import Pedido
+from app_productos.models import Inventario, Producto, Producto_Variantes
+from app_productos.stock import StockInsuficiente
+from .models import Carrito, ItemCarrito, ReservaStock
+from .reservas import reservar_item
+
+
+def crear_carrito(nombre='cliente'):
+    usuario = User.objects.create_user(nombre)
+    cliente = Cliente.objects.create(telefono='1', fecha_nacimiento=date(1990, 1, 1), usuario=usuario)
+    return Carrito.objects.create(cliente=cliente)
+
+
+def crear_variante(stock):
+    inventario = Inventario.objects.create(stock=stock, stock_minimo=0, stock_maximo=10000, ubicacion_almacen='A')
+    producto = Producto.objects.create(nombre='Producto', descripcion='Descripción')
+    return Producto_Variantes.objects.create(
+        producto=producto, color='negro', talla='M', precio_unitario=10, Inventario_id=inventario
+    )
+
+
+def en_paralelo(funcion, argumentos, hilos):
+    """Ejecutar funcion(argumento) repartiendo `argumentos` entre `hilos` que arrancan juntos"""
+    inicio = threading.Barrier(hilos)
+    resultados = []
+    lock = threading.Lock()
+
+    def trabajar(parte):
+        inicio.wait()
+        try:
+            for argumento in parte:
+                try:
+                    resultado = funcion(argumento)
+                except Exception as e:
+                    resultado = e
+                with lock:
+                    resultados.append(resultado)
+        finally:
+            connection.close()
+
+    trabajadores = [threading.Thread(target=trabajar, args=(argumentos[i::hilos],)) for i in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return resultados
+
+
+class LiberarReservasAlEliminarTest(TestCase):
+    def test_eliminar_carrito_devuelve_el_stock(self):
+        variante = crear_variante(stock=10)
+        carrito = crear_carrito()
+        item = ItemCarrito.objects.create(carrito=carrito, producto_variante=variante, cantidad=4)
+        reservar_item(item, 4)
+        inventario = variante.Inventario_id
+        inventario.refresh_from_db()
+        self.assertEqual(inventario.stock, 6)
+
+        carrito.cliente.delete()
+
+        inventario.refresh_from_db()
+        self.assertEqual(inventario.stock, 10)
+        self.assertFalse(ReservaStock.objects.exists())
+
+
+def cliente_api(carrito):
+    """APIClient autenticado con un token del dueño del carrito"""
+    token = Token.objects.create(user=carrito.cliente.usuario)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def crear_direccion(cliente):
+    return Direccion_Envio.objects.create(calle='Calle 1', ciudad='Ciudad', estado='Estado',
+                                          codigo_postal='0000', Pais='País', Cliente=cliente)
+
+
+class MiCarritoConsultasTest(TestCase):
+    """mi_carrito no hace consultas por item"""
+
+    url = '/api/carrito/carritos/mi_carrito/'
+
+    def setUp(self):
+        self.carrito = crear_carrito()
+        self.client = cliente_api(self.carrito)
+
+    def agregar_items(self, cantidad):
+        ItemCarrito.objects.bulk_create([
+            ItemCarrito(carrito=self.carrito, producto_variante=crear_variante(stock=10), cantidad=1)
+            for _ in range(cantidad)
+        ])
+
+    def test_consultas_constantes(self):
+        self.agregar_items(2)
+        # La primera petición llena la caché de autenticación; se mide desde la segunda
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['carrito']['items']), 2)
+
+        self.agregar_items(198)
+        with self.assertNumQueries(len(capturadas)):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['carrito']['items']), 200)
+
+
+class CheckoutTest(TestCase):
+    url = '/api/carrito/carritos/checkout/'
+
+    def setUp(self):
+        self.carrito = crear_carrito()
+        self.direccion = crear_direccion(self.carrito.cliente)
+        self.client = cliente_api(self.carrito)
+        # Llenar la caché de autenticación antes de contar consultas
+        self.client.get('/api/carrito/carritos/mi_carrito/')
+
+    def agregar(self, variante, cantidad, reservar=True):
+        item = ItemCarrito.objects.create(carrito=self.carrito, producto_variante=variante, cantidad=cantidad)
+        if reservar:
+            reservar_item(item, cantidad)
+        return item
+
+    def checkout(self, **datos):
+        return self.client.post(self.url, {'direccion_envio': self.direccion.pk, **datos}, format='json')
+
+    def stock(self, variante):
+        return Inventario.objects.get(pk=variante.Inventario_id_id).stock
+
+    def test_descuenta_stock_y_confirma_reservas(self):
+        reservada = crear_variante(stock=10)
+        sin_reserva = crear_variante(stock=10)
+        self.agregar(reservada, 3)
+        self.agregar(sin_reserva, 2, reservar=False)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.items.count(), 2)
+        self.assertEqual(pedido.monto_total, 50)
+        self.assertEqual(self.stock(reservada), 7)
+        self.assertEqual(self.stock(sin_reserva), 8)
+        self.assertEqual(list(ReservaStock.objects.values_list('estado', flat=True)), ['confirmada'])
+        self.assertFalse(ItemCarrito.objects.filter(carrito=self.carrito).exists())
+
+    def test_consultas_constantes(self):
+        # El primer pedido del día crea la fila del resumen diario: no se mide
+        self.agregar(crear_variante(stock=10), 1)
+        self.assertEqual(self.checkout().status_code, 201)
+
+        for _ in range(4):
+            self.agregar(crear_variante(stock=10), 2)
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self.checkout().status_code, 201)
+
+        for _ in range(40):
+            self.agregar(crear_variante(stock=10), 2)
+        with self.assertNumQueries(len(capturadas)):
+            response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Pedido.objects.get(pk=response.data['pedido']['id']).items.count(), 40)
+
+    def test_stock_insuficiente_revierte_todo(self):
+        suficiente = crear_variante(stock=10)
+        escasa = crear_variante(stock=1)
+        self.agregar(suficiente, 3)
+        self.agregar(escasa, 5, reservar=False)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(self.stock(suficiente), 7)
+        self.assertEqual(self.stock(escasa), 1)
+        self.assertEqual(ItemCarrito.objects.filter(carrito=self.carrito).count(), 2)
+        self.assertEqual(list(ReservaStock.objects.values_list('estado', flat=True)), ['activa'])
+
+    def test_carrito_vacio(self):
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pedido.objects.exists())
+
+    def test_direccion_obligatoria_y_del_cliente(self):
+        self.agregar(crear_variante(stock=10), 1)
+        ajena = crear_direccion(crear_carrito('otro').cliente)
+
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+        self.assertEqual(self.checkout(direccion_envio=ajena.pk).status_code, 400)
+        self.assertFalse(Pedido.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila de PostgreSQL')
+class ReservasConcurrentesTest(TransactionTestCase):
+    def test_reservas_paralelas_nunca_dejan_stock_negativo(self):
+        stock = 50
+        variante = crear_variante(stock=stock)
+        carrito = crear_carrito()
+        items = ItemCarrito.objects.bulk_create([
+            ItemCarrito(carrito=carrito, producto_variante=variante, cantidad=1) for _ in range(200)
+        ])
+
+        resultados = en_paralelo(lambda item: reservar_item(item, 1), items, hilos=20)
+
+        inventario = Inventario.objects.get(pk=variante.Inventario_id_id)
+        reservas = [r for r in resultados if isinstance(r, ReservaStock)]
+        rechazos = [r for r in resultados if isinstance(r, StockInsuficiente)]
+        self.assertEqual(len(reservas), stock)
+        self.assertEqual(len(rechazos), len(items) - stock)
+        self.assertEqual(inventario.stock, 0)
+        self.assertEqual(ReservaStock.objects.filter(estado='activa').count(), stock)
+
+    def test_primera_reserva_concurrente_del_mismo_item(self):
+        variante = crear_variante(stock=100)
+        item = ItemCarrito.objects.create(carrito=crear_carrito(), producto_variante=variante, cantidad=3)
+
+        resultados = en_paralelo(lambda _: reservar_item(item, 3), list(range(10)), hilos=10)
+
+        self.assertFalse([r for r in resultados if isinstance(r, Exception)])
+        self.assertEqual(ReservaStock.objects.filter(item=item).count(), 1)
+        self.assertEqual(Inventario.objects.get(pk=variante.Inventario_id_id).stock, 97)
@@ -2,6 +2,8 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Proveedor, compra
+from .recepcion import CompraNoRecibible, recibir_compra
+from project_ecommerce.pagination import KeysetPagination
 from .serializers import ProveedorSerializer, CompraSerializer
 
 class ProveedorViewSet(viewsets.ModelViewSet):
@@ -12,16 +14,14 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    ordering = ('id',)
     
     def list(self, request, *args, **kwargs):
-        """Listar todos los proveedores"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'proveedores': serializer.data
-        })
+        """Listar proveedores (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return Response(self.paginator.get_envelope('proveedores', serializer.data))
     
     def create(self, request, *args, **kwargs):
         """Crear un nuevo proveedor"""
@@ -84,16 +84,14 @@ class CompraViewSet(viewsets.ModelViewSet):
     queryset = compra.objects.all()
     serializer_class = CompraSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-fecha_compra', 'id')  # Más recientes primero
     
     def list(self, request, *args, **kwargs):
-        """Listar todas las compras"""
-        queryset = self.get_queryset().order_by('-fecha_compra')  # Más recientes primero
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'compras': serializer.data
-        })
+        """Listar compras (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return Response(self.paginator.get_envelope('compras', serializer.data))
     
     def create(self, request, *args, **kwargs):
         """Crear una nueva compra"""
@@ -159,4 +157,30 @@ class CompraViewSet(viewsets.ModelViewSet):
             'estado': estado,
             'count': compras_filtradas.count(),
             'compras': serializer.data
-        })
\ No newline at end of file
+        })
+    
+    @action(detail=True, methods=['post'])
+    def recibir(self, request, pk=None):
+        """
+        Recibir la mercadería de la compra: suma sus líneas al stock en una
+        transacción y registra los movimientos (ver recepcion.py)
+        """
+        try:
+            resumen = recibir_compra(pk)
+        except compra.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Compra no encontrada'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except CompraNoRecibible as e:
+            return Response({
+                'success': False,
+                'message': str(e),
+                'detalle': e.detalle
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': 'Compra recibida exitosamente',
+            'recepcion': resumen
+        })
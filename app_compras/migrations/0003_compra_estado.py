@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_compras', '0002_remove_compra_estado_compra_proveedor_compra_notas_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compra',
+            name='estado',
+            field=models.CharField(choices=[('confirmado', 'confirmado'), ('recibido', 'recibido'), ('cancelado', 'cancelado')], default='confirmado', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='compra',
+            name='fecha_recepcion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -8,9 +8,18 @@ class Proveedor(models.Model):
     email = models.EmailField()
     direccion = models.CharField(max_length=200)
 
+ESTADOS_COMPRA = [
+    ('confirmado', 'confirmado'),
+    ('recibido', 'recibido'),
+    ('cancelado', 'cancelado'),
+]
+
 class compra(models.Model):
     fecha_compra = models.DateField(auto_now_add=True)
     monto_total = models.DecimalField(max_digits=10, decimal_places=2)
     Proveedor = models.ForeignKey(Proveedor, on_delete=models.CASCADE , null=True)
     numero_compra = models.CharField(max_length=50, unique=True , null=True)
     notas = models.TextField(blank=True, null=True)
+    # 'recibido' solo se asigna al recibir la mercadería (ver recepcion.py)
+    estado = models.CharField(max_length=50, choices=ESTADOS_COMPRA, default='confirmado')
+    fecha_recepcion = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,109 @@
+"""
+Recepción de compras: ingresa al inventario la mercadería de una compra.
+
+Todo ocurre en una transacción y con una cantidad fija de consultas, sin
+importar cuántas líneas tenga la compra:
+    1. bloqueo de la compra (SELECT ... FOR UPDATE)
+    2. UPDATE de item_compras.costo_total = cantidad * costo_unitario
+    3. lectura de las líneas con el inventario de su variante
+    4. un único UPDATE de Inventario: stock += suma de las líneas (subconsulta)
+    5. bulk_create de los MovimientoStock (uno por línea)
+    6. UPDATE de la compra (estado, fecha_recepcion, monto_total)
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from app_productos import alertas, cache
+from app_productos.models import Inventario, MovimientoStock, item_compras
+from .models import compra
+
+
+class CompraNoRecibible(Exception):
+    """La compra no puede recibirse (ya recibida, cancelada, sin líneas o con variantes sin inventario)"""
+
+    def __init__(self, mensaje, detalle=None):
+        self.detalle = detalle
+        super().__init__(mensaje)
+
+
+def recibir_compra(compra_id):
+    """
+    Recibir la compra `compra_id`: suma las cantidades de sus líneas al stock
+    de los inventarios, recalcula los costos y registra los movimientos.
+    Retorna un resumen; lanza compra.DoesNotExist o CompraNoRecibible.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        compra_obj = compra.objects.select_for_update().get(pk=compra_id)
+        if compra_obj.estado != 'confirmado':
+            raise CompraNoRecibible(f"La compra está en estado '{compra_obj.estado}' y no puede recibirse")
+
+        lineas_compra = item_compras.objects.filter(compra_id=compra_id, cantidad__gt=0)
+        lineas_compra.filter(costo_unitario__isnull=False).update(
+            costo_total=ExpressionWrapper(
+                F('cantidad') * F('costo_unitario'),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            )
+        )
+
+        lineas = list(lineas_compra.order_by('id').values(
+            'id', 'producto_variante_id', 'cantidad', 'costo_total',
+            inventario_id=F('producto_variante__Inventario_id')
+        ))
+        if not lineas:
+            raise CompraNoRecibible('La compra no tiene líneas con cantidad para recibir')
+        sin_inventario = sorted({l['producto_variante_id'] for l in lineas if l['inventario_id'] is None})
+        if sin_inventario:
+            raise CompraNoRecibible(
+                'Hay variantes sin inventario asignado',
+                detalle={'variantes_sin_inventario': sin_inventario}
+            )
+
+        # Un solo UPDATE para todos los inventarios: cada fila suma sus propias líneas
+        recibido = (
+            lineas_compra.filter(producto_variante__Inventario_id=OuterRef('pk'))
+            .order_by()
+            .values('producto_variante__Inventario_id')
+            .annotate(total=Sum('cantidad'))
+            .values('total')
+        )
+        inventario_ids = {l['inventario_id'] for l in lineas}
+        Inventario.objects.filter(pk__in=inventario_ids).update(
+            stock=F('stock') + Coalesce(Subquery(recibido, output_field=IntegerField()), 0),
+            ultima_actualizacion=ahora
+        )
+
+        referencia = f'compra:{compra_id}'
+        MovimientoStock.objects.bulk_create([
+            MovimientoStock(
+                inventario_id=linea['inventario_id'],
+                producto_variante_id=linea['producto_variante_id'],
+                tipo='compra',
+                cantidad=linea['cantidad'],
+                referencia=referencia,
+                fecha=ahora,
+            )
+            for linea in lineas
+        ], batch_size=1000)
+        alertas.programar(inventario_ids)
+
+        monto_total = sum((l['costo_total'] for l in lineas if l['costo_total'] is not None), Decimal('0'))
+        cambios = {'estado': 'recibido', 'fecha_recepcion': ahora}
+        if monto_total:
+            cambios['monto_total'] = monto_total
+        compra.objects.filter(pk=compra_id).update(**cambios)
+
+    # El catálogo muestra el stock de las variantes
+    cache.invalidar()
+    return {
+        'compra_id': compra_obj.pk,
+        'lineas': len(lineas),
+        'unidades': sum(l['cantidad'] for l in lineas),
+        'inventarios_actualizados': len(inventario_ids),
+        'monto_total': cambios.get('monto_total', compra_obj.monto_total),
+        'fecha_recepcion': ahora,
+    }
@@ -25,11 +25,20 @@ class CompraSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = compra
-        fields = ['id', 'fecha_compra', 'monto_total', 'estado']
-        read_only_fields = ['fecha_compra']  # La fecha se asigna automáticamente
+        fields = ['id', 'fecha_compra', 'monto_total', 'estado', 'fecha_recepcion']
+        read_only_fields = ['fecha_compra', 'fecha_recepcion']  # La fecha se asigna automáticamente
     
     def validate_monto_total(self, value):
         """Validar que el monto sea positivo"""
         if value <= 0:
             raise serializers.ValidationError("El monto total debe ser mayor a 0")
-        return value
\ No newline at end of file
+        return value
+    
+    def validate_estado(self, value):
+        """'recibido' solo se asigna con la acción recibir (mueve el stock)"""
+        actual = self.instance.estado if self.instance else None
+        if value == 'recibido' and actual != 'recibido':
+            raise serializers.ValidationError("Use la acción recibir para marcar la compra como recibida")
+        if actual == 'recibido' and value != 'recibido':
+            raise serializers.ValidationError("Una compra recibida no puede cambiar de estado")
+        return value
@@ -1,3 +1,99 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app_productos.models import Categoria, Inventario, MovimientoStock, Producto, Producto_Variantes, item_compras
+from .models import compra
+from .recepcion import CompraNoRecibible, recibir_compra
+
+
+class RecepcionCompraTest(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        self.producto = Producto.objects.create(nombre='Remera', descripcion='', Categoria=categoria)
+        self.numero = 0
+
+    def variante(self, stock=5, con_inventario=True):
+        self.numero += 1
+        inventario = Inventario.objects.create(
+            stock=stock, stock_minimo=0, stock_maximo=100, ubicacion_almacen='A'
+        ) if con_inventario else None
+        return Producto_Variantes.objects.create(producto=self.producto, color=f'color {self.numero}', talla='M',
+                                                 precio_unitario=10, Inventario_id=inventario)
+
+    def compra(self, *lineas, estado='confirmado'):
+        compra_obj = compra.objects.create(monto_total=0, estado=estado)
+        item_compras.objects.bulk_create([
+            item_compras(compra=compra_obj, producto_variante=variante, cantidad=cantidad,
+                         costo_unitario=Decimal('2.50'))
+            for variante, cantidad in lineas
+        ])
+        return compra_obj
+
+    def test_suma_stock_y_registra_movimientos(self):
+        remera, pantalon = self.variante(stock=5), self.variante(stock=0)
+        compra_obj = self.compra((remera, 3), (pantalon, 4), (remera, 2))
+
+        resumen = recibir_compra(compra_obj.pk)
+
+        self.assertEqual((resumen['lineas'], resumen['unidades'], resumen['inventarios_actualizados']), (3, 9, 2))
+        self.assertEqual(resumen['monto_total'], Decimal('22.50'))
+        self.assertEqual(Inventario.objects.get(pk=remera.Inventario_id_id).stock, 10)
+        self.assertEqual(Inventario.objects.get(pk=pantalon.Inventario_id_id).stock, 4)
+        self.assertEqual(
+            sorted(MovimientoStock.objects.filter(tipo='compra').values_list(
+                'producto_variante_id', 'tipo', 'cantidad', 'referencia'
+            )),
+            sorted([
+                (remera.pk, 'compra', 3, f'compra:{compra_obj.pk}'),
+                (pantalon.pk, 'compra', 4, f'compra:{compra_obj.pk}'),
+                (remera.pk, 'compra', 2, f'compra:{compra_obj.pk}'),
+            ])
+        )
+        compra_obj.refresh_from_db()
+        self.assertEqual((compra_obj.estado, compra_obj.monto_total), ('recibido', Decimal('22.50')))
+        self.assertIsNotNone(compra_obj.fecha_recepcion)
+
+    def test_consultas_constantes(self):
+        chica = self.compra(*[(self.variante(), 1) for _ in range(2)])
+        grande = self.compra(*[(self.variante(), 1) for _ in range(20)])
+
+        with CaptureQueriesContext(connection) as capturadas:
+            recibir_compra(chica.pk)
+        with self.assertNumQueries(len(capturadas)):
+            recibir_compra(grande.pk)
+
+    def test_solo_compras_confirmadas(self):
+        compra_obj = self.compra((self.variante(), 1), estado='cancelado')
+        with self.assertRaises(CompraNoRecibible):
+            recibir_compra(compra_obj.pk)
+
+        compra_obj = self.compra((self.variante(), 1))
+        recibir_compra(compra_obj.pk)
+        with self.assertRaises(CompraNoRecibible):
+            recibir_compra(compra_obj.pk)
+        self.assertEqual(MovimientoStock.objects.filter(tipo='compra').count(), 1)
+
+    def test_api_rechaza_variantes_sin_inventario(self):
+        sin_inventario = self.variante(con_inventario=False)
+        con_inventario = self.variante(stock=5)
+        compra_obj = self.compra((con_inventario, 3), (sin_inventario, 1))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('compras'))
+
+        response = client.post(f'/api/compras/compras/{compra_obj.pk}/recibir/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detalle'], {'variantes_sin_inventario': [sin_inventario.pk]})
+        self.assertEqual(Inventario.objects.get(pk=con_inventario.Inventario_id_id).stock, 5)
+        self.assertFalse(MovimientoStock.objects.filter(tipo='compra').exists())
+        self.assertEqual(compra.objects.get(pk=compra_obj.pk).estado, 'confirmado')
 
-# Create your tests here.
+        self.assertEqual(client.post(f'/api/compras/compras/{compra_obj.pk}/recibir/').status_code, 400)
+        compra_obj = self.compra((con_inventario, 1), estado='recibido')
+        self.assertEqual(client.post(f'/api/compras/compras/{compra_obj.pk}/recibir/').status_code, 400)
+        self.assertEqual(client.post('/api/compras/compras/999/recibir/').status_code, 404)
@@ -0,0 +1,208 @@
+"""
+Analítica de ventas sobre item_pedido, Pedido y Producto_Variantes.
+
+- series(): pedidos, ingresos y unidades por día, semana o mes
+- top_variantes(): las N variantes más vendidas por unidades o ingresos
+- por_categoria(): ingresos por categoría y su participación
+
+Pedidos e ingresos por periodo salen del resumen diario (ResumenDiarioPedidos);
+las unidades y los desgloses por variante/categoría agregan item_pedido, que
+tiene un índice cubriente para poder resolverse sin leer la tabla.
+
+Los resultados se guardan en caché con un TTL explícito: largo cuando el
+rango ya cerró (ANALITICA_TTL_HISTORICO) y corto si incluye el día de hoy
+(ANALITICA_TTL_RECIENTE). Los pedidos nuevos son de hoy, así que no
+invalidan nada: los rangos que incluyen hoy se refrescan al vencer su TTL
+corto. Solo los cambios que tocan un día cerrado (editar o eliminar un
+pedido viejo o sus items) incrementan la versión de las claves, al
+confirmarse la transacción (ver signals.py).
+"""
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from app_productos.models import Producto_Variantes, item_pedido
+from .models import ResumenDiarioPedidos
+
+ESTADOS_EXCLUIDOS = ('cancelado',)
+
+AGRUPACIONES = {
+    'dia': TruncDay,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+CLAVE_VERSION = 'analitica:version'
+
+IMPORTE = ExpressionWrapper(
+    Coalesce('subtotal', F('cantidad') * F('precio_unitario')),
+    output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+# ----------------------------------------------------------------------
+# Caché
+# ----------------------------------------------------------------------
+def get_cache():
+    return caches[getattr(settings, 'ANALITICA_CACHE_ALIAS', 'default')]
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar():
+    cache = get_cache()
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+
+
+def es_historico(fecha):
+    """El día ya cerró: sus resultados se cachean con el TTL largo"""
+    return fecha < timezone.now().date()
+
+
+def invalidar_si_historico(*fechas):
+    """Invalidar (al confirmar la transacción) si algún cambio toca un día cerrado"""
+    if any(fecha is not None and es_historico(fecha) for fecha in fechas):
+        transaction.on_commit(invalidar, robust=True)
+
+
+def _ttl(hasta):
+    if es_historico(hasta):
+        return getattr(settings, 'ANALITICA_TTL_HISTORICO', 60 * 60 * 24)
+    return getattr(settings, 'ANALITICA_TTL_RECIENTE', 60)
+
+
+def cacheado(nombre, desde, hasta, calcular, **parametros):
+    """Devolver el resultado en caché o calcularlo y guardarlo con el TTL que corresponde"""
+    parametros.update(desde=desde, hasta=hasta)
+    partes = '&'.join(f'{k}={v}' for k, v in sorted(parametros.items()))
+    digest = hashlib.sha1(partes.encode('utf-8')).hexdigest()
+    clave = f'analitica:v{get_version()}:{nombre}:{digest}'
+    cache = get_cache()
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular()
+        cache.set(clave, resultado, timeout=_ttl(hasta))
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# Consultas
+# ----------------------------------------------------------------------
+def rango_por_defecto(desde=None, hasta=None, dias=90):
+    hasta = hasta or timezone.now().date()
+    desde = desde or hasta - timedelta(days=dias)
+    return desde, hasta
+
+
+def _items(desde, hasta):
+    return item_pedido.objects.filter(
+        pedido__fecha_pedido__gte=desde,
+        pedido__fecha_pedido__lte=hasta
+    ).exclude(pedido__estado__in=ESTADOS_EXCLUIDOS).order_by()
+
+
+def series(desde, hasta, agrupar='dia'):
+    """Serie temporal [{periodo, pedidos, ingresos, unidades}] ordenada por periodo"""
+    truncar = AGRUPACIONES[agrupar]
+
+    def calcular():
+        pedidos = (
+            ResumenDiarioPedidos.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+            .exclude(estado__in=ESTADOS_EXCLUIDOS)
+            .annotate(periodo=truncar('fecha'))
+            .values('periodo')
+            .annotate(pedidos=Sum('cantidad'), ingresos=Sum('monto_total'))
+            .order_by()
+        )
+        unidades = (
+            _items(desde, hasta)
+            .annotate(periodo=truncar('pedido__fecha_pedido'))
+            .values('periodo')
+            .annotate(unidades=Sum('cantidad'))
+        )
+        filas = {}
+        for fila in pedidos:
+            filas[fila['periodo']] = {
+                'periodo': fila['periodo'],
+                'pedidos': fila['pedidos'] or 0,
+                'ingresos': fila['ingresos'] or Decimal('0'),
+                'unidades': 0,
+            }
+        for fila in unidades:
+            filas.setdefault(fila['periodo'], {
+                'periodo': fila['periodo'], 'pedidos': 0, 'ingresos': Decimal('0'), 'unidades': 0
+            })['unidades'] = fila['unidades'] or 0
+        return [filas[periodo] for periodo in sorted(filas)]
+
+    return cacheado('series', desde, hasta, calcular, agrupar=agrupar)
+
+
+def top_variantes(desde, hasta, por='unidades', limite=10):
+    """Las `limite` variantes más vendidas ordenadas por unidades o ingresos"""
+    orden = 'ingresos' if por == 'ingresos' else 'unidades'
+
+    def calcular():
+        filas = list(
+            _items(desde, hasta)
+            .values('Producto_variante_id')
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum(IMPORTE), pedidos=Count('pedido_id', distinct=True))
+            .order_by(f'-{orden}', 'Producto_variante_id')[:limite]
+        )
+        variantes = Producto_Variantes.objects.select_related('producto').in_bulk(
+            [fila['Producto_variante_id'] for fila in filas]
+        )
+        resultado = []
+        for fila in filas:
+            variante = variantes.get(fila['Producto_variante_id'])
+            resultado.append({
+                'variante_id': fila['Producto_variante_id'],
+                'producto_id': variante.producto_id if variante else None,
+                'producto': variante.producto.nombre if variante else None,
+                'color': variante.color if variante else None,
+                'talla': variante.talla if variante else None,
+                'unidades': fila['unidades'] or 0,
+                'ingresos': fila['ingresos'] or Decimal('0'),
+                'pedidos': fila['pedidos'],
+            })
+        return resultado
+
+    return cacheado('top_variantes', desde, hasta, calcular, por=orden, limite=limite)
+
+
+def por_categoria(desde, hasta):
+    """Ingresos y unidades por categoría con su participación sobre el total"""
+
+    def calcular():
+        filas = list(
+            _items(desde, hasta)
+            .values(
+                categoria_id=F('Producto_variante__producto__Categoria_id'),
+                categoria=F('Producto_variante__producto__Categoria__nombre')
+            )
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum(IMPORTE))
+            .order_by('-ingresos')
+        )
+        total = sum((fila['ingresos'] or Decimal('0') for fila in filas), Decimal('0'))
+        for fila in filas:
+            fila['ingresos'] = fila['ingresos'] or Decimal('0')
+            fila['participacion'] = round(float(fila['ingresos'] / total), 4) if total else 0
+        return {'total_ingresos': total, 'categorias': filas}
+
+    return cacheado('por_categoria', desde, hasta, calcular)
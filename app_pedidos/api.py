@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,10 +7,15 @@ from django.db.models import Q, Sum, Count
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Pedido
+from . import analitica, resumenes
 from .serializers import PedidoSerializer, PedidoCreateSerializer
 from app_Cliente.models import Cliente
+from project_ecommerce import exportacion
+from project_ecommerce.pagination import KeysetPagination
 import uuid
 
+logger = logging.getLogger(__name__)
+
 class PedidoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar pedidos
@@ -17,6 +24,8 @@ class PedidoViewSet(viewsets.ModelViewSet):
     queryset = Pedido.objects.all()
     serializer_class = PedidoSerializer
     permission_classes = [permissions.AllowAny]  # Cambiar a IsAuthenticated en producción
+    pagination_class = KeysetPagination
+    ordering = ('-fecha_pedido', 'id')
     
     def get_serializer_class(self):
         """Usar diferentes serializers según la acción"""
@@ -57,27 +66,46 @@ class PedidoViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def get_resumen(self):
+        """
+        Estadísticas desde el resumen diario (tabla pequeña) para los filtros
+        que este soporta; None si hay un filtro que obliga a agregar sobre Pedido.
+        """
+        params = self.request.query_params
+        if params.get('numero_pedido'):
+            return None
+        return resumenes.estadisticas(
+            estado=params.get('estado'),
+            tipo_pedido=params.get('tipo_pedido'),
+            fecha_desde=params.get('fecha_desde'),
+            fecha_hasta=params.get('fecha_hasta')
+        )
+    
     def list(self, request, *args, **kwargs):
         """Listar todos los pedidos con información completa y estadísticas"""
+        # Fuera del try: un cursor inválido es un 404 de la paginación, no un 500
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
         try:
-            queryset = self.get_queryset()
-            serializer = PedidoSerializer(queryset, many=True)
+            serializer = PedidoSerializer(page, many=True)
             
-            # Calcular estadísticas
-            total_monto = queryset.aggregate(Sum('monto_total'))['monto_total__sum'] or 0
-            estadisticas_estado = queryset.values('estado').annotate(count=Count('id'))
+            # Estadísticas desde el resumen diario (o agregando si el filtro no lo permite)
+            resumen = self.get_resumen()
+            if resumen is not None:
+                total_monto = resumen['monto_total']
+                estadisticas_estado = [
+                    {'estado': fila['estado'], 'count': fila['cantidad']} for fila in resumen['por_estado']
+                ]
+            else:
+                total_monto = queryset.aggregate(Sum('monto_total'))['monto_total__sum'] or 0
+                estadisticas_estado = queryset.values('estado').annotate(count=Count('id'))
             
-            return Response({
-                'success': True,
-                'count': queryset.count(),
-                'total_monto': float(total_monto),
-                'estadisticas_estado': list(estadisticas_estado),
-                'pedidos': serializer.data
-            })
+            data = self.paginator.get_envelope('pedidos', serializer.data)
+            data['total_monto'] = float(total_monto)
+            data['estadisticas_estado'] = list(estadisticas_estado)
+            return Response(data)
         except Exception as e:
-            print(f"❌ Error en list: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en list (pedidos)')
             return Response({
                 'success': False,
                 'message': str(e),
@@ -118,9 +146,7 @@ class PedidoViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
-            print(f"❌ Error en create: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en create (pedidos)')
             return Response({
                 'success': False,
                 'message': str(e)
@@ -226,6 +252,24 @@ class PedidoViewSet(viewsets.ModelViewSet):
     def estadisticas(self, request):
         """Obtener estadísticas generales de pedidos"""
         try:
+            resumen = self.get_resumen()
+            if resumen is not None:
+                total_pedidos = resumen['total_pedidos']
+                monto_total_general = resumen['monto_total']
+                promedio_pedido = float(monto_total_general) / total_pedidos if total_pedidos > 0 else 0
+                return Response({
+                    'success': True,
+                    'estadisticas': {
+                        'total_pedidos': total_pedidos,
+                        'monto_total': float(monto_total_general),
+                        'promedio_pedido': round(promedio_pedido, 2),
+                        'pedidos_ultimos_7_dias': resumen['pedidos_ultimos_7_dias'],
+                        'por_estado': resumen['por_estado'],
+                        'por_tipo': resumen['por_tipo']
+                    }
+                })
+            
+            # Filtro no soportado por el resumen: agregar sobre Pedido
             queryset = self.get_queryset()
             
             # Estadísticas por estado
@@ -261,12 +305,20 @@ class PedidoViewSet(viewsets.ModelViewSet):
                 }
             })
         except Exception as e:
-            print(f"❌ Error en estadisticas: {e}")
+            logger.exception('Error en estadisticas (pedidos)')
             return Response({
                 'success': False,
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def exportar(self, request):
+        """
+        Exportar los pedidos filtrados en streaming (CSV o NDJSON, opcional gzip).
+        Acepta los mismos filtros que el listado.
+        """
+        return exportacion.respuesta(request, 'pedidos', base=self.get_queryset)
+    
     @action(detail=False, methods=['get'])
     def pendientes(self, request):
         """Obtener todos los pedidos pendientes"""
@@ -282,10 +334,10 @@ class PedidoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def por_cliente(self, request):
         """
-        Obtener pedidos relacionados con un cliente
+        Obtener pedidos relacionados con un cliente (por defecto, el autenticado)
         Nota: Busca a través de direccion_envio que tiene relación con cliente
         """
-        cliente_id = request.query_params.get('cliente_id')
+        cliente_id = request.query_params.get('cliente_id') or request.cliente_actual.cliente_id
         
         if not cliente_id:
             return Response({
@@ -296,7 +348,7 @@ class PedidoViewSet(viewsets.ModelViewSet):
         try:
             # Buscar pedidos que tengan direccion_envio asociada a ese cliente
             pedidos_cliente = self.queryset.filter(
-                direccion_envio__cliente_id=cliente_id
+                direccion_envio__Cliente_id=cliente_id
             ).order_by('-fecha_pedido')
             
             serializer = PedidoSerializer(pedidos_cliente, many=True)
@@ -308,7 +360,7 @@ class PedidoViewSet(viewsets.ModelViewSet):
                 'pedidos': serializer.data
             })
         except Exception as e:
-            print(f"❌ Error en por_cliente: {e}")
+            logger.exception('Error en por_cliente (pedidos)')
             return Response({
                 'success': False,
                 'message': str(e),
@@ -345,3 +397,98 @@ class PedidoViewSet(viewsets.ModelViewSet):
             'message': f'Estado cambiado a "{nuevo_estado}"',
             'pedido': serializer.data
         })
+
+
+class AnaliticaVentasViewSet(viewsets.ViewSet):
+    """
+    Analítica de ventas para el panel de administración (ver analitica.py).
+    Parámetros comunes: fecha_desde, fecha_hasta (YYYY-MM-DD, por defecto
+    los últimos 90 días).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_rango(self, request):
+        """(desde, hasta) a partir de los query params; ValueError si el formato no es válido"""
+        desde = request.query_params.get('fecha_desde')
+        hasta = request.query_params.get('fecha_hasta')
+        desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+        hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+        desde, hasta = analitica.rango_por_defecto(desde, hasta)
+        if desde > hasta:
+            raise ValueError('fecha_desde no puede ser posterior a fecha_hasta')
+        return desde, hasta
+
+    def error_parametros(self, e):
+        return Response({
+            'success': False,
+            'message': f'Parámetros inválidos: {e}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def ventas(self, request):
+        """Serie de pedidos, ingresos y unidades. ?agrupar=dia|semana|mes"""
+        agrupar = request.query_params.get('agrupar', 'dia')
+        try:
+            desde, hasta = self.get_rango(request)
+            if agrupar not in analitica.AGRUPACIONES:
+                raise ValueError(f"agrupar debe ser uno de: {', '.join(analitica.AGRUPACIONES)}")
+        except ValueError as e:
+            return self.error_parametros(e)
+
+        serie = analitica.series(desde, hasta, agrupar)
+        return Response({
+            'success': True,
+            'desde': desde,
+            'hasta': hasta,
+            'agrupar': agrupar,
+            'totales': {
+                'pedidos': sum(fila['pedidos'] for fila in serie),
+                'ingresos': float(sum(fila['ingresos'] for fila in serie)),
+                'unidades': sum(fila['unidades'] for fila in serie),
+            },
+            'serie': [
+                {**fila, 'ingresos': float(fila['ingresos'])} for fila in serie
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def top_variantes(self, request):
+        """Variantes más vendidas. ?por=unidades|ingresos&limite=10 (máx. 100)"""
+        por = request.query_params.get('por', 'unidades')
+        try:
+            desde, hasta = self.get_rango(request)
+            limite = min(max(int(request.query_params.get('limite', 10)), 1), 100)
+            if por not in ('unidades', 'ingresos'):
+                raise ValueError('por debe ser unidades o ingresos')
+        except ValueError as e:
+            return self.error_parametros(e)
+
+        variantes = analitica.top_variantes(desde, hasta, por, limite)
+        return Response({
+            'success': True,
+            'desde': desde,
+            'hasta': hasta,
+            'por': por,
+            'variantes': [
+                {**fila, 'ingresos': float(fila['ingresos'])} for fila in variantes
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def categorias(self, request):
+        """Ingresos y unidades por categoría con su participación"""
+        try:
+            desde, hasta = self.get_rango(request)
+        except ValueError as e:
+            return self.error_parametros(e)
+
+        resultado = analitica.por_categoria(desde, hasta)
+        return Response({
+            'success': True,
+            'desde': desde,
+            'hasta': hasta,
+            'total_ingresos': float(resultado['total_ingresos']),
+            'categorias': [
+                {**fila, 'ingresos': float(fila['ingresos'])} for fila in resultado['categorias']
+            ]
+        })
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppPedidosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_pedidos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,41 @@
+"""
+Exporta pedidos, items de pedido o items de compras a CSV o NDJSON en
+streaming (memoria constante sin importar el tamaño de la tabla).
+
+Uso:
+    python manage.py exportar_datos pedidos --salida pedidos.csv
+    python manage.py exportar_datos items_pedido --formato ndjson --gzip --salida items.ndjson.gz
+    python manage.py exportar_datos items_compras --desde 2025-01-01 --hasta 2025-12-31 > compras.csv
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from project_ecommerce.exportacion import EXPORTACIONES, FORMATOS, escribir
+
+
+class Command(BaseCommand):
+    help = 'Exporta una tabla completa a CSV o NDJSON en streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exportacion', choices=sorted(EXPORTACIONES))
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprimir la salida con gzip')
+        parser.add_argument('--desde', type=parse_date, help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=parse_date, help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--salida', help='Archivo de destino (por defecto la salida estándar)')
+
+    def handle(self, *args, **options):
+        parametros = {
+            'formato': options['formato'],
+            'gzip': options['gzip'],
+            'desde': options['desde'],
+            'hasta': options['hasta'],
+        }
+        if not options['salida']:
+            escribir(options['exportacion'], sys.stdout.buffer, **parametros)
+            return
+        with open(options['salida'], 'wb') as destino:
+            escritos = escribir(options['exportacion'], destino, **parametros)
+        self.stderr.write(f"Exportación {options['exportacion']}: {escritos} bytes en {options['salida']}")
@@ -0,0 +1,25 @@
+"""
+Recalcula el resumen diario de pedidos (ResumenDiarioPedidos) desde la tabla Pedido.
+Normalmente se mantiene solo con las señales; sirve tras cargas masivas
+o correcciones con SQL directo.
+
+Uso:
+    python manage.py reconstruir_resumen_pedidos
+    python manage.py reconstruir_resumen_pedidos --desde 2025-01-01 --hasta 2025-01-31
+"""
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from app_pedidos.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de pedidos por estado y tipo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=parse_date, help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=parse_date, help='Fecha final (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        filas = reconstruir(desde=options['desde'], hasta=options['hasta'])
+        self.stdout.write(f'Filas de resumen generadas: {filas}')
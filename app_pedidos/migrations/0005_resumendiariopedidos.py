@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:32
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def calcular_resumen(apps, schema_editor):
+    """Poblar el resumen diario con los pedidos existentes"""
+    Pedido = apps.get_model('app_pedidos', 'Pedido')
+    ResumenDiarioPedidos = apps.get_model('app_pedidos', 'ResumenDiarioPedidos')
+    acumulado = {}
+    filas = Pedido.objects.order_by().values('fecha_pedido', 'estado', 'tipo_pedido').annotate(
+        cantidad=Count('id'),
+        monto=Sum('monto_total')
+    )
+    for fila in filas:
+        llave = (fila['fecha_pedido'], fila['estado'], fila['tipo_pedido'] or '')
+        cantidad, monto = acumulado.get(llave, (0, Decimal('0')))
+        acumulado[llave] = (cantidad + fila['cantidad'], monto + (fila['monto'] or Decimal('0')))
+    ResumenDiarioPedidos.objects.bulk_create([
+        ResumenDiarioPedidos(fecha=fecha, estado=estado, tipo_pedido=tipo, cantidad=cantidad, monto_total=monto)
+        for (fecha, estado, tipo), (cantidad, monto) in acumulado.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_pedidos', '0004_pedido_tipo_pedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioPedidos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=50)),
+                ('tipo_pedido', models.CharField(blank=True, default='', max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'estado', 'tipo_pedido'), name='resumen_pedidos_unico')],
+            },
+        ),
+        migrations.RunPython(calcular_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Cliente', '0010_alter_direccion_envio_codigo_postal'),
+        ('app_pedidos', '0005_resumendiariopedidos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido'], include=('estado', 'monto_total'), name='pedido_fecha_cubre_idx'),
+        ),
+    ]
@@ -20,3 +20,28 @@ class Pedido(models.Model):
     nota = models.TextField(null=True, blank=True)
     metodo_pago = models.ForeignKey(Metodo_Pago, on_delete=models.CASCADE , null=True)
     tipo_pedido = models.CharField(max_length=20, choices=TIPO_PEDIDO , null=True , default='online')
+
+    class Meta:
+        indexes = [
+            # Índice cubriente para la analítica por rango de fechas (ver analitica.py)
+            models.Index(fields=['fecha_pedido'], include=['estado', 'monto_total'], name='pedido_fecha_cubre_idx'),
+        ]
+
+
+class ResumenDiarioPedidos(models.Model):
+    """
+    Totales de pedidos por día, estado y tipo de pedido.
+    Se mantiene de forma incremental desde las señales de Pedido (ver
+    resumenes.py), de modo que las estadísticas leen una tabla pequeña
+    sin importar el tamaño del historial. tipo_pedido vacío = sin tipo.
+    """
+    fecha = models.DateField()
+    estado = models.CharField(max_length=50)
+    tipo_pedido = models.CharField(max_length=20, blank=True, default='')
+    cantidad = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'estado', 'tipo_pedido'], name='resumen_pedidos_unico'),
+        ]
@@ -0,0 +1,122 @@
+"""
+Resumen diario de pedidos (ResumenDiarioPedidos).
+
+Cada alta, cambio o baja de un Pedido suma o resta su aporte en la fila
+(fecha, estado, tipo_pedido) correspondiente con un UPDATE sobre F().
+Un cambio de estado mueve el pedido de una fila a otra. `reconstruir()`
+vuelve a calcular los resúmenes desde la tabla de pedidos.
+
+Solo se contabilizan los cambios que pasan por Pedido.save()/delete():
+QuerySet.update(), bulk_create(), bulk_update() y el SQL directo no emiten
+señales y dejan el resumen desfasado. Quien los use debe llamar a
+`reconstruir()` sobre el rango de fechas afectado (o correr el comando
+`reconstruir_resumen_pedidos`), como hace la siembra del benchmark.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Pedido, ResumenDiarioPedidos
+
+
+def clave(pedido):
+    """(fecha, estado, tipo_pedido, monto) con que un pedido aporta al resumen"""
+    monto = Decimal(str(pedido.monto_total)) if pedido.monto_total is not None else Decimal('0')
+    return (pedido.fecha_pedido, pedido.estado, pedido.tipo_pedido or '', monto)
+
+
+def aplicar(fecha, estado, tipo_pedido, monto, signo):
+    """Sumar (signo=1) o restar (signo=-1) un pedido en su fila del resumen"""
+    if fecha is None:
+        return
+    filtro = {'fecha': fecha, 'estado': estado, 'tipo_pedido': tipo_pedido}
+    with transaction.atomic():
+        actualizados = ResumenDiarioPedidos.objects.filter(**filtro).update(
+            cantidad=F('cantidad') + signo,
+            monto_total=F('monto_total') + signo * monto
+        )
+        if actualizados or signo < 0:
+            return
+        try:
+            with transaction.atomic():
+                ResumenDiarioPedidos.objects.create(cantidad=1, monto_total=monto, **filtro)
+        except IntegrityError:
+            # Otro proceso creó la fila en paralelo: sumar sobre ella
+            ResumenDiarioPedidos.objects.filter(**filtro).update(
+                cantidad=F('cantidad') + 1,
+                monto_total=F('monto_total') + monto
+            )
+
+
+def reconstruir(desde=None, hasta=None):
+    """Recalcular el resumen (todo o un rango de fechas). Retorna las filas creadas."""
+    pedidos = Pedido.objects.all()
+    resumenes = ResumenDiarioPedidos.objects.all()
+    if desde:
+        pedidos = pedidos.filter(fecha_pedido__gte=desde)
+        resumenes = resumenes.filter(fecha__gte=desde)
+    if hasta:
+        pedidos = pedidos.filter(fecha_pedido__lte=hasta)
+        resumenes = resumenes.filter(fecha__lte=hasta)
+
+    filas = pedidos.order_by().values('fecha_pedido', 'estado', 'tipo_pedido').annotate(
+        cantidad=Count('id'),
+        monto=Sum('monto_total')
+    )
+    acumulado = {}
+    for fila in filas:
+        # NULL y '' en tipo_pedido van a la misma fila
+        llave = (fila['fecha_pedido'], fila['estado'], fila['tipo_pedido'] or '')
+        cantidad, monto = acumulado.get(llave, (0, Decimal('0')))
+        acumulado[llave] = (cantidad + fila['cantidad'], monto + (fila['monto'] or Decimal('0')))
+
+    with transaction.atomic():
+        resumenes.delete()
+        ResumenDiarioPedidos.objects.bulk_create([
+            ResumenDiarioPedidos(fecha=fecha, estado=estado, tipo_pedido=tipo, cantidad=cantidad, monto_total=monto)
+            for (fecha, estado, tipo), (cantidad, monto) in acumulado.items()
+        ], batch_size=1000)
+    return len(acumulado)
+
+
+def estadisticas(estado=None, tipo_pedido=None, fecha_desde=None, fecha_hasta=None):
+    """Estadísticas generales de pedidos leídas del resumen diario"""
+    resumenes = ResumenDiarioPedidos.objects.filter(cantidad__gt=0)
+    if estado:
+        resumenes = resumenes.filter(estado__icontains=estado)
+    if tipo_pedido:
+        resumenes = resumenes.filter(tipo_pedido=tipo_pedido)
+    if fecha_desde:
+        resumenes = resumenes.filter(fecha__gte=fecha_desde)
+    if fecha_hasta:
+        resumenes = resumenes.filter(fecha__lte=fecha_hasta)
+
+    filas = list(resumenes.values('fecha', 'estado', 'tipo_pedido', 'cantidad', 'monto_total'))
+    hace_7_dias = timezone.now().date() - timedelta(days=7)
+
+    por_estado, por_tipo = {}, {}
+    total_pedidos, monto_total, recientes = 0, Decimal('0'), 0
+    for fila in filas:
+        total_pedidos += fila['cantidad']
+        monto_total += fila['monto_total']
+        if fila['fecha'] >= hace_7_dias:
+            recientes += fila['cantidad']
+        for agrupado, llave in ((por_estado, fila['estado']), (por_tipo, fila['tipo_pedido'] or None)):
+            cantidad, monto = agrupado.get(llave, (0, Decimal('0')))
+            agrupado[llave] = (cantidad + fila['cantidad'], monto + fila['monto_total'])
+
+    return {
+        'total_pedidos': total_pedidos,
+        'monto_total': monto_total,
+        'pedidos_ultimos_7_dias': recientes,
+        'por_estado': [
+            {'estado': e, 'cantidad': c, 'monto_total': m} for e, (c, m) in sorted(por_estado.items())
+        ],
+        'por_tipo': [
+            {'tipo_pedido': t, 'cantidad': c, 'monto_total': m}
+            for t, (c, m) in sorted(por_tipo.items(), key=lambda item: item[0] or '')
+        ],
+    }
@@ -0,0 +1,70 @@
+"""
+Señales de app_pedidos: mantienen el resumen diario de pedidos (ver resumenes.py)
+e invalidan la caché de analítica de ventas cuando cambia un día cerrado (ver analitica.py).
+
+Las actualizaciones masivas (QuerySet.update, bulk_create, bulk_update) no
+pasan por aquí: después de usarlas hay que llamar a resumenes.reconstruir().
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from app_productos.models import item_pedido
+
+from . import analitica, resumenes
+from .models import Pedido
+
+
+def recordar_estado_anterior(sender, instance, raw=False, **kwargs):
+    """Guardar el aporte previo del pedido para moverlo si cambia estado, tipo o monto"""
+    instance._resumen_anterior = None
+    if instance.pk and not raw:
+        anterior = Pedido.objects.filter(pk=instance.pk).only(
+            'fecha_pedido', 'estado', 'tipo_pedido', 'monto_total'
+        ).first()
+        if anterior:
+            instance._resumen_anterior = resumenes.clave(anterior)
+
+
+def actualizar_resumen(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    actual = resumenes.clave(instance)
+    anterior = getattr(instance, '_resumen_anterior', None)
+    if anterior == actual:
+        return
+    if anterior:
+        resumenes.aplicar(*anterior, -1)
+    resumenes.aplicar(*actual, 1)
+
+
+def descontar_resumen(sender, instance, **kwargs):
+    resumenes.aplicar(*resumenes.clave(instance), -1)
+
+
+def invalidar_analitica_pedido(sender, instance, raw=False, **kwargs):
+    """Solo invalida si el pedido cambió su aporte en un día cerrado (los de hoy vencen por TTL)"""
+    if raw:
+        return
+    anterior = getattr(instance, '_resumen_anterior', None)
+    if anterior == resumenes.clave(instance):
+        return
+    analitica.invalidar_si_historico(instance.fecha_pedido, anterior[0] if anterior else None)
+
+
+def invalidar_analitica_pedido_eliminado(sender, instance, **kwargs):
+    analitica.invalidar_si_historico(instance.fecha_pedido)
+
+
+def invalidar_analitica_item(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fecha = Pedido.objects.filter(pk=instance.pedido_id).values_list('fecha_pedido', flat=True).first()
+        analitica.invalidar_si_historico(fecha)
+
+
+pre_save.connect(recordar_estado_anterior, sender=Pedido, dispatch_uid='resumen_pedidos_pre_save')
+post_save.connect(actualizar_resumen, sender=Pedido, dispatch_uid='resumen_pedidos_post_save')
+post_delete.connect(descontar_resumen, sender=Pedido, dispatch_uid='resumen_pedidos_post_delete')
+
+post_save.connect(invalidar_analitica_pedido, sender=Pedido, dispatch_uid='analitica_Pedido_post_save')
+post_delete.connect(invalidar_analitica_pedido_eliminado, sender=Pedido, dispatch_uid='analitica_Pedido_post_delete')
+post_save.connect(invalidar_analitica_item, sender=item_pedido, dispatch_uid='analitica_item_pedido_post_save')
+post_delete.connect(invalidar_analitica_item, sender=item_pedido, dispatch_uid='analitica_item_pedido_post_delete')
@@ -1,3 +1,152 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_productos.models import Categoria, Producto, Producto_Variantes, item_pedido
+
+from . import analitica, resumenes
+from .models import Pedido, ResumenDiarioPedidos
+
+
+class PedidoListadoTest(TestCase):
+    def test_cursor_invalido_es_404(self):
+        response = APIClient().get('/api/pedidos/pedidos/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ResumenDiarioPedidosTest(TestCase):
+    def filas(self):
+        return {
+            (fila.fecha, fila.estado): (fila.cantidad, fila.monto_total)
+            for fila in ResumenDiarioPedidos.objects.filter(cantidad__gt=0)
+        }
+
+    def test_alta_y_cambio_de_estado(self):
+        hoy = timezone.now().date()
+        pedido = Pedido.objects.create(estado='pendiente', monto_total=Decimal('100'))
+        Pedido.objects.create(estado='pendiente', monto_total=Decimal('50'))
+        self.assertEqual(self.filas(), {(hoy, 'pendiente'): (2, Decimal('150'))})
+
+        pedido.estado = 'enviado'
+        pedido.save()
+        self.assertEqual(self.filas(), {
+            (hoy, 'pendiente'): (1, Decimal('50')),
+            (hoy, 'enviado'): (1, Decimal('100')),
+        })
+
+    def test_cambio_de_fecha_y_monto(self):
+        hoy = timezone.now().date()
+        ayer = hoy - timedelta(days=1)
+        pedido = Pedido.objects.create(estado='pagado', monto_total=Decimal('100'))
+
+        pedido.fecha_pedido = ayer
+        pedido.monto_total = Decimal('80')
+        pedido.save()
+        self.assertEqual(self.filas(), {(ayer, 'pagado'): (1, Decimal('80'))})
+
+        pedido.delete()
+        self.assertEqual(self.filas(), {})
+
+    def test_guardar_sin_cambios_no_suma(self):
+        pedido = Pedido.objects.create(estado='pagado', monto_total=Decimal('10'))
+        pedido.nota = 'Solo cambia la nota'
+        pedido.save()
+        self.assertEqual(list(self.filas().values()), [(1, Decimal('10'))])
+
+    def test_reconstruir_corrige_actualizaciones_masivas(self):
+        hoy = timezone.now().date()
+        Pedido.objects.create(estado='pendiente', monto_total=Decimal('10'))
+        Pedido.objects.create(estado='pendiente', monto_total=Decimal('20'))
+
+        Pedido.objects.update(estado='cancelado')
+        self.assertEqual(self.filas(), {(hoy, 'pendiente'): (2, Decimal('30'))})
+
+        resumenes.reconstruir()
+        self.assertEqual(self.filas(), {(hoy, 'cancelado'): (2, Decimal('30'))})
+
+
+class AnaliticaVentasTest(TestCase):
+    def setUp(self):
+        analitica.get_cache().clear()
+        self.hoy = timezone.now().date()
+        self.ayer = self.hoy - timedelta(days=1)
+        ropa = Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        calzado = Categoria.objects.create(nombre='Calzado', descripcion='Calzado')
+        self.remera = self.variante(ropa, 'Remera')
+        self.zapato = self.variante(calzado, 'Zapato')
+
+    def variante(self, categoria, nombre):
+        producto = Producto.objects.create(nombre=nombre, descripcion='', Categoria=categoria)
+        return Producto_Variantes.objects.create(producto=producto, color='negro', talla='M', precio_unitario=10)
+
+    def pedido(self, fecha, estado='pagado', *items):
+        pedido = Pedido.objects.create(estado=estado, monto_total=sum(c * p for _, c, p in items))
+        if fecha != pedido.fecha_pedido:
+            pedido.fecha_pedido = fecha
+            pedido.save()
+        item_pedido.objects.bulk_create([
+            item_pedido(pedido=pedido, Producto_variante=variante, cantidad=cantidad,
+                        precio_unitario=precio, subtotal=cantidad * precio)
+            for variante, cantidad, precio in items
+        ])
+        return pedido
+
+    def test_series_por_dia(self):
+        self.pedido(self.ayer, 'pagado', (self.remera, 2, 10))
+        self.pedido(self.hoy, 'pagado', (self.remera, 1, 10), (self.zapato, 1, 50))
+        self.pedido(self.hoy, 'cancelado', (self.zapato, 5, 50))
+
+        serie = analitica.series(self.ayer, self.hoy)
+        self.assertEqual(
+            [(fila['pedidos'], fila['ingresos'], fila['unidades']) for fila in serie],
+            [(1, Decimal('20'), 2), (1, Decimal('60'), 2)]
+        )
+
+    def test_top_variantes(self):
+        self.pedido(self.ayer, 'pagado', (self.remera, 3, 10), (self.zapato, 1, 50))
+        self.pedido(self.hoy, 'pagado', (self.remera, 1, 10))
+
+        por_unidades = analitica.top_variantes(self.ayer, self.hoy)
+        self.assertEqual([(f['producto'], f['unidades'], f['pedidos']) for f in por_unidades],
+                         [('Remera', 4, 2), ('Zapato', 1, 1)])
+        por_ingresos = analitica.top_variantes(self.ayer, self.hoy, por='ingresos', limite=1)
+        self.assertEqual([(f['producto'], f['ingresos']) for f in por_ingresos], [('Zapato', Decimal('50'))])
+
+    def test_por_categoria(self):
+        self.pedido(self.hoy, 'pagado', (self.remera, 5, 10), (self.zapato, 3, 50))
+
+        resultado = analitica.por_categoria(self.hoy, self.hoy)
+        self.assertEqual(resultado['total_ingresos'], Decimal('200'))
+        self.assertEqual([(f['categoria'], f['ingresos'], f['participacion']) for f in resultado['categorias']],
+                         [('Calzado', Decimal('150'), 0.75), ('Ropa', Decimal('50'), 0.25)])
+
+    def test_resultados_en_cache(self):
+        self.pedido(self.ayer, 'pagado', (self.remera, 1, 10))
+        analitica.series(self.ayer, self.ayer)
+        with self.assertNumQueries(0):
+            analitica.series(self.ayer, self.ayer)
+
+    def version_tras(self, cambio):
+        version = analitica.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            cambio()
+        return analitica.get_version() - version
+
+    def test_solo_los_dias_cerrados_invalidan(self):
+        self.assertTrue(analitica.es_historico(self.ayer))
+        self.assertFalse(analitica.es_historico(self.hoy))
+
+        self.assertEqual(self.version_tras(lambda: self.pedido(self.hoy, 'pagado', (self.remera, 1, 10))), 0)
+        viejo = self.pedido(self.ayer, 'pagado')
 
-# Create your tests here.
+        def cancelar():
+            viejo.estado = 'cancelado'
+            viejo.save()
+        self.assertEqual(self.version_tras(cancelar), 1)
+        self.assertEqual(self.version_tras(lambda: item_pedido.objects.create(
+            pedido=viejo, Producto_variante=self.remera, cantidad=1, precio_unitario=10, subtotal=10
+        )), 1)
+        self.assertGreater(self.version_tras(viejo.delete), 0)
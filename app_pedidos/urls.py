@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import PedidoViewSet
+from .api import AnaliticaVentasViewSet, PedidoViewSet
 
 router = DefaultRouter()
 router.register(r'pedidos', PedidoViewSet, basename='pedido')
+router.register(r'analitica', AnaliticaVentasViewSet, basename='analitica')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,211 @@
+"""
+Alertas de stock mantenidas de forma incremental.
+
+En lugar de recorrer todo el inventario con `stock < stock_minimo` en cada
+consulta, cada operación que cambia el stock o los umbrales (stock.py, la
+recepción de compras, la importación y los save() de Inventario) llama a
+`programar` con los inventarios afectados. Al confirmarse la transacción,
+`evaluar` abre o resuelve sus AlertaStock con un número fijo de consultas y
+las vistas leen sólo las alertas activas (índice parcial).
+
+Cada apertura o resolución queda con notificada=False y se envía en lote
+desde un hilo aparte al webhook (ALERTAS_STOCK_WEBHOOK_URL) y/o a una lista
+de Redis (ALERTAS_STOCK_COLA_URL), para que los dashboards no tengan que
+consultar el inventario completo. Los envíos fallidos quedan pendientes y
+los reintenta el comando `notificar_alertas`. La entrega es "al menos una
+vez": el consumidor puede descartar repetidos por (id, estado).
+"""
+import json
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AlertaStock, Inventario
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_webhook_url():
+    return getattr(settings, 'ALERTAS_STOCK_WEBHOOK_URL', '')
+
+
+def get_cola_url():
+    return getattr(settings, 'ALERTAS_STOCK_COLA_URL', '')
+
+
+def hay_destinos():
+    return bool(get_webhook_url() or get_cola_url())
+
+
+def _get_executor():
+    # Un solo hilo: los envíos del proceso no se pisan entre sí
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alertas')
+    return _executor
+
+
+# ----------------------------------------------------------------------
+# Evaluación
+# ----------------------------------------------------------------------
+def clasificar(stock, stock_minimo, stock_maximo):
+    """(tipo, umbral) de la alerta que corresponde, o None si el stock está en rango"""
+    if stock < stock_minimo:
+        return 'stock_bajo', stock_minimo
+    if stock > stock_maximo:
+        return 'stock_alto', stock_maximo
+    return None
+
+
+def evaluar(inventario_ids):
+    """
+    Abrir o resolver las alertas de `inventario_ids` según su stock actual.
+    Retorna (abiertas, resueltas).
+    """
+    inventario_ids = set(inventario_ids)
+    if not inventario_ids:
+        return 0, 0
+    ahora = timezone.now()
+    # Sin destinos configurados no queda nada pendiente de enviar
+    notificada = not hay_destinos()
+
+    with transaction.atomic():
+        activas = dict(
+            AlertaStock.objects.filter(inventario_id__in=inventario_ids, activa=True)
+            .values_list('inventario_id', 'tipo')
+        )
+        estados = Inventario.objects.filter(pk__in=inventario_ids).values_list(
+            'pk', 'stock', 'stock_minimo', 'stock_maximo'
+        )
+        por_resolver = []
+        nuevas = []
+        for inventario_id, stock, stock_minimo, stock_maximo in estados:
+            alerta = clasificar(stock, stock_minimo, stock_maximo)
+            tipo = alerta[0] if alerta else None
+            if activas.get(inventario_id) == tipo:
+                continue
+            if inventario_id in activas:
+                por_resolver.append(inventario_id)
+            if alerta:
+                nuevas.append(AlertaStock(
+                    inventario_id=inventario_id, tipo=tipo, stock=stock, umbral=alerta[1],
+                    fecha_inicio=ahora, notificada=notificada
+                ))
+
+        resueltas = 0
+        if por_resolver:
+            resueltas = AlertaStock.objects.filter(inventario_id__in=por_resolver, activa=True).update(
+                activa=False, fecha_resolucion=ahora, notificada=notificada
+            )
+        if nuevas:
+            # Si otra evaluación concurrente ya abrió la alerta, la restricción única la descarta
+            AlertaStock.objects.bulk_create(nuevas, ignore_conflicts=True)
+        if (nuevas or resueltas) and not notificada:
+            transaction.on_commit(programar_notificacion)
+    return len(nuevas), resueltas
+
+
+def programar(inventario_ids):
+    """Evaluar las alertas de `inventario_ids` cuando se confirme la transacción en curso"""
+    inventario_ids = set(inventario_ids)
+    if inventario_ids:
+        # robust: un error en las alertas no debe afectar a la operación de stock ya confirmada
+        transaction.on_commit(lambda: evaluar(inventario_ids), robust=True)
+
+
+def recalcular(lote=1000):
+    """Reevaluar todos los inventarios (reparación tras cambios por SQL directo)"""
+    abiertas = resueltas = 0
+    ids = Inventario.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=lote)
+    bloque = []
+    for inventario_id in ids:
+        bloque.append(inventario_id)
+        if len(bloque) >= lote:
+            a, r = evaluar(bloque)
+            abiertas, resueltas, bloque = abiertas + a, resueltas + r, []
+    a, r = evaluar(bloque)
+    return abiertas + a, resueltas + r
+
+
+# ----------------------------------------------------------------------
+# Notificación
+# ----------------------------------------------------------------------
+def evento(alerta):
+    return {
+        'id': alerta.pk,
+        'inventario_id': alerta.inventario_id,
+        'tipo': alerta.tipo,
+        'estado': 'activa' if alerta.activa else 'resuelta',
+        'stock': alerta.stock,
+        'umbral': alerta.umbral,
+        'fecha_inicio': alerta.fecha_inicio.isoformat(),
+        'fecha_resolucion': alerta.fecha_resolucion.isoformat() if alerta.fecha_resolucion else None,
+    }
+
+
+def enviar(eventos):
+    """Enviar los eventos a los destinos configurados; lanza excepción si alguno falla"""
+    url = get_webhook_url()
+    if url:
+        peticion = urllib.request.Request(
+            url,
+            data=json.dumps({'alertas': eventos}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(peticion, timeout=getattr(settings, 'ALERTAS_STOCK_WEBHOOK_TIMEOUT', 5)):
+            pass
+
+    cola_url = get_cola_url()
+    if cola_url:
+        import redis
+
+        cliente = redis.Redis.from_url(cola_url)
+        cliente.rpush(
+            getattr(settings, 'ALERTAS_STOCK_COLA_CLAVE', 'alertas_stock'),
+            *[json.dumps(e) for e in eventos]
+        )
+
+
+def notificar_pendientes(lote=100):
+    """Enviar en lotes las alertas con notificada=False. Retorna cuántas se enviaron."""
+    if not hay_destinos():
+        return 0
+    enviadas = 0
+    while True:
+        alertas = list(AlertaStock.objects.filter(notificada=False).order_by('id')[:lote])
+        if not alertas:
+            return enviadas
+        enviar([evento(alerta) for alerta in alertas])
+        # Sólo se marcan si no cambiaron de estado mientras se enviaban
+        for activa in (True, False):
+            AlertaStock.objects.filter(
+                pk__in=[a.pk for a in alertas if a.activa == activa], activa=activa
+            ).update(notificada=True)
+        enviadas += len(alertas)
+
+
+def programar_notificacion():
+    if getattr(settings, 'ALERTAS_STOCK_ASINCRONAS', True):
+        _get_executor().submit(_notificar_en_hilo)
+    else:
+        _notificar_en_hilo(cerrar_conexion=False)
+
+
+def _notificar_en_hilo(cerrar_conexion=True):
+    try:
+        notificar_pendientes()
+    except Exception:
+        logger.exception('No se pudieron enviar las alertas de stock; se reintentarán')
+    finally:
+        if cerrar_conexion:
+            close_old_connections()
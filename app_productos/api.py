@@ -1,16 +1,32 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Avg, F
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ValidationError
+from collections import defaultdict
+from datetime import datetime, time
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import (
     Producto, Categoria, Producto_Variantes, Comentarios, 
-    Imagen_Producto, item_pedido, item_compras, Inventario
+    Imagen_Producto, item_pedido, item_compras, Inventario, AlertaStock,
+    CalificacionVariante, ImportacionCatalogo, filtro_categoria_con_descendientes
 )
+from project_ecommerce import exportacion
+from project_ecommerce.pagination import KeysetPagination
+from . import cache, calificaciones, facetas, historial, importacion
+from .cache import cache_catalogo
+from .busqueda import buscar
 from .serializers import (
     ProductoBasicoSerializer, ProductoCompletoSerializer,
     CategoriaSerializer, ProductoCategoriaSerializer, ProductoCategoriaCreateSerializer,
     ReseñaSerializer, ReseñaCreateSerializer, ImagenProductoSerializer,
-    ItemPedidoSerializer, ItemComprasSerializer, InventarioSerializer
+    ItemPedidoSerializer, ItemComprasSerializer, InventarioSerializer,
+    MovimientoStockSerializer
 )
 
 class ProductoViewSet(viewsets.ModelViewSet):
@@ -20,33 +36,34 @@ class ProductoViewSet(viewsets.ModelViewSet):
     queryset = Producto.objects.filter(activo=True)
     serializer_class = ProductoCompletoSerializer
     permission_classes = [permissions.AllowAny]  # Público para ver catálogo
+    pagination_class = KeysetPagination
+    ordering = ('-fecha_creacion', 'id')
     
     def get_queryset(self):
         """Filtrar productos con parámetros opcionales"""
-        queryset = Producto.objects.select_related('Categoria').filter(activo=True)
+        queryset = ProductoCompletoSerializer.setup_eager_loading(
+            Producto.objects.filter(activo=True)
+        )
         
         # Filtro por nombre
         nombre = self.request.query_params.get('nombre', None)
         if nombre:
             queryset = queryset.filter(nombre__icontains=nombre)
         
-        # Filtro por categoría
+        # Filtro por categoría (incluye todas sus subcategorías)
         categoria = self.request.query_params.get('categoria', None)
         if categoria:
-            queryset = queryset.filter(Categoria_id=categoria)
+            queryset = queryset.filter(filtro_categoria_con_descendientes(categoria))
         
         return queryset.order_by('-fecha_creacion')
     
+    @cache_catalogo('productos:list')
     def list(self, request, *args, **kwargs):
-        """Listar productos del catálogo"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        """Listar productos del catálogo (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'productos': serializer.data
-        })
+        return Response(self.paginator.get_envelope('productos', serializer.data))
     
     def retrieve(self, request, *args, **kwargs):
         """Obtener producto completo con sus variantes"""
@@ -105,9 +122,10 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     @action(detail=False, methods=['get'])
+    @cache_catalogo('productos:destacados')
     def destacados(self, request):
         """Productos destacados (los más recientes o con mejor rating)"""
-        productos_destacados = self.queryset.order_by('-fecha_creacion')[:6]
+        productos_destacados = self.queryset.select_related('Categoria', 'calificacion').order_by('-fecha_creacion')[:6]
         serializer = ProductoBasicoSerializer(productos_destacados, many=True)
         
         return Response({
@@ -120,7 +138,9 @@ class ProductoViewSet(viewsets.ModelViewSet):
     def variantes(self, request, pk=None):
         """Obtener todas las variantes de un producto específico"""
         producto = self.get_object()
-        variantes = Producto_Variantes.objects.filter(producto=producto)
+        variantes = ProductoCategoriaSerializer.setup_eager_loading(
+            Producto_Variantes.objects.filter(producto=producto)
+        )
         serializer = ProductoCategoriaSerializer(variantes, many=True)
         
         return Response({
@@ -131,6 +151,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @cache_catalogo('productos:por_categoria')
     def por_categoria(self, request):
         """Obtener productos filtrados por categoría"""
         categoria_id = request.query_params.get('categoria_id')
@@ -141,7 +162,9 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 'message': 'categoria_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        productos = self.queryset.filter(Categoria_id=categoria_id)
+        productos = ProductoCompletoSerializer.setup_eager_loading(
+            self.queryset.filter(filtro_categoria_con_descendientes(categoria_id))
+        )
         serializer = self.get_serializer(productos, many=True)
         
         return Response({
@@ -166,25 +189,32 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
     
+    @cache_catalogo('categorias:list')
     def list(self, request, *args, **kwargs):
-        """Listar categorías principales (sin padre)"""
-        categorias_principales = self.queryset.filter(id_padre__isnull=True)
-        serializer = self.get_serializer(categorias_principales, many=True)
+        """Listar categorías principales (sin padre) con todo su árbol en una sola consulta"""
+        hijos = defaultdict(list)
+        for categoria in self.queryset.order_by('ruta'):
+            hijos[categoria.id_padre_id].append(categoria)
+        categorias_principales = hijos.get(None, [])
+        
+        context = self.get_serializer_context()
+        context['hijos'] = hijos
+        serializer = self.get_serializer(categorias_principales, many=True, context=context)
         
         return Response({
             'success': True,
-            'count': categorias_principales.count(),
+            'count': len(categorias_principales),
             'categorias': serializer.data
         })
     
     @action(detail=True, methods=['get'])
     def productos(self, request, pk=None):
-        """Obtener productos de una categoría específica"""
+        """Obtener productos de una categoría específica (incluye subcategorías)"""
         categoria = self.get_object()
-        productos = Producto.objects.filter(
-            productocategoria__categoria=categoria,
+        productos = Producto.objects.select_related('Categoria', 'calificacion').filter(
+            Categoria__ruta__startswith=categoria.ruta,
             activo=True
-        ).distinct()
+        )
         
         serializer = ProductoBasicoSerializer(productos, many=True)
         
@@ -201,6 +231,8 @@ class ProductoCategoriaViewSet(viewsets.ModelViewSet):
     """
     queryset = Producto_Variantes.objects.all()
     serializer_class = ProductoCategoriaSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-fecha_creacion', 'id')
     
     def get_serializer_class(self):
         """Usar diferentes serializers según la acción"""
@@ -217,40 +249,47 @@ class ProductoCategoriaViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
     
-    def get_queryset(self):
-        """Filtrar variantes con parámetros"""
-        queryset = Producto_Variantes.objects.select_related(
-            'producto', 
-            'producto__Categoria', 
-            'Inventario_id'
-        )
-        
-        # Filtro por producto
+    def get_queryset_catalogo(self):
+        """Variantes visibles (y del ?producto=): base común del listado y de las facetas"""
+        queryset = facetas.base_variantes()
         producto_id = self.request.query_params.get('producto', None)
         if producto_id:
             queryset = queryset.filter(producto_id=producto_id)
+        return queryset
+    
+    def get_queryset(self):
+        """Filtrar variantes con parámetros"""
+        if self.action != 'list':
+            # retrieve/update/destroy también alcanzan variantes desactivadas
+            return ProductoCategoriaSerializer.setup_eager_loading(Producto_Variantes.objects.all())
         
-        # Filtro por color
-        color = self.request.query_params.get('color', None)
-        if color:
-            queryset = queryset.filter(color__icontains=color)
-        
-        # Filtro por talla
-        talla = self.request.query_params.get('talla', None)
-        if talla:
-            queryset = queryset.filter(talla__icontains=talla)
-        
-        return queryset.order_by('-fecha_creacion')
+        # Filtros de selección múltiple (?color=rojo&color=azul, ?categoria=, ?precio=0-50)
+        seleccion = facetas.leer_seleccion(self.request.query_params)
+        queryset = facetas.filtrar(self.get_queryset_catalogo(), seleccion)
+        return ProductoCategoriaSerializer.setup_eager_loading(queryset).order_by('-fecha_creacion')
     
     def list(self, request, *args, **kwargs):
-        """Listar variantes de productos"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        """Listar variantes de productos (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        
+        return Response(self.paginator.get_envelope('variantes', serializer.data))
+    
+    @action(detail=False, methods=['get'])
+    @cache_catalogo('variantes:facetas')
+    def facetas(self, request):
+        """
+        Conteos por categoría, color, talla y rango de precio para los filtros actuales.
+        GET /api/productos/variantes/facetas/?categoria=3&color=rojo&color=azul&precio=0-50
+        """
+        seleccion = facetas.leer_seleccion(request.query_params)
+        resultado = facetas.contar(seleccion, self.get_queryset_catalogo())
         
         return Response({
             'success': True,
-            'count': queryset.count(),
-            'variantes': serializer.data
+            'total': resultado['total'],
+            'seleccion': seleccion,
+            'facetas': resultado['facetas']
         })
     
     def retrieve(self, request, *args, **kwargs):
@@ -328,8 +367,22 @@ class ReseñaViewSet(viewsets.ModelViewSet):
         if producto_variante:
             queryset = queryset.filter(Producto_categoria_id=producto_variante)
         
+        # Reseñas del cliente autenticado
+        if self.request.query_params.get('mias') == 'true':
+            queryset = queryset.filter(Cliente_id=self.request.cliente_actual.cliente_id)
+        
         return queryset.order_by('-fecha_reseña')
     
+    def perform_create(self, serializer):
+        """La reseña de un cliente queda a su nombre; otros usuarios deben indicar Cliente"""
+        cliente = self.request.cliente_actual.cliente
+        if cliente is not None:
+            serializer.save(Cliente=cliente)
+        elif serializer.validated_data.get('Cliente'):
+            serializer.save()
+        else:
+            raise ValidationError({'Cliente': 'El usuario no tiene perfil de cliente; indique Cliente'})
+    
     @action(detail=False, methods=['get'])
     def por_producto(self, request):
         """Reseñas de una variante específica con estadísticas"""
@@ -341,17 +394,19 @@ class ReseñaViewSet(viewsets.ModelViewSet):
                 'message': 'producto_variante_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        reseñas_producto = self.queryset.filter(Producto_categoria_id=producto_variante_id)
+        reseñas_producto = self.queryset.filter(Producto_categoria_id=producto_variante_id).select_related('Cliente')
         serializer = self.get_serializer(reseñas_producto, many=True)
         
-        # Calcular estadísticas
-        promedio = reseñas_producto.aggregate(Avg('calificacion'))['calificacion__avg'] or 0
+        # Estadísticas precalculadas (ver calificaciones.py)
+        resumen = CalificacionVariante.objects.filter(variante_id=producto_variante_id).first()
+        estadisticas = resumen.como_dict() if resumen else calificaciones.RESUMEN_VACIO
         
         return Response({
             'success': True,
             'producto_variante_id': producto_variante_id,
-            'total_reseñas': reseñas_producto.count(),
-            'calificacion_promedio': round(promedio, 2),
+            'total_reseñas': estadisticas['total'],
+            'calificacion_promedio': estadisticas['promedio'],
+            'histograma': estadisticas['histograma'],
             'reseñas': serializer.data
         })
 
@@ -361,6 +416,8 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
     """
     queryset = Imagen_Producto.objects.all()
     serializer_class = ImagenProductoSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-es_principal', 'id')
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -392,15 +449,11 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
         return queryset.order_by('-es_principal', 'id')
     
     def list(self, request, *args, **kwargs):
-        """Listar imágenes de productos"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        """Listar imágenes de productos (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'imagenes': serializer.data
-        })
+        return Response(self.paginator.get_envelope('imagenes', serializer.data))
     
     def create(self, request, *args, **kwargs):
         """Crear nueva imagen de producto"""
@@ -445,6 +498,14 @@ class ItemPedidoViewSet(viewsets.ModelViewSet):
     queryset = item_pedido.objects.all()
     serializer_class = ItemPedidoSerializer
     permission_classes = [permissions.AllowAny]
+    
+    def get_queryset(self):
+        return ItemPedidoSerializer.setup_eager_loading(item_pedido.objects.order_by('id'))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def exportar(self, request):
+        """Exportar todos los items de pedido en streaming (CSV o NDJSON, opcional gzip)"""
+        return exportacion.respuesta(request, 'items_pedido')
 
 class ItemComprasViewSet(viewsets.ModelViewSet):
     """
@@ -453,6 +514,14 @@ class ItemComprasViewSet(viewsets.ModelViewSet):
     queryset = item_compras.objects.all()
     serializer_class = ItemComprasSerializer
     permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ItemComprasSerializer.setup_eager_loading(item_compras.objects.order_by('id'))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def exportar(self, request):
+        """Exportar todos los items de compras en streaming (CSV o NDJSON, opcional gzip)"""
+        return exportacion.respuesta(request, 'items_compras')
 
 class InventarioViewSet(viewsets.ModelViewSet):
     """
@@ -461,10 +530,14 @@ class InventarioViewSet(viewsets.ModelViewSet):
     queryset = Inventario.objects.all()
     serializer_class = InventarioSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    # Clave inmutable: ultima_actualizacion (auto_now) cambia con cada reserva
+    # o venta y movería filas a través del cursor mientras se pagina
+    ordering = ('-id',)
     
     def get_queryset(self):
         """Filtrar inventario con parámetros"""
-        queryset = Inventario.objects.all()
+        queryset = InventarioSerializer.setup_eager_loading(Inventario.objects.all())
         
         # Filtro por ubicación
         ubicacion = self.request.query_params.get('ubicacion', None)
@@ -474,20 +547,16 @@ class InventarioViewSet(viewsets.ModelViewSet):
         # Filtro por stock bajo (stock menor que stock_minimo)
         stock_bajo = self.request.query_params.get('stock_bajo', None)
         if stock_bajo == 'true':
-            queryset = queryset.filter(stock__lt=F('stock_minimo'))
+            queryset = queryset.filter(alertas__activa=True, alertas__tipo='stock_bajo')
         
-        return queryset.order_by('-ultima_actualizacion')
+        return queryset.order_by(*self.ordering)
     
     def list(self, request, *args, **kwargs):
-        """Listar inventario con información del producto"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        """Listar inventario con información del producto (paginado por cursor)"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
-        return Response({
-            'success': True,
-            'count': queryset.count(),
-            'inventario': serializer.data
-        })
+        return Response(self.paginator.get_envelope('inventario', serializer.data))
     
     def create(self, request, *args, **kwargs):
         """Crear registro de inventario"""
@@ -525,33 +594,43 @@ class InventarioViewSet(viewsets.ModelViewSet):
             'message': 'Registro de inventario eliminado exitosamente'
         }, status=status.HTTP_204_NO_CONTENT)
     
+    def get_inventarios_con_alerta(self, tipo):
+        """Inventarios con una alerta activa del tipo dado (tabla AlertaStock, ver alertas.py)"""
+        alertas = InventarioSerializer.setup_eager_loading(
+            AlertaStock.objects.filter(activa=True, tipo=tipo)
+            .select_related('inventario')
+            .order_by('-fecha_inicio', 'id'),
+            prefijo='inventario__'
+        )
+        return [alerta.inventario for alerta in alertas]
+    
     @action(detail=False, methods=['get'])
     def stock_bajo(self, request):
         """Obtener productos con stock bajo (stock < stock_minimo)"""
-        inventario_bajo = self.queryset.filter(stock__lt=F('stock_minimo'))
+        inventario_bajo = self.get_inventarios_con_alerta('stock_bajo')
         serializer = self.get_serializer(inventario_bajo, many=True)
         
         return Response({
             'success': True,
-            'count': inventario_bajo.count(),
+            'count': len(inventario_bajo),
             'inventario_bajo': serializer.data
         })
     
     @action(detail=False, methods=['get'])
     def alertas(self, request):
         """Obtener alertas de inventario (stock bajo o por encima del máximo)"""
-        stock_bajo = self.queryset.filter(stock__lt=F('stock_minimo'))
-        stock_alto = self.queryset.filter(stock__gt=F('stock_maximo'))
+        stock_bajo = self.get_inventarios_con_alerta('stock_bajo')
+        stock_alto = self.get_inventarios_con_alerta('stock_alto')
         
         return Response({
             'success': True,
             'alertas': {
                 'stock_bajo': {
-                    'count': stock_bajo.count(),
+                    'count': len(stock_bajo),
                     'items': self.get_serializer(stock_bajo, many=True).data
                 },
                 'stock_alto': {
-                    'count': stock_alto.count(),
+                    'count': len(stock_alto),
                     'items': self.get_serializer(stock_alto, many=True).data
                 }
             }
@@ -569,7 +648,9 @@ class InventarioViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            variante = Producto_Variantes.objects.get(id=variante_id)
+            variante = InventarioSerializer.setup_eager_loading(
+                Producto_Variantes.objects.select_related('Inventario_id'), prefijo='Inventario_id__'
+            ).get(id=variante_id)
             if variante.Inventario_id:
                 serializer = self.get_serializer(variante.Inventario_id)
                 return Response({
@@ -586,3 +667,211 @@ class InventarioViewSet(viewsets.ModelViewSet):
                 'success': False,
                 'error': 'Variante no encontrada'
             }, status=status.HTTP_404_NOT_FOUND)
+    
+    def get_momento(self, valor, fin_del_dia=False):
+        """Fecha ISO (YYYY-MM-DD o con hora) a datetime con zona; ValueError si es inválida"""
+        fecha = parse_date(valor) if len(valor) == 10 else None
+        if fecha is not None:
+            momento = datetime.combine(fecha, time.max if fin_del_dia else time.min)
+        else:
+            momento = parse_datetime(valor)
+            if momento is None:
+                raise ValueError(valor)
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        return momento
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def movimientos(self, request, pk=None):
+        """
+        Historial de movimientos de stock de un inventario.
+        Parámetros: desde, hasta (YYYY-MM-DD o ISO con hora), tipo, variante, limite (máx. 500)
+        """
+        inventario = self.get_object()
+        params = request.query_params
+        try:
+            desde = self.get_momento(params['desde']) if params.get('desde') else None
+            hasta = self.get_momento(params['hasta'], fin_del_dia=True) if params.get('hasta') else None
+            limite = max(1, min(int(params.get('limite', 100)), 500))
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'desde/hasta deben ser fechas ISO y limite un entero'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        movimientos = historial.movimientos(
+            inventario_id=inventario.pk, variante_id=params.get('variante') or None,
+            desde=desde, hasta=hasta, tipo=params.get('tipo') or None
+        )[:limite]
+        return Response({
+            'success': True,
+            'inventario_id': inventario.pk,
+            'stock_actual': inventario.stock,
+            'movimientos': MovimientoStockSerializer(movimientos, many=True).data
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def historico(self, request):
+        """
+        Stock de los inventarios en una fecha pasada (snapshot + movimientos).
+        Parámetros: fecha (requerido), inventario=1,2,3 o variante=ID para acotar
+        """
+        params = request.query_params
+        if not params.get('fecha'):
+            return Response({
+                'success': False,
+                'message': 'Se requiere el parámetro fecha'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            momento = self.get_momento(params['fecha'], fin_del_dia=True)
+            inventarios = None
+            if params.get('inventario'):
+                inventarios = [int(i) for i in params['inventario'].split(',') if i.strip()]
+            elif params.get('variante'):
+                inventarios = list(
+                    Producto_Variantes.objects.filter(pk=int(params['variante']), Inventario_id__isnull=False)
+                    .values_list('Inventario_id', flat=True)
+                )
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'fecha debe ser ISO e inventario/variante enteros'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        stocks = historial.stocks_en(momento, inventarios)
+        return Response({
+            'success': True,
+            'fecha': momento,
+            'count': len(stocks),
+            'stocks': [{'inventario_id': k, 'stock': v} for k, v in sorted(stocks.items())]
+        })
+
+
+class BusquedaProductosAPIView(APIView):
+    """
+    Búsqueda de productos por relevancia (texto completo + trigramas).
+    
+    GET /api/productos/buscar/?q=camisa roja&limite=20
+    """
+    permission_classes = [permissions.AllowAny]
+    limite_maximo = 100
+    
+    @cache_catalogo('productos:buscar')
+    def get(self, request, *args, **kwargs):
+        texto = request.query_params.get('q', '').strip()
+        if not texto:
+            return Response({
+                'success': False,
+                'message': 'El parámetro q es requerido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limite = max(1, min(int(request.query_params.get('limite', 20)), self.limite_maximo))
+        except ValueError:
+            limite = 20
+        
+        queryset = Producto.objects.filter(activo=True).select_related('Categoria', 'calificacion')
+        categoria = request.query_params.get('categoria')
+        if categoria:
+            queryset = queryset.filter(filtro_categoria_con_descendientes(categoria))
+        
+        productos = list(buscar(texto, queryset)[:limite])
+        data = ProductoBasicoSerializer(productos, many=True).data
+        for producto, item in zip(productos, data):
+            item['relevancia'] = round(producto.relevancia or 0, 4)
+        
+        return Response({
+            'success': True,
+            'q': texto,
+            'count': len(data),
+            'productos': data
+        })
+
+
+class CatalogoCacheStatsAPIView(APIView):
+    """
+    Estadísticas de la caché del catálogo (hits/misses y versión actual)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'cache': cache.estadisticas()
+        })
+    
+    def delete(self, request, *args, **kwargs):
+        """Invalidar manualmente toda la caché del catálogo"""
+        version = cache.invalidar()
+        return Response({
+            'success': True,
+            'message': 'Caché del catálogo invalidada',
+            'version': version
+        })
+
+
+class ImportacionCatalogoAPIView(APIView):
+    """
+    Importación masiva de productos y variantes desde un archivo CSV o JSONL
+    (ver importacion.py para el formato de las filas). El archivo se encola y
+    lo procesa `procesar_importaciones`; el estado se consulta en el detalle.
+    
+    POST /api/productos/importar/        multipart: archivo, formato (csv|jsonl), lote, simular
+    GET  /api/productos/importar/<id>/   estado y resultado de una importación
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = (MultiPartParser,)
+    
+    @staticmethod
+    def _datos(registro, request):
+        return {
+            'id': registro.id,
+            'archivo': registro.nombre_archivo,
+            'formato': registro.formato,
+            'simulado': registro.simular,
+            'estado': registro.estado,
+            'resultado': registro.resultado,
+            'error': registro.error,
+            'fecha_creacion': registro.fecha_creacion,
+            'url_estado': request.build_absolute_uri(
+                reverse('importacion-catalogo-detalle', kwargs={'pk': registro.id})
+            ),
+        }
+    
+    def get(self, request, pk, *args, **kwargs):
+        registro = get_object_or_404(ImportacionCatalogo, pk=pk)
+        return Response({
+            'success': registro.estado != 'error',
+            'importacion': self._datos(registro, request)
+        })
+    
+    def post(self, request, *args, **kwargs):
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({
+                'success': False,
+                'message': 'El campo archivo es requerido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        formato = request.data.get('formato') or importacion.detectar_formato(archivo.name)
+        if formato not in ('csv', 'jsonl'):
+            return Response({
+                'success': False,
+                'message': 'formato debe ser csv o jsonl'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            lote = int(request.data.get('lote') or importacion.get_tamano_lote())
+        except ValueError:
+            lote = importacion.get_tamano_lote()
+        simular = str(request.data.get('simular', '')).lower() in importacion.VALORES_VERDADEROS
+        
+        registro = importacion.encolar_importacion(
+            archivo, formato, max(1, lote), simular=simular, usuario=request.user
+        )
+        registro.refresh_from_db()
+        return Response({
+            'success': True,
+            'message': 'Importación encolada',
+            'importacion': self._datos(registro, request)
+        }, status=status.HTTP_202_ACCEPTED)
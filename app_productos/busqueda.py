@@ -0,0 +1,94 @@
+"""
+Búsqueda de productos con texto completo (PostgreSQL).
+
+Producto.busqueda es un tsvector precalculado con pesos:
+    A: nombre del producto
+    B: nombre de la categoría, colores y tallas de las variantes
+    C: descripción
+Se mantiene desde las señales (ver signals.py) y tiene índice GIN. El
+índice de trigramas (pg_trgm) sobre nombre sirve a la similitud de la
+búsqueda; los filtros `icontains` existentes (nombre, color, talla) usan
+índices de trigramas sobre UPPER(columna), que es lo que compara Django.
+
+La consulta combina coincidencia de texto completo (ranking con ts_rank)
+y similitud por trigramas para tolerar errores de tipeo. En motores que
+no son PostgreSQL se usa un icontains simple sin ranking.
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Greatest
+
+from .models import Categoria, Producto, Producto_Variantes
+
+CONFIG = 'spanish'
+
+
+def es_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def _vector_producto():
+    """Expresión SQL del tsvector de un producto (se evalúa dentro de un UPDATE)"""
+    categoria = Categoria.objects.filter(pk=OuterRef('Categoria_id')).values('nombre')[:1]
+    variantes = (
+        Producto_Variantes.objects.filter(producto=OuterRef('pk'))
+        .order_by()
+        .values('producto')
+        .annotate(texto=StringAgg(Concat('color', Value(' '), 'talla', output_field=TextField()), delimiter=' '))
+        .values('texto')
+    )
+    return (
+        SearchVector('nombre', weight='A', config=CONFIG)
+        + SearchVector(Coalesce(Subquery(categoria), Value(''), output_field=TextField()), weight='B', config=CONFIG)
+        + SearchVector(Coalesce(Subquery(variantes), Value(''), output_field=TextField()), weight='B', config=CONFIG)
+        + SearchVector('descripcion', weight='C', config=CONFIG)
+    )
+
+
+def actualizar_vectores(producto_ids=None):
+    """
+    Recalcular Producto.busqueda con un único UPDATE.
+    `producto_ids` puede ser una lista o un queryset de ids; sin él se
+    reindexa todo el catálogo.
+    """
+    if not es_postgres():
+        return 0
+    queryset = Producto.objects.all()
+    if producto_ids is not None:
+        queryset = queryset.filter(pk__in=producto_ids)
+    return queryset.update(busqueda=_vector_producto())
+
+
+def buscar(texto, queryset=None):
+    """
+    Productos que coinciden con `texto`, ordenados por relevancia.
+    Cada resultado trae la anotación `relevancia`.
+    """
+    if queryset is None:
+        queryset = Producto.objects.filter(activo=True)
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset.none()
+
+    if not es_postgres():
+        return queryset.filter(
+            Q(nombre__icontains=texto)
+            | Q(descripcion__icontains=texto)
+            | Q(Categoria__nombre__icontains=texto)
+            | Q(producto_variantes__color__icontains=texto)
+            | Q(producto_variantes__talla__icontains=texto)
+        ).distinct().annotate(relevancia=Value(0.0)).order_by('-fecha_creacion', 'id')
+
+    consulta = SearchQuery(texto, config=CONFIG, search_type='websearch')
+    return (
+        queryset.filter(Q(busqueda=consulta) | Q(nombre__trigram_similar=texto))
+        .annotate(
+            relevancia=Greatest(
+                SearchRank(F('busqueda'), consulta),
+                TrigramSimilarity('nombre', texto) * Value(0.5)
+            )
+        )
+        .order_by('-relevancia', 'id')
+    )
@@ -0,0 +1,125 @@
+"""
+Caché de respuestas del catálogo público.
+
+Las respuestas se guardan bajo claves versionadas:
+    catalogo:v<version>:<endpoint>:<hash de los parámetros normalizados>
+Cualquier escritura sobre los modelos del catálogo incrementa la versión
+al confirmarse su transacción (ver signals.py), con lo que todas las entradas anteriores quedan
+inalcanzables sin necesidad de borrarlas una por una.
+
+El backend se configura con el alias CATALOGO_CACHE_ALIAS de CACHES
+(memoria local por defecto, Redis en producción).
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+PREFIJO = 'catalogo'
+CLAVE_VERSION = f'{PREFIJO}:version'
+CLAVE_HITS = f'{PREFIJO}:stats:hits'
+CLAVE_MISSES = f'{PREFIJO}:stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300)
+
+
+def get_version():
+    """Versión actual del catálogo (se crea en 1 si no existe)"""
+    cache = get_cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar():
+    """Invalidar todo el catálogo incrementando la versión"""
+    cache = get_cache()
+    try:
+        return cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave no existía (o fue desalojada): se reinicia en una versión nueva
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        return cache.incr(CLAVE_VERSION)
+
+
+def _contar(clave):
+    cache = get_cache()
+    try:
+        cache.incr(clave)
+    except ValueError:
+        if not cache.add(clave, 1, timeout=None):
+            cache.incr(clave)
+
+
+def normalizar_parametros(query_params):
+    """Parámetros ordenados y sin valores vacíos, para que ?a=1&b=2 y ?b=2&a=1 compartan entrada"""
+    pares = []
+    for clave in sorted(query_params.keys()):
+        for valor in sorted(query_params.getlist(clave)):
+            if valor != '':
+                pares.append(f'{clave}={valor}')
+    return '&'.join(pares)
+
+
+def construir_clave(endpoint, request, **kwargs):
+    # El host forma parte de la clave porque los enlaces `next` son absolutos
+    partes = request.get_host() + '?' + normalizar_parametros(request.query_params)
+    if kwargs:
+        partes += '|' + '&'.join(f'{k}={v}' for k, v in sorted(kwargs.items()))
+    digest = hashlib.sha1(partes.encode('utf-8')).hexdigest()
+    return f'{PREFIJO}:v{get_version()}:{endpoint}:{digest}'
+
+
+def estadisticas():
+    cache = get_cache()
+    hits = cache.get(CLAVE_HITS, 0)
+    misses = cache.get(CLAVE_MISSES, 0)
+    total = hits + misses
+    return {
+        'version': get_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+        'backend': get_cache().__class__.__name__,
+    }
+
+
+def cache_catalogo(endpoint):
+    """
+    Decorador para métodos de ViewSet que devuelven el catálogo.
+    Solo guarda respuestas GET exitosas; agrega la cabecera X-Cache (HIT/MISS).
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            if request.method != 'GET':
+                return metodo(self, request, *args, **kwargs)
+
+            cache = get_cache()
+            clave = construir_clave(endpoint, request, **kwargs)
+            data = cache.get(clave)
+            if data is not None:
+                _contar(CLAVE_HITS)
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _contar(CLAVE_MISSES)
+            response = metodo(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(clave, response.data, timeout=get_timeout())
+            response['X-Cache'] = 'MISS'
+            return response
+        return envoltura
+    return decorador
@@ -0,0 +1,83 @@
+"""
+Mantenimiento incremental de los resúmenes de calificación.
+
+Cada alta, cambio o baja de una reseña (Comentarios) suma o resta su
+calificación en CalificacionVariante y CalificacionProducto con un UPDATE
+sobre F() expressions, sin recalcular promedios sobre todas las reseñas.
+`recalcular()` reconstruye los resúmenes desde cero si alguna vez divergen.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import CalificacionProducto, CalificacionVariante, Comentarios, Producto_Variantes
+
+ESTRELLAS = range(1, 6)
+
+RESUMEN_VACIO = {
+    'total': 0,
+    'promedio': 0,
+    'histograma': {str(n): 0 for n in ESTRELLAS},
+}
+
+
+def resumen(obj):
+    """
+    Resumen de calificación de un Producto o una Producto_Variantes.
+    Sin consultas adicionales si la relación `calificacion` vino con select_related.
+    """
+    try:
+        return obj.calificacion.como_dict()
+    except ObjectDoesNotExist:
+        return RESUMEN_VACIO
+
+
+def _cambios(calificacion, signo):
+    cambios = {
+        'total': F('total') + signo,
+        'suma': F('suma') + signo * calificacion,
+        'fecha_actualizacion': timezone.now(),
+    }
+    if calificacion in ESTRELLAS:
+        campo = f'estrellas_{calificacion}'
+        cambios[campo] = F(campo) + signo
+    return cambios
+
+
+def aplicar(variante_id, calificacion, signo):
+    """
+    Sumar (signo=1) o restar (signo=-1) una calificación en los resúmenes
+    de la variante y de su producto.
+    """
+    producto_id = Producto_Variantes.objects.filter(pk=variante_id).values_list('producto_id', flat=True).first()
+    if producto_id is None:
+        # La variante se está eliminando: sus resúmenes caen en cascada
+        return
+    cambios = _cambios(calificacion, signo)
+    with transaction.atomic():
+        if signo > 0:
+            CalificacionVariante.objects.get_or_create(variante_id=variante_id)
+            CalificacionProducto.objects.get_or_create(producto_id=producto_id)
+        CalificacionVariante.objects.filter(variante_id=variante_id).update(**cambios)
+        CalificacionProducto.objects.filter(producto_id=producto_id).update(**cambios)
+
+
+def recalcular():
+    """Reconstruir todos los resúmenes a partir de las reseñas existentes"""
+    agregados = {
+        'total': Count('id'),
+        'suma': Sum('calificacion'),
+        **{f'estrellas_{n}': Count('id', filter=Q(calificacion=n)) for n in ESTRELLAS},
+    }
+    with transaction.atomic():
+        CalificacionVariante.objects.all().delete()
+        CalificacionProducto.objects.all().delete()
+        CalificacionVariante.objects.bulk_create([
+            CalificacionVariante(variante_id=fila.pop('Producto_categoria_id'), **fila)
+            for fila in Comentarios.objects.values('Producto_categoria_id').annotate(**agregados).order_by()
+        ])
+        CalificacionProducto.objects.bulk_create([
+            CalificacionProducto(producto_id=fila.pop('Producto_categoria__producto_id'), **fila)
+            for fila in Comentarios.objects.values('Producto_categoria__producto_id').annotate(**agregados).order_by()
+        ])
@@ -0,0 +1,122 @@
+"""
+Derivados responsivos de las imágenes de producto (miniaturas, WebP, AVIF).
+
+Se generan con Pillow al terminar la subida asíncrona (ver subidas.py) y,
+para las imágenes creadas o reemplazadas por cualquier otro camino
+(ImagenProductoViewSet, serializers, admin), desde una señal post_save al
+confirmarse la transacción (ver signals.py). Se guardan junto al original
+en el storage por defecto:
+    productos/derivados/<nombre>_<ancho>.<formato>
+Imagen_Producto.derivados guarda {formato: {ancho: nombre_en_storage}} y
+los serializers lo exponen como un mapa tipo `srcset` con las URLs, para
+que el frontend elija el archivo más pequeño que le sirva.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+CARPETA = 'productos/derivados'
+
+# Parámetros de codificación por formato
+OPCIONES_FORMATO = {
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 60},
+}
+
+
+def get_anchos():
+    return tuple(getattr(settings, 'IMAGENES_ANCHOS', (160, 320, 640, 1024)))
+
+
+def get_formatos():
+    """Formatos a generar; AVIF solo si el Pillow instalado lo soporta"""
+    formatos = list(getattr(settings, 'IMAGENES_FORMATOS', ('jpeg', 'webp', 'avif')))
+    return [f for f in formatos if f == 'jpeg' or features.check(f)]
+
+
+def _codificar(imagen, formato):
+    if formato == 'jpeg' and imagen.mode not in ('RGB', 'L'):
+        imagen = imagen.convert('RGB')
+    buffer = io.BytesIO()
+    imagen.save(buffer, format=formato.upper(), **OPCIONES_FORMATO.get(formato, {}))
+    return buffer.getvalue()
+
+
+def generar_derivados(imagen_producto, archivo=None):
+    """
+    Generar los derivados de una Imagen_Producto y guardarlos en el storage.
+    `archivo` permite pasar el original ya abierto (ej. el temporal local de
+    la subida) para no descargarlo de S3. Retorna el mapa guardado.
+    """
+    # Si se abre aquí se cierra aquí (en S3 es un cuerpo en streaming); el
+    # archivo recibido lo cierra quien lo pasó
+    abierto_aqui = archivo is None
+    if abierto_aqui:
+        if not imagen_producto.imagen:
+            return {}
+        archivo = imagen_producto.imagen.open('rb')
+
+    try:
+        # Al regenerar se borran los anteriores para no acumular archivos huérfanos
+        for anchos in (imagen_producto.derivados or {}).values():
+            for nombre in anchos.values():
+                default_storage.delete(nombre)
+
+        with Image.open(archivo) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA', 'L'):
+                original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+            ancho_original = original.width
+
+            # Anchos menores al original, más el propio ancho original como tope
+            anchos = [a for a in get_anchos() if a < ancho_original] + [ancho_original]
+            base = os.path.splitext(os.path.basename(imagen_producto.imagen.name or archivo.name))[0]
+
+            derivados = {}
+            for ancho in sorted(set(anchos)):
+                alto = max(1, round(original.height * ancho / ancho_original))
+                reducida = original if ancho == ancho_original else original.resize((ancho, alto), Image.LANCZOS)
+                for formato in get_formatos():
+                    extension = 'jpg' if formato == 'jpeg' else formato
+                    nombre = default_storage.save(
+                        f'{CARPETA}/{base}_{ancho}.{extension}',
+                        ContentFile(_codificar(reducida, formato))
+                    )
+                    derivados.setdefault(formato, {})[str(ancho)] = nombre
+    finally:
+        if abierto_aqui:
+            archivo.close()
+
+    imagen_producto.derivados = derivados
+    # Marca para la señal post_save: el archivo actual ya tiene derivados
+    imagen_producto._derivados_de = imagen_producto.imagen.name
+    imagen_producto.save(update_fields=['derivados'])
+    return derivados
+
+
+def generar_derivados_seguro(imagen_producto, archivo=None):
+    """Igual que generar_derivados, pero un fallo no interrumpe la subida"""
+    try:
+        return generar_derivados(imagen_producto, archivo)
+    except Exception:
+        logger.exception('No se pudieron generar derivados de la imagen %s', imagen_producto.pk)
+        return {}
+
+
+def srcset(imagen_producto):
+    """
+    Mapa {formato: {ancho: url}} de los derivados de una imagen.
+    Vacío si todavía no se generaron.
+    """
+    return {
+        formato: {ancho: default_storage.url(nombre) for ancho, nombre in anchos.items()}
+        for formato, anchos in (imagen_producto.derivados or {}).items()
+    }
@@ -0,0 +1,208 @@
+"""
+Facetas del catálogo (categoría, color, talla y rango de precio).
+
+Todos los conteos salen de una sola consulta: un GROUP BY por faceta,
+unidos con UNION ALL junto con el árbol de categorías (ruta y nombre) que
+se usa para acumular. Los filtros son de selección múltiple (OR dentro de
+una faceta, AND entre facetas) y cada faceta se cuenta aplicando todos los
+filtros menos el suyo, para que el usuario vea cuántos resultados tendría
+al marcar otra opción de la misma faceta.
+
+Los conteos de categoría incluyen los de sus subcategorías (se acumulan
+subiendo por la ruta materializada).
+
+El listado de variantes (ProductoCategoriaViewSet.list) parte de la misma
+base_variantes() y aplica el mismo filtrar(), así el total de las facetas
+coincide con los resultados. Un único valor de color o talla se busca por
+coincidencia parcial (como siempre lo hizo el listado); varios, exactos.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Concat
+
+from .models import Categoria, Producto_Variantes, filtro_categoria_con_descendientes
+
+FACETAS = ('categoria', 'color', 'talla', 'precio')
+
+
+def get_bandas_precio():
+    """Rangos de precio [desde, hasta) configurables; hasta=None es el último rango abierto"""
+    return getattr(settings, 'FACETAS_BANDAS_PRECIO', ((0, 50), (50, 100), (100, 200), (200, None)))
+
+
+def clave_banda(desde, hasta):
+    return f'{desde}-{hasta}' if hasta is not None else f'{desde}+'
+
+
+def leer_seleccion(query_params):
+    """{faceta: [valores]} a partir de ?color=rojo&color=azul&precio=0-50 (acepta también 'a,b')"""
+    seleccion = {}
+    for faceta in FACETAS:
+        valores = []
+        for valor in query_params.getlist(faceta):
+            valores.extend(v.strip() for v in valor.split(',') if v.strip())
+        if faceta == 'categoria':
+            valores = [v for v in valores if v.isdigit()]
+        if valores:
+            seleccion[faceta] = valores
+    return seleccion
+
+
+def _filtro(faceta, valores):
+    filtro = Q()
+    if faceta == 'categoria':
+        for categoria_id in valores:
+            filtro |= filtro_categoria_con_descendientes(categoria_id, campo='producto__Categoria')
+    elif faceta in ('color', 'talla'):
+        if len(valores) == 1:
+            filtro = Q(**{f'{faceta}__icontains': valores[0]})
+        else:
+            filtro = Q(**{f'{faceta}__in': valores})
+    elif faceta == 'precio':
+        bandas = {clave_banda(desde, hasta): (desde, hasta) for desde, hasta in get_bandas_precio()}
+        for valor in valores:
+            if valor not in bandas:
+                continue
+            desde, hasta = bandas[valor]
+            rango = Q(precio_unitario__gte=desde)
+            if hasta is not None:
+                rango &= Q(precio_unitario__lt=hasta)
+            filtro |= rango
+        if not filtro:
+            # Ninguna banda válida: el filtro no debe devolver nada
+            filtro = Q(pk__in=[])
+    return filtro
+
+
+def filtrar(queryset, seleccion, excepto=None):
+    """Aplicar la selección al queryset de variantes (omitiendo la faceta `excepto`)"""
+    for faceta, valores in seleccion.items():
+        if faceta != excepto:
+            queryset = queryset.filter(_filtro(faceta, valores))
+    return queryset
+
+
+def _expresion(faceta):
+    if faceta == 'categoria':
+        return Cast('producto__Categoria_id', output_field=CharField())
+    if faceta == 'precio':
+        return Case(
+            *[
+                When(
+                    Q(precio_unitario__gte=desde) & (Q(precio_unitario__lt=hasta) if hasta is not None else Q()),
+                    then=Value(clave_banda(desde, hasta))
+                )
+                for desde, hasta in get_bandas_precio()
+            ],
+            default=Value(''),
+            output_field=CharField()
+        )
+    return Cast(faceta, output_field=CharField())
+
+
+def base_variantes():
+    """Variantes visibles en el catálogo: base del listado y de los conteos"""
+    return Producto_Variantes.objects.filter(activo=True, producto__activo=True)
+
+
+def contar(seleccion, queryset=None):
+    """
+    Conteos de todas las facetas para la selección actual.
+    Retorna {'total': n, 'facetas': {faceta: [{valor, count, seleccionado, ...}]}}.
+    """
+    if queryset is None:
+        queryset = base_variantes()
+
+    consultas = [
+        # Árbol de categorías para la acumulación: valor = "<ruta>\t<nombre>"
+        Categoria.objects.filter(activo=True).order_by()
+        .annotate(
+            faceta=Value('arbol', output_field=CharField()),
+            valor=Concat('ruta', Value('\t'), 'nombre', output_field=CharField()),
+            n=Value(0, output_field=IntegerField()),
+        )
+        .values_list('faceta', 'valor', 'n'),
+        filtrar(queryset, seleccion).order_by()
+        .annotate(faceta=Value('total', output_field=CharField()), valor=Value('', output_field=CharField()))
+        .values('faceta', 'valor')
+        .annotate(n=Count('id'))
+        .values_list('faceta', 'valor', 'n')
+    ]
+    for faceta in FACETAS:
+        consultas.append(
+            filtrar(queryset, seleccion, excepto=faceta).order_by()
+            .annotate(faceta=Value(faceta, output_field=CharField()), valor=_expresion(faceta))
+            .values('faceta', 'valor')
+            .annotate(n=Count('id'))
+            .values_list('faceta', 'valor', 'n')
+        )
+    filas = list(consultas[0].union(*consultas[1:], all=True))
+
+    total = 0
+    conteos = defaultdict(dict)
+    arbol = {}
+    for faceta, valor, n in filas:
+        if faceta == 'total':
+            total = n
+        elif faceta == 'arbol':
+            ruta, nombre = valor.split('\t', 1)
+            ids = [int(segmento) for segmento in ruta.strip('/').split('/')]
+            arbol[ids[-1]] = {'nombre': nombre, 'id_padre_id': ids[-2] if len(ids) > 1 else None, 'ruta': ruta}
+        elif valor:
+            conteos[faceta][valor] = n
+
+    resultado = {
+        'color': _lista(conteos['color'], seleccion.get('color', [])),
+        'talla': _lista(conteos['talla'], seleccion.get('talla', [])),
+        'precio': _lista_precio(conteos['precio'], seleccion.get('precio', [])),
+        'categoria': _lista_categorias(conteos['categoria'], seleccion.get('categoria', []), arbol),
+    }
+    return {'total': total, 'facetas': resultado}
+
+
+def _lista(conteos, seleccionados):
+    return [
+        {'valor': valor, 'count': n, 'seleccionado': valor in seleccionados}
+        for valor, n in sorted(conteos.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+def _lista_precio(conteos, seleccionados):
+    """Bandas en el orden configurado (incluye las vacías para un slider estable)"""
+    bandas = []
+    for desde, hasta in get_bandas_precio():
+        clave = clave_banda(desde, hasta)
+        bandas.append({
+            'valor': clave,
+            'desde': desde,
+            'hasta': hasta,
+            'count': conteos.get(clave, 0),
+            'seleccionado': clave in seleccionados,
+        })
+    return bandas
+
+
+def _lista_categorias(conteos, seleccionados, categorias):
+    """Acumular los conteos directos en los ancestros usando la ruta materializada"""
+    acumulado = defaultdict(int)
+    for categoria_id, n in conteos.items():
+        categoria = categorias.get(int(categoria_id))
+        if not categoria:
+            continue
+        for segmento in categoria['ruta'].strip('/').split('/'):
+            acumulado[int(segmento)] += n
+
+    return [
+        {
+            'valor': str(categoria_id),
+            'id': categoria_id,
+            'nombre': categorias[categoria_id]['nombre'],
+            'id_padre': categorias[categoria_id]['id_padre_id'],
+            'count': n,
+            'seleccionado': str(categoria_id) in seleccionados,
+        }
+        for categoria_id, n in sorted(acumulado.items(), key=lambda item: categorias.get(item[0], {}).get('ruta', ''))
+        if categoria_id in categorias
+    ]
@@ -0,0 +1,114 @@
+"""
+Historial de stock: libro de movimientos + snapshots periódicos.
+
+Todo cambio de Inventario.stock deja un MovimientoStock (ver stock.py, la
+recepción de compras, la importación y las señales de Inventario para los
+ajustes manuales). El comando `snapshot_stock` guarda periódicamente el
+stock de todos los inventarios en SnapshotStock, así que el stock en un
+momento T se obtiene como:
+
+    stock(T) = último snapshot con fecha <= T
+               + suma de movimientos con snapshot.fecha < fecha <= T
+
+La cantidad de movimientos a sumar queda acotada por la frecuencia de los
+snapshots. Ambas tablas tienen índice (inventario, fecha).
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import DateTimeField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Inventario, MovimientoStock, SnapshotStock
+
+# Límite inferior para sumar movimientos de inventarios sin snapshot previo
+INICIO = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def tomar_snapshot(momento=None, lote=1000):
+    """
+    Guardar el stock actual de todos los inventarios. Retorna cuántos se guardaron.
+
+    Los inventarios se bloquean antes de leerlos y `momento` se toma recién
+    con los bloqueos adquiridos: las escrituras de stock en curso (que tienen
+    la fila bloqueada desde su UPDATE) terminan antes, con su movimiento
+    fechado antes de `momento`, y las siguientes esperan y quedan después.
+    Así ningún movimiento queda fuera del snapshot y de la suma posterior, ni
+    se cuenta en ambos. `lote` solo agrupa los INSERT.
+    """
+    with transaction.atomic():
+        filas = list(Inventario.objects.select_for_update().order_by('id').values_list('id', 'stock'))
+        momento = momento or timezone.now()
+        for inicio in range(0, len(filas), lote):
+            SnapshotStock.objects.bulk_create([
+                SnapshotStock(inventario_id=inventario_id, stock=stock, fecha=momento)
+                for inventario_id, stock in filas[inicio:inicio + lote]
+            ])
+    return len(filas)
+
+
+def stocks_en(momento, inventarios=None):
+    """
+    {inventario_id: stock} en `momento`, en una sola consulta.
+    `inventarios` es un queryset o lista de ids opcional para acotar.
+    """
+    snapshots = SnapshotStock.objects.filter(inventario=OuterRef('pk'), fecha__lte=momento).order_by('-fecha', '-id')
+    queryset = Inventario.objects.all()
+    if inventarios is not None:
+        queryset = queryset.filter(pk__in=inventarios)
+    queryset = queryset.annotate(
+        snapshot_fecha=Subquery(snapshots.values('fecha')[:1]),
+        snapshot_stock=Subquery(snapshots.values('stock')[:1]),
+    )
+    movimientos = (
+        MovimientoStock.objects.filter(
+            inventario=OuterRef('pk'),
+            fecha__gt=Coalesce(OuterRef('snapshot_fecha'), Value(INICIO, output_field=DateTimeField())),
+            fecha__lte=momento,
+        )
+        .order_by()
+        .values('inventario')
+        .annotate(total=Sum('cantidad'))
+        .values('total')
+    )
+    queryset = queryset.annotate(
+        stock_historico=Coalesce('snapshot_stock', 0)
+        + Coalesce(Subquery(movimientos, output_field=IntegerField()), 0)
+    )
+    return dict(queryset.order_by().values_list('pk', 'stock_historico'))
+
+
+def stock_en(inventario_id, momento):
+    return stocks_en(momento, [inventario_id]).get(inventario_id)
+
+
+def movimientos(inventario_id=None, variante_id=None, desde=None, hasta=None, tipo=None):
+    """Movimientos de un inventario o variante en un rango de fechas, más recientes primero"""
+    queryset = MovimientoStock.objects.all()
+    if inventario_id is not None:
+        queryset = queryset.filter(inventario_id=inventario_id)
+    if variante_id is not None:
+        queryset = queryset.filter(producto_variante_id=variante_id)
+    if desde:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha__lte=hasta)
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+    return queryset.order_by('-fecha', '-id')
+
+
+def verificar(inventarios=None):
+    """
+    Inventarios cuyo stock actual no coincide con snapshot + movimientos
+    (cambios hechos por fuera de stock.py o con SQL directo).
+    Retorna [(inventario_id, stock actual, stock según el historial)].
+    """
+    historico = stocks_en(timezone.now(), inventarios)
+    actuales = Inventario.objects.filter(pk__in=historico.keys()).values_list('pk', 'stock')
+    return [
+        (inventario_id, stock, historico[inventario_id])
+        for inventario_id, stock in actuales
+        if historico[inventario_id] != stock
+    ]
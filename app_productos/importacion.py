@@ -0,0 +1,499 @@
+"""
+Importación masiva de productos, variantes e inventario desde CSV o JSONL.
+
+Cada fila describe una variante:
+    producto, descripcion, categoria, color, talla, precio_unitario,
+    stock, stock_minimo, stock_maximo, ubicacion_almacen, activo
+(`producto`, `color`, `talla` y `precio_unitario` son obligatorias).
+
+El archivo se lee en streaming y se procesa en lotes de `lote` filas, de
+modo que la memoria no depende del tamaño del archivo. Por lote:
+    1. validación de todas las filas (sin serializers de DRF)
+    2. productos existentes por nombre (una consulta) y bulk_create de los nuevos
+    3. variantes existentes por (producto, color, talla) (una consulta)
+    4. bulk_create de Inventario y Producto_Variantes nuevos y un
+       UPDATE ... FROM (VALUES ...) de precio/activo/stock de los existentes
+       (a una variante existente sin Inventario se le crea uno si la fila
+       trae stock)
+Las categorías se resuelven por nombre (sin distinguir mayúsculas) con un
+mapa en memoria cargado una sola vez. Cada lote corre en su transacción.
+
+Los cambios de stock quedan en el historial como movimientos de ajuste
+(ver historial.py) y reevalúan las alertas de stock (ver alertas.py). Estas escrituras no disparan señales, así que al
+terminar se reindexa la búsqueda de los productos tocados y se invalida
+la caché del catálogo.
+
+Desde la API la importación no corre dentro de la petición (un archivo de
+cientos de miles de filas supera cualquier timeout): `encolar_importacion`
+guarda el archivo en el almacenamiento temporal de las subidas y registra
+una ImportacionCatalogo pendiente que ejecuta el comando
+`procesar_importaciones` (cron o worker con --loop). Con
+IMPORTACION_ASINCRONA=False se ejecuta al confirmar la transacción.
+"""
+import csv
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import alertas, cache
+from .busqueda import actualizar_vectores
+from .models import Categoria, ImportacionCatalogo, Inventario, Producto, Producto_Variantes
+from .stock import registrar_movimientos
+from .subidas import get_storage_temporal
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_OBLIGATORIOS = ('producto', 'color', 'talla', 'precio_unitario')
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'y', 's'}
+VALORES_FALSOS = {'0', 'false', 'no', 'n'}
+
+
+def get_tamano_lote():
+    return getattr(settings, 'IMPORTACION_TAMANO_LOTE', 1000)
+
+
+def get_max_errores():
+    return getattr(settings, 'IMPORTACION_MAX_ERRORES', 1000)
+
+
+@dataclass
+class ResultadoImportacion:
+    filas: int = 0
+    productos_creados: int = 0
+    variantes_creadas: int = 0
+    variantes_actualizadas: int = 0
+    filas_con_error: int = 0
+    # Solo se guardan los primeros IMPORTACION_MAX_ERRORES para acotar la memoria
+    errores: list = field(default_factory=list)
+
+    def agregar_error(self, fila, errores):
+        self.filas_con_error += 1
+        if len(self.errores) < get_max_errores():
+            self.errores.append({'fila': fila, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'filas': self.filas,
+            'productos_creados': self.productos_creados,
+            'variantes_creadas': self.variantes_creadas,
+            'variantes_actualizadas': self.variantes_actualizadas,
+            'filas_con_error': self.filas_con_error,
+            'errores': self.errores,
+            'errores_truncados': self.filas_con_error > len(self.errores),
+        }
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+def detectar_formato(nombre):
+    return 'jsonl' if nombre.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def leer_filas(archivo, formato='csv'):
+    """
+    Generador de (número de fila, dict) sobre un archivo de texto o binario.
+    Las filas JSONL mal formadas se devuelven como (n, None).
+    """
+    if not isinstance(archivo, io.TextIOBase):
+        archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+
+    if formato == 'jsonl':
+        for numero, linea in enumerate(archivo, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+    else:
+        # La fila 1 es el encabezado
+        for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+            yield numero, fila
+
+
+def en_lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ----------------------------------------------------------------------
+# Validación
+# ----------------------------------------------------------------------
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def _entero(valor, campo, errores, defecto=None):
+    if valor in ('', None):
+        return defecto
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        errores[campo] = 'Debe ser un número entero'
+        return None
+    if numero < 0:
+        errores[campo] = 'No puede ser negativo'
+    return numero
+
+
+def _booleano(valor, errores):
+    if valor in ('', None):
+        return True
+    if isinstance(valor, bool):
+        return valor
+    valor = str(valor).strip().lower()
+    if valor in VALORES_VERDADEROS:
+        return True
+    if valor in VALORES_FALSOS:
+        return False
+    errores['activo'] = 'Valor booleano no válido'
+    return None
+
+
+def validar_fila(fila, categorias):
+    """Retorna (datos normalizados, errores) de una fila ya parseada"""
+    if fila is None:
+        return None, {'fila': 'JSON no válido'}
+
+    errores = {}
+    datos = {campo: _texto(fila, campo) for campo in (
+        'producto', 'descripcion', 'categoria', 'color', 'talla', 'ubicacion_almacen'
+    )}
+    for campo in CAMPOS_OBLIGATORIOS:
+        if _texto(fila, campo) == '':
+            errores[campo] = 'Este campo es requerido'
+
+    for campo, maximo in (('producto', 100), ('color', 50), ('talla', 50), ('ubicacion_almacen', 100)):
+        if len(datos[campo]) > maximo:
+            errores[campo] = f'Máximo {maximo} caracteres'
+
+    precio = _texto(fila, 'precio_unitario')
+    if precio:
+        try:
+            datos['precio_unitario'] = Decimal(precio.replace(',', '.')).quantize(Decimal('0.01'))
+            if datos['precio_unitario'] < 0 or datos['precio_unitario'] >= Decimal('1e8'):
+                errores['precio_unitario'] = 'Fuera de rango'
+        except InvalidOperation:
+            errores['precio_unitario'] = 'Debe ser un número decimal'
+
+    datos['categoria_id'] = None
+    if datos['categoria']:
+        datos['categoria_id'] = categorias.get(datos['categoria'].lower())
+        if datos['categoria_id'] is None:
+            errores['categoria'] = f"Categoría '{datos['categoria']}' no existe"
+
+    datos['stock'] = _entero(fila.get('stock'), 'stock', errores)
+    datos['stock_minimo'] = _entero(fila.get('stock_minimo'), 'stock_minimo', errores, defecto=0)
+    datos['stock_maximo'] = _entero(fila.get('stock_maximo'), 'stock_maximo', errores, defecto=0)
+    datos['activo'] = _booleano(fila.get('activo'), errores)
+    return datos, errores
+
+
+def mapa_categorias():
+    """{nombre en minúsculas: id}; ante nombres repetidos gana la categoría más antigua"""
+    categorias = {}
+    for categoria_id, nombre in Categoria.objects.order_by('-id').values_list('id', 'nombre'):
+        categorias[nombre.strip().lower()] = categoria_id
+    return categorias
+
+
+# ----------------------------------------------------------------------
+# Escritura
+# ----------------------------------------------------------------------
+def actualizar_en_bloque(modelo, objetos, campos, tamano_lote):
+    """
+    Guardar `campos` de muchos objetos con un UPDATE ... FROM (VALUES ...)
+    por bloque. Reemplaza a bulk_update, que arma un CASE con una rama por
+    fila y pasa más tiempo resolviendo expresiones en Python que en la base.
+    """
+    objetos = list(objetos)
+    if not objetos:
+        return
+    qn = connection.ops.quote_name
+    meta = modelo._meta
+    columnas = [meta.pk] + [meta.get_field(campo) for campo in campos]
+    tamano = max(1, min(tamano_lote, connection.ops.bulk_batch_size(columnas, objetos)))
+
+    # PostgreSQL tipa los parámetros de VALUES como texto: se castean al tipo de la columna
+    if connection.vendor == 'postgresql':
+        marcadores = ', '.join(f'CAST(%s AS {columna.db_type(connection)})' for columna in columnas)
+    else:
+        marcadores = ', '.join('%s' for _ in columnas)
+    tabla = qn(meta.db_table)
+    pk = qn(meta.pk.column)
+    nombres = ', '.join(qn(columna.column) for columna in columnas)
+    asignaciones = ', '.join(f'{qn(columna.column)} = v.{qn(columna.column)}' for columna in columnas[1:])
+
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(objetos), tamano):
+            bloque = objetos[inicio:inicio + tamano]
+            valores = ', '.join([f'({marcadores})'] * len(bloque))
+            parametros = [
+                columna.get_db_prep_save(getattr(objeto, columna.attname), connection)
+                for objeto in bloque for columna in columnas
+            ]
+            cursor.execute(
+                f'WITH v ({nombres}) AS (VALUES {valores}) '
+                f'UPDATE {tabla} SET {asignaciones} FROM v WHERE {tabla}.{pk} = v.{pk}',
+                parametros
+            )
+
+
+def _procesar_lote(lote, categorias, resultado, tamano_lote):
+    """Validar y guardar un lote de filas. Retorna los ids de producto tocados."""
+    validas = []
+    for numero, fila in lote:
+        datos, errores = validar_fila(fila, categorias)
+        if errores:
+            resultado.agregar_error(numero, errores)
+        else:
+            validas.append(datos)
+    if not validas:
+        return set()
+
+    # Productos: existentes por nombre, los nuevos se crean una sola vez por lote
+    nombres = {datos['producto'] for datos in validas}
+    productos = {}
+    for producto_id, nombre in Producto.objects.filter(nombre__in=nombres).order_by('-id').values_list('id', 'nombre'):
+        productos[nombre] = producto_id
+
+    nuevos = {}
+    for datos in validas:
+        if datos['producto'] not in productos and datos['producto'] not in nuevos:
+            nuevos[datos['producto']] = Producto(
+                nombre=datos['producto'],
+                descripcion=datos['descripcion'],
+                Categoria_id=datos['categoria_id'],
+            )
+    if nuevos:
+        creados = Producto.objects.bulk_create(nuevos.values(), batch_size=tamano_lote)
+        resultado.productos_creados += len(creados)
+        productos.update({producto.nombre: producto.pk for producto in creados})
+
+    # Variantes: existentes por (producto, color, talla)
+    existentes = {
+        (variante.producto_id, variante.color, variante.talla): variante
+        for variante in Producto_Variantes.objects.filter(producto_id__in=productos.values())
+    }
+
+    # Inventarios bloqueados hasta el fin del lote: una reserva, un checkout o
+    # una recepción concurrente no puede cambiar el stock entre esta lectura y
+    # el UPDATE, que lo pisa con el valor absoluto del archivo (y el delta del
+    # movimiento 'ajuste' se calcula sobre el stock vigente)
+    inventario_ids = {variante.Inventario_id_id for variante in existentes.values() if variante.Inventario_id_id}
+    bloqueados = {
+        inventario.pk: inventario
+        for inventario in Inventario.objects.select_for_update().filter(pk__in=inventario_ids).order_by('pk')
+    }
+
+    ahora = timezone.now()
+    por_crear = {}
+    variantes_actualizadas = {}
+    inventarios_actualizados = {}
+    stock_anterior = {}
+    sin_inventario = {}
+    for datos in validas:
+        clave = (productos[datos['producto']], datos['color'], datos['talla'])
+        variante = existentes.get(clave)
+        if variante is None:
+            # Una fila repetida dentro del lote pisa a la anterior
+            por_crear[clave] = datos
+            continue
+        variante.precio_unitario = datos['precio_unitario']
+        variante.activo = datos['activo']
+        variantes_actualizadas[variante.pk] = variante
+        if variante.Inventario_id_id is None and datos['stock'] is not None:
+            sin_inventario[variante.pk] = (variante, datos)
+            continue
+        inventario = bloqueados.get(variante.Inventario_id_id)
+        if inventario is not None and datos['stock'] is not None:
+            stock_anterior.setdefault(inventario.pk, inventario.stock)
+            inventario.stock = datos['stock']
+            inventario.stock_minimo = datos['stock_minimo']
+            inventario.stock_maximo = datos['stock_maximo']
+            if datos['ubicacion_almacen']:
+                inventario.ubicacion_almacen = datos['ubicacion_almacen']
+            inventario.ultima_actualizacion = ahora
+            inventarios_actualizados[inventario.pk] = inventario
+
+    if por_crear:
+        inventarios = Inventario.objects.bulk_create([
+            Inventario(
+                stock=datos['stock'] or 0,
+                stock_minimo=datos['stock_minimo'],
+                stock_maximo=datos['stock_maximo'],
+                ubicacion_almacen=datos['ubicacion_almacen'],
+            )
+            for datos in por_crear.values()
+        ], batch_size=tamano_lote)
+        Producto_Variantes.objects.bulk_create([
+            Producto_Variantes(
+                producto_id=producto_id,
+                color=color,
+                talla=talla,
+                precio_unitario=datos['precio_unitario'],
+                activo=datos['activo'],
+                Inventario_id=inventario,
+            )
+            for ((producto_id, color, talla), datos), inventario in zip(por_crear.items(), inventarios)
+        ], batch_size=tamano_lote)
+        resultado.variantes_creadas += len(por_crear)
+        registrar_movimientos(
+            {inventario.pk: inventario.stock for inventario in inventarios}, 'ajuste', 'importacion', fecha=ahora
+        )
+        alertas.programar(inventario.pk for inventario in inventarios)
+
+    if sin_inventario:
+        inventarios = Inventario.objects.bulk_create([
+            Inventario(
+                stock=datos['stock'],
+                stock_minimo=datos['stock_minimo'],
+                stock_maximo=datos['stock_maximo'],
+                ubicacion_almacen=datos['ubicacion_almacen'],
+            )
+            for _, datos in sin_inventario.values()
+        ], batch_size=tamano_lote)
+        for (variante, _), inventario in zip(sin_inventario.values(), inventarios):
+            variante.Inventario_id = inventario
+        actualizar_en_bloque(
+            Producto_Variantes, [variante for variante, _ in sin_inventario.values()], ['Inventario_id'], tamano_lote
+        )
+        registrar_movimientos(
+            {inventario.pk: inventario.stock for inventario in inventarios}, 'ajuste', 'importacion', fecha=ahora
+        )
+        alertas.programar(inventario.pk for inventario in inventarios)
+
+    if variantes_actualizadas:
+        actualizar_en_bloque(
+            Producto_Variantes, variantes_actualizadas.values(), ['precio_unitario', 'activo'], tamano_lote
+        )
+        resultado.variantes_actualizadas += len(variantes_actualizadas)
+    if inventarios_actualizados:
+        actualizar_en_bloque(
+            Inventario, inventarios_actualizados.values(),
+            ['stock', 'stock_minimo', 'stock_maximo', 'ubicacion_almacen', 'ultima_actualizacion'],
+            tamano_lote
+        )
+        registrar_movimientos(
+            {pk: inventario.stock - stock_anterior[pk] for pk, inventario in inventarios_actualizados.items()},
+            'ajuste', 'importacion', fecha=ahora
+        )
+        alertas.programar(inventarios_actualizados.keys())
+
+    return set(productos.values())
+
+
+def importar(archivo, formato='csv', tamano_lote=None, simular=False):
+    """
+    Importar un archivo CSV/JSONL. Con `simular=True` valida y ejecuta cada
+    lote dentro de una transacción que se revierte (nada queda guardado).
+    Retorna un ResultadoImportacion.
+    """
+    tamano_lote = tamano_lote or get_tamano_lote()
+    categorias = mapa_categorias()
+    resultado = ResultadoImportacion()
+    hubo_cambios = False
+
+    for lote in en_lotes(leer_filas(archivo, formato), tamano_lote):
+        resultado.filas += len(lote)
+        with transaction.atomic():
+            producto_ids = _procesar_lote(lote, categorias, resultado, tamano_lote)
+            if simular:
+                transaction.set_rollback(True)
+            elif producto_ids:
+                actualizar_vectores(producto_ids)
+                hubo_cambios = True
+
+    if hubo_cambios:
+        cache.invalidar()
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# Importaciones encoladas desde la API
+# ----------------------------------------------------------------------
+def encolar_importacion(archivo, formato, tamano_lote, simular=False, usuario=None):
+    """Guardar el archivo en el almacenamiento temporal y registrar la importación pendiente"""
+    nombre_temporal = get_storage_temporal().save(f'importaciones/{os.path.basename(archivo.name)}', archivo)
+    with transaction.atomic():
+        importacion = ImportacionCatalogo.objects.create(
+            archivo_temporal=nombre_temporal,
+            nombre_archivo=archivo.name,
+            formato=formato,
+            tamano_lote=tamano_lote,
+            simular=simular,
+            usuario=usuario,
+        )
+        if not getattr(settings, 'IMPORTACION_ASINCRONA', True):
+            transaction.on_commit(lambda: procesar_importacion(importacion.id))
+    return importacion
+
+
+def procesar_importacion(importacion_id):
+    """
+    Ejecutar una importación pendiente. El UPDATE condicional evita que dos
+    workers la tomen a la vez. Devuelve True si quedó completada.
+    """
+    tomada = ImportacionCatalogo.objects.filter(pk=importacion_id, estado='pendiente').update(
+        estado='procesando', fecha_estado=timezone.now()
+    )
+    if not tomada:
+        return False
+
+    registro = ImportacionCatalogo.objects.get(pk=importacion_id)
+    temporal = get_storage_temporal()
+    try:
+        with temporal.open(registro.archivo_temporal, 'rb') as archivo:
+            resultado = importar(archivo, registro.formato, tamano_lote=registro.tamano_lote,
+                                 simular=registro.simular)
+    except Exception as e:
+        logger.exception('Error en la importación de catálogo %s', importacion_id)
+        ImportacionCatalogo.objects.filter(pk=importacion_id).update(
+            estado='error', error=f'{type(e).__name__}: {e}', fecha_estado=timezone.now()
+        )
+        return False
+
+    ImportacionCatalogo.objects.filter(pk=importacion_id).update(
+        estado='completada', resultado=resultado.como_dict(), error=None, fecha_estado=timezone.now()
+    )
+    temporal.delete(registro.archivo_temporal)
+    return True
+
+
+def procesar_importaciones_pendientes(procesando_desde_minutos=60):
+    """
+    Ejecutar las importaciones pendientes en orden de llegada. Las que quedaron
+    en 'procesando' más de `procesando_desde_minutos` (worker caído) vuelven a
+    'pendiente': reimportar es seguro porque cada fila fija valores absolutos.
+    Retorna (completadas, fallidas).
+    """
+    limite = timezone.now() - timedelta(minutes=procesando_desde_minutos)
+    ImportacionCatalogo.objects.filter(estado='procesando', fecha_estado__lt=limite).update(estado='pendiente')
+
+    completadas = fallidas = 0
+    for importacion_id in ImportacionCatalogo.objects.filter(estado='pendiente').order_by('id').values_list(
+        'id', flat=True
+    ):
+        if procesar_importacion(importacion_id):
+            completadas += 1
+        else:
+            fallidas += 1
+    return completadas, fallidas
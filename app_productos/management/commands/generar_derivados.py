@@ -0,0 +1,32 @@
+"""
+Genera miniaturas y versiones WebP/AVIF de las imágenes ya subidas.
+
+Uso:
+    python manage.py generar_derivados            # solo imágenes sin derivados
+    python manage.py generar_derivados --todas    # regenerar todo (ej. tras cambiar IMAGENES_ANCHOS)
+"""
+from django.core.management.base import BaseCommand
+
+from app_productos.derivados import generar_derivados_seguro
+from app_productos.models import Imagen_Producto
+
+
+class Command(BaseCommand):
+    help = 'Genera los derivados responsivos de las imágenes de producto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenerar también las imágenes que ya tienen derivados')
+
+    def handle(self, *args, **options):
+        queryset = Imagen_Producto.objects.filter(estado_subida='completada').exclude(imagen='').exclude(imagen=None)
+        if not options['todas']:
+            queryset = queryset.filter(derivados={})
+
+        generadas = fallidas = 0
+        for imagen in queryset.order_by('id').iterator():
+            if generar_derivados_seguro(imagen):
+                generadas += 1
+            else:
+                fallidas += 1
+        self.stdout.write(f'Imágenes procesadas: {generadas}, con error: {fallidas}')
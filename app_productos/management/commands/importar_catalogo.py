@@ -0,0 +1,53 @@
+"""
+Importa productos, variantes e inventario desde un archivo CSV o JSONL
+(formato de las filas en app_productos/importacion.py).
+
+Uso:
+    python manage.py importar_catalogo proveedor.csv
+    python manage.py importar_catalogo proveedor.jsonl --lote 5000
+    python manage.py importar_catalogo proveedor.csv --simular     # solo validar
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_productos.importacion import detectar_formato, get_tamano_lote, importar
+
+
+class Command(BaseCommand):
+    help = 'Importa el catálogo de un proveedor desde CSV o JSONL en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV o JSONL')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--lote', type=int, default=get_tamano_lote(),
+                            help='Filas procesadas por lote/transacción')
+        parser.add_argument('--simular', action='store_true',
+                            help='Validar y ejecutar sin guardar nada')
+        parser.add_argument('--errores', metavar='RUTA',
+                            help='Guardar los errores por fila en un archivo JSONL')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or detectar_formato(options['archivo'])
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar(archivo, formato, tamano_lote=max(1, options['lote']),
+                                     simular=options['simular'])
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        self.stdout.write(
+            f"Filas: {resultado.filas}, productos creados: {resultado.productos_creados}, "
+            f"variantes creadas: {resultado.variantes_creadas}, "
+            f"variantes actualizadas: {resultado.variantes_actualizadas}, "
+            f"filas con error: {resultado.filas_con_error}"
+            + (' (simulación, nada guardado)' if options['simular'] else '')
+        )
+        if options['errores'] and resultado.errores:
+            with open(options['errores'], 'w', encoding='utf-8') as salida:
+                for error in resultado.errores:
+                    salida.write(json.dumps(error, ensure_ascii=False) + '\n')
+        else:
+            for error in resultado.errores[:20]:
+                self.stdout.write(f"  fila {error['fila']}: {error['errores']}")
@@ -0,0 +1,47 @@
+"""
+Envía al webhook / cola las alertas de stock que quedaron pendientes
+(normalmente se envían solas al abrirse o resolverse; ver alertas.py).
+
+Uso:
+    python manage.py notificar_alertas                 # una pasada (cron)
+    python manage.py notificar_alertas --loop 30       # worker dedicado, cada 30 s
+    python manage.py notificar_alertas --recalcular    # reevaluar todos los inventarios antes
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_productos import alertas
+
+
+class Command(BaseCommand):
+    help = 'Envía las alertas de stock pendientes al webhook / cola configurados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, default=0, metavar='SEGUNDOS',
+                            help='Repetir cada N segundos en lugar de ejecutar una sola vez')
+        parser.add_argument('--lote', type=int, default=100, help='Alertas por envío')
+        parser.add_argument('--recalcular', action='store_true',
+                            help='Reevaluar las alertas de todos los inventarios (tras cambios por SQL directo)')
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            abiertas, resueltas = alertas.recalcular()
+            self.stdout.write(f'Alertas abiertas: {abiertas}, resueltas: {resueltas}')
+
+        if not alertas.hay_destinos():
+            self.stdout.write('No hay destinos configurados (ALERTAS_STOCK_WEBHOOK_URL / ALERTAS_STOCK_COLA_URL)')
+            return
+
+        intervalo = options['loop']
+        while True:
+            try:
+                enviadas = alertas.notificar_pendientes(lote=options['lote'])
+            except Exception as e:
+                self.stderr.write(f'Error enviando alertas: {e}')
+                enviadas = 0
+            if enviadas or not intervalo:
+                self.stdout.write(f'Alertas enviadas: {enviadas}')
+            if not intervalo:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,30 @@
+"""
+Ejecuta las importaciones de catálogo encoladas desde la API.
+
+Uso:
+    python manage.py procesar_importaciones             # una pasada (cron)
+    python manage.py procesar_importaciones --loop 30   # worker dedicado, cada 30 s
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_productos.importacion import procesar_importaciones_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las importaciones de catálogo pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, default=0, metavar='SEGUNDOS',
+                            help='Repetir cada N segundos en lugar de ejecutar una sola vez')
+
+    def handle(self, *args, **options):
+        intervalo = options['loop']
+        while True:
+            completadas, fallidas = procesar_importaciones_pendientes()
+            if completadas or fallidas or not intervalo:
+                self.stdout.write(f'Importaciones completadas: {completadas}, fallidas: {fallidas}')
+            if not intervalo:
+                break
+            time.sleep(intervalo)
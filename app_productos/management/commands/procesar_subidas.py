@@ -0,0 +1,37 @@
+"""
+Sube a S3 las imágenes que quedaron pendientes en el almacenamiento temporal.
+
+Uso:
+    python manage.py procesar_subidas                        # una pasada (cron)
+    python manage.py procesar_subidas --loop 10              # worker dedicado, cada 10 s
+    python manage.py procesar_subidas --reintentar-errores   # reintentar las fallidas
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_productos.subidas import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Procesa las subidas de imágenes pendientes hacia el storage por defecto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, default=0, metavar='SEGUNDOS',
+                            help='Repetir cada N segundos en lugar de ejecutar una sola vez')
+        parser.add_argument('--lote', type=int, default=100,
+                            help='Imágenes procesadas por pasada')
+        parser.add_argument('--reintentar-errores', action='store_true',
+                            help='Reiniciar el contador de intentos de las subidas fallidas')
+
+    def handle(self, *args, **options):
+        intervalo = options['loop']
+        reintentar = options['reintentar_errores']
+        while True:
+            completadas, fallidas = procesar_pendientes(lote=options['lote'], reintentar_errores=reintentar)
+            reintentar = False
+            if completadas or fallidas or not intervalo:
+                self.stdout.write(f'Subidas completadas: {completadas}, fallidas: {fallidas}')
+            if not intervalo:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,23 @@
+"""
+Reconstruye los resúmenes de calificación (CalificacionVariante/CalificacionProducto)
+a partir de las reseñas. Normalmente se mantienen solos con las señales;
+sirve para reparar diferencias tras cargas masivas con bulk_create o SQL directo.
+
+Uso:
+    python manage.py recalcular_calificaciones
+"""
+from django.core.management.base import BaseCommand
+
+from app_productos.calificaciones import recalcular
+from app_productos.models import CalificacionProducto, CalificacionVariante
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de calificación de variantes y productos'
+
+    def handle(self, *args, **options):
+        recalcular()
+        self.stdout.write(
+            f'Variantes: {CalificacionVariante.objects.count()}, '
+            f'productos: {CalificacionProducto.objects.count()}'
+        )
@@ -0,0 +1,21 @@
+"""
+Recalcula el vector de búsqueda (Producto.busqueda) de todo el catálogo.
+Necesario una vez tras aplicar la migración y después de cargas masivas
+que no pasan por las señales (bulk_create, SQL directo).
+
+Uso:
+    python manage.py reindexar_busqueda
+"""
+from django.core.management.base import BaseCommand
+
+from app_productos.busqueda import actualizar_vectores, es_postgres
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el índice de búsqueda de texto completo de los productos'
+
+    def handle(self, *args, **options):
+        if not es_postgres():
+            self.stdout.write('La búsqueda de texto completo requiere PostgreSQL; nada que hacer')
+            return
+        self.stdout.write(f'Productos reindexados: {actualizar_vectores()}')
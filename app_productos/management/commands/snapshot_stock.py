@@ -0,0 +1,36 @@
+"""
+Guarda un snapshot del stock de todos los inventarios (SnapshotStock).
+Programarlo periódicamente (ej. cron diario) para que las consultas de
+stock histórico sólo sumen los movimientos desde el último snapshot.
+
+Con --verificar, antes del snapshot compara el stock actual con el que
+resulta del historial y lista los inventarios que no coinciden.
+
+Uso:
+    python manage.py snapshot_stock
+    python manage.py snapshot_stock --verificar
+"""
+from django.core.management.base import BaseCommand
+
+from app_productos import historial
+
+
+class Command(BaseCommand):
+    help = 'Guarda un snapshot del stock de todos los inventarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Informar inventarios cuyo stock no coincide con el historial')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por bulk_create')
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = historial.verificar()
+            for inventario_id, actual, calculado in diferencias:
+                self.stdout.write(self.style.WARNING(
+                    f'Inventario {inventario_id}: stock {actual}, según historial {calculado}'
+                ))
+            self.stdout.write(f'Inventarios con diferencias: {len(diferencias)}')
+
+        creados = historial.tomar_snapshot(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Snapshot guardado: {creados} inventarios'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+def calcular_rutas(apps, schema_editor):
+    """Poblar ruta/nivel de las categorías existentes recorriendo el árbol por niveles"""
+    Categoria = apps.get_model('app_productos', 'Categoria')
+    padres = dict(Categoria.objects.values_list('id', 'id_padre_id'))
+    rutas = {}
+
+    def ruta_de(categoria_id, visitados=()):
+        if categoria_id not in rutas:
+            padre_id = padres.get(categoria_id)
+            if padre_id is None or padre_id in visitados:
+                base = ''
+            else:
+                base = ruta_de(padre_id, visitados + (categoria_id,))
+            rutas[categoria_id] = f'{base}{categoria_id:06d}/'
+        return rutas[categoria_id]
+
+    categorias = list(Categoria.objects.all())
+    for categoria in categorias:
+        categoria.ruta = ruta_de(categoria.id)
+        categoria.nivel = categoria.ruta.count('/') - 1
+    Categoria.objects.bulk_update(categorias, ['ruta', 'nivel'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0010_remove_inventario_producto_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='nivel',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='ruta',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(calcular_rutas, migrations.RunPython.noop),
+    ]
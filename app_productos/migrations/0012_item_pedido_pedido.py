@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mover_items_de_compras(apps, schema_editor):
+    """
+    Hasta aquí item_pedido.pedido apuntaba a app_compras.compra: esas filas
+    son líneas de compra, así que se pasan a item_compras (mismos campos)
+    antes de que la columna pase a referenciar app_pedidos.Pedido. Dejarlas
+    rompería la FK o las colgaría de un Pedido cualquiera con el mismo id.
+    """
+    item_pedido = apps.get_model('app_productos', 'item_pedido')
+    item_compras = apps.get_model('app_productos', 'item_compras')
+    filas = item_pedido.objects.all()
+    item_compras.objects.bulk_create([
+        item_compras(
+            producto_variante_id=fila.Producto_variante_id,
+            compra_id=fila.pedido_id,
+            cantidad=fila.cantidad,
+            costo_unitario=fila.precio_unitario,
+            costo_total=fila.subtotal,
+        )
+        for fila in filas.iterator()
+    ], batch_size=1000)
+    filas.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_pedidos', '0004_pedido_tipo_pedido'),
+        ('app_productos', '0011_categoria_ruta'),
+    ]
+
+    operations = [
+        migrations.RunPython(mover_items_de_compras, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='item_pedido',
+            name='pedido',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app_pedidos.pedido'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0012_item_pedido_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='archivo_temporal',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='error_subida',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='estado_subida',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('error', 'Error')], db_index=True, default='completada', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='fecha_estado_subida',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='intentos_subida',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0013_imagen_producto_estado_subida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagen_producto',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def calcular_resumenes(apps, schema_editor):
+    """Poblar los resúmenes de calificación con las reseñas existentes"""
+    Comentarios = apps.get_model('app_productos', 'Comentarios')
+    CalificacionVariante = apps.get_model('app_productos', 'CalificacionVariante')
+    CalificacionProducto = apps.get_model('app_productos', 'CalificacionProducto')
+    agregados = {
+        'total': Count('id'),
+        'suma': Sum('calificacion'),
+        **{f'estrellas_{n}': Count('id', filter=Q(calificacion=n)) for n in range(1, 6)},
+    }
+    CalificacionVariante.objects.bulk_create([
+        CalificacionVariante(variante_id=fila.pop('Producto_categoria_id'), **fila)
+        for fila in Comentarios.objects.values('Producto_categoria_id').annotate(**agregados).order_by()
+    ], batch_size=500)
+    CalificacionProducto.objects.bulk_create([
+        CalificacionProducto(producto_id=fila.pop('Producto_categoria__producto_id'), **fila)
+        for fila in Comentarios.objects.values('Producto_categoria__producto_id').annotate(**agregados).order_by()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0014_imagen_producto_derivados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalificacionProducto',
+            fields=[
+                ('total', models.PositiveIntegerField(default=0)),
+                ('suma', models.PositiveIntegerField(default=0)),
+                ('estrellas_1', models.PositiveIntegerField(default=0)),
+                ('estrellas_2', models.PositiveIntegerField(default=0)),
+                ('estrellas_3', models.PositiveIntegerField(default=0)),
+                ('estrellas_4', models.PositiveIntegerField(default=0)),
+                ('estrellas_5', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calificacion', serialize=False, to='app_productos.producto')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CalificacionVariante',
+            fields=[
+                ('total', models.PositiveIntegerField(default=0)),
+                ('suma', models.PositiveIntegerField(default=0)),
+                ('estrellas_1', models.PositiveIntegerField(default=0)),
+                ('estrellas_2', models.PositiveIntegerField(default=0)),
+                ('estrellas_3', models.PositiveIntegerField(default=0)),
+                ('estrellas_4', models.PositiveIntegerField(default=0)),
+                ('estrellas_5', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('variante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calificacion', serialize=False, to='app_productos.producto_variantes')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:29
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDICES = [
+    'CREATE INDEX IF NOT EXISTS producto_busqueda_gin ON app_productos_producto USING gin (busqueda)',
+    'CREATE INDEX IF NOT EXISTS producto_nombre_trgm ON app_productos_producto USING gin (nombre gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS variante_color_trgm ON app_productos_producto_variantes USING gin (color gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS variante_talla_trgm ON app_productos_producto_variantes USING gin (talla gin_trgm_ops)',
+]
+
+
+def crear_indices(apps, schema_editor):
+    """Extensión pg_trgm e índices GIN (solo PostgreSQL; en otros motores se omite)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for sql in INDICES:
+        schema_editor.execute(sql)
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in ('producto_busqueda_gin', 'producto_nombre_trgm', 'variante_color_trgm', 'variante_talla_trgm'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0015_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
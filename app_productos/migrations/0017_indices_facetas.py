@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0016_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto_variantes',
+            index=models.Index(fields=['color'], name='variante_color_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto_variantes',
+            index=models.Index(fields=['talla'], name='variante_talla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto_variantes',
+            index=models.Index(fields=['precio_unitario'], name='variante_precio_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_pedidos', '0006_indice_analitica'),
+        ('app_productos', '0017_indices_facetas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item_pedido',
+            index=models.Index(fields=['pedido'], include=('Producto_variante', 'cantidad', 'subtotal', 'precio_unitario'), name='item_pedido_cubre_idx'),
+        ),
+    ]
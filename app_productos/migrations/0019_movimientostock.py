@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0018_indice_analitica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('compra', 'Recepción de compra')], max_length=20)),
+                ('cantidad', models.IntegerField()),
+                ('referencia', models.CharField(blank=True, default='', max_length=100)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='app_productos.inventario')),
+                ('producto_variante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app_productos.producto_variantes')),
+            ],
+        ),
+    ]
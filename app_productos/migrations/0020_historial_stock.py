@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def snapshot_inicial(apps, schema_editor):
+    """Snapshot de apertura: el historial empieza con el stock actual de cada inventario"""
+    Inventario = apps.get_model('app_productos', 'Inventario')
+    SnapshotStock = apps.get_model('app_productos', 'SnapshotStock')
+    ahora = timezone.now()
+    SnapshotStock.objects.bulk_create([
+        SnapshotStock(inventario_id=inventario_id, stock=stock, fecha=ahora)
+        for inventario_id, stock in Inventario.objects.values_list('id', 'stock').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0019_movimientostock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='movimientostock',
+            name='tipo',
+            field=models.CharField(choices=[('compra', 'Recepción de compra'), ('venta', 'Venta'), ('ajuste', 'Ajuste manual'), ('reserva', 'Reserva de carrito'), ('liberacion', 'Liberación de reserva')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['inventario', 'fecha'], name='movimiento_inventario_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto_variante', 'fecha'], name='movimiento_variante_fecha'),
+        ),
+        migrations.AddField(
+            model_name='snapshotstock',
+            name='inventario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='app_productos.inventario'),
+        ),
+        migrations.AddIndex(
+            model_name='snapshotstock',
+            index=models.Index(fields=['inventario', 'fecha'], name='snapshot_inventario_fecha'),
+        ),
+        migrations.RunPython(snapshot_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def abrir_alertas_iniciales(apps, schema_editor):
+    """Abrir las alertas de los inventarios que ya están fuera de rango (sin notificarlas)"""
+    Inventario = apps.get_model('app_productos', 'Inventario')
+    AlertaStock = apps.get_model('app_productos', 'AlertaStock')
+    alertas = [
+        AlertaStock(inventario_id=pk, tipo='stock_bajo', stock=stock, umbral=minimo, notificada=True)
+        for pk, stock, minimo in Inventario.objects.filter(stock__lt=F('stock_minimo'))
+        .values_list('id', 'stock', 'stock_minimo').iterator()
+    ] + [
+        AlertaStock(inventario_id=pk, tipo='stock_alto', stock=stock, umbral=maximo, notificada=True)
+        for pk, stock, maximo in Inventario.objects.filter(stock__gt=F('stock_maximo'))
+        .values_list('id', 'stock', 'stock_maximo').iterator()
+    ]
+    AlertaStock.objects.bulk_create(alertas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0020_historial_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('stock_bajo', 'Stock bajo'), ('stock_alto', 'Stock alto')], max_length=20)),
+                ('stock', models.IntegerField()),
+                ('umbral', models.IntegerField()),
+                ('activa', models.BooleanField(default=True)),
+                ('fecha_inicio', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_resolucion', models.DateTimeField(blank=True, null=True)),
+                ('notificada', models.BooleanField(default=False)),
+                ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='app_productos.inventario')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('activa', True)), fields=['tipo', 'fecha_inicio'], name='alerta_activa_tipo'), models.Index(condition=models.Q(('notificada', False)), fields=['id'], name='alerta_pendiente')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('activa', True)), fields=('inventario',), name='alerta_activa_unica')],
+            },
+        ),
+        migrations.RunPython(abrir_alertas_iniciales, migrations.RunPython.noop),
+    ]
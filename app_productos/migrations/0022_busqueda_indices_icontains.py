@@ -0,0 +1,78 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+# Django compila `icontains` en PostgreSQL como UPPER("col"::text) LIKE UPPER(%s):
+# solo un índice de trigramas sobre esa misma expresión le sirve
+INDICES = [
+    ('producto_nombre_upper_trgm', 'app_productos_producto', 'nombre'),
+    ('variante_color_upper_trgm', 'app_productos_producto_variantes', 'color'),
+    ('variante_talla_upper_trgm', 'app_productos_producto_variantes', 'talla'),
+]
+# Índices sobre la columna sin UPPER que ninguna consulta usa (nombre_trgm se
+# conserva: lo usa la similitud por trigramas de la búsqueda)
+INDICES_ANTERIORES = [
+    ('variante_color_trgm', 'app_productos_producto_variantes', 'color'),
+    ('variante_talla_trgm', 'app_productos_producto_variantes', 'talla'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES_ANTERIORES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+    for nombre, tabla, columna in INDICES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin ((UPPER({columna}::text)) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+    for nombre, tabla, columna in INDICES_ANTERIORES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin ({columna} gin_trgm_ops)')
+
+
+def rellenar_vectores(apps, schema_editor):
+    """
+    Calcular Producto.busqueda del catálogo existente (sin esto la búsqueda no
+    encuentra nada). La expresión es una copia de la de busqueda.py al momento
+    de esta migración: si esa cambia, esta debe seguir igual.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Producto = apps.get_model('app_productos', 'Producto')
+    Categoria = apps.get_model('app_productos', 'Categoria')
+    Producto_Variantes = apps.get_model('app_productos', 'Producto_Variantes')
+    categoria = Categoria.objects.filter(pk=OuterRef('Categoria_id')).values('nombre')[:1]
+    variantes = (
+        Producto_Variantes.objects.filter(producto=OuterRef('pk'))
+        .order_by()
+        .values('producto')
+        .annotate(texto=StringAgg(Concat('color', Value(' '), 'talla', output_field=TextField()), delimiter=' '))
+        .values('texto')
+    )
+    Producto.objects.update(busqueda=(
+        SearchVector('nombre', weight='A', config='spanish')
+        + SearchVector(Coalesce(Subquery(categoria), Value(''), output_field=TextField()), weight='B', config='spanish')
+        + SearchVector(Coalesce(Subquery(variantes), Value(''), output_field=TextField()), weight='B', config='spanish')
+        + SearchVector('descripcion', weight='C', config='spanish')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_productos', '0021_alertastock'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+        migrations.RunPython(rellenar_vectores, migrations.RunPython.noop),
+    ]
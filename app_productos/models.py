@@ -1,4 +1,8 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F, Q, Subquery, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 from app_Cliente.models import Cliente
 from app_compras.models import compra
 
@@ -9,6 +13,8 @@ class Producto(models.Model):
     descripcion = models.TextField()
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # tsvector de nombre, categoría, variantes y descripción (ver busqueda.py)
+    busqueda = SearchVectorField(null=True, editable=False)
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100)
@@ -16,6 +22,53 @@ class Categoria(models.Model):
     activo = models.BooleanField(default=True)
     id_padre = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='subcategorias')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Ruta materializada: ids de los ancestros y el propio, ej. "000001/000004/"
+    # Permite resolver subárboles con un solo LIKE 'ruta%' (se mantiene en save())
+    ruta = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    nivel = models.PositiveIntegerField(default=0, editable=False)
+
+    ANCHO_SEGMENTO_RUTA = 6
+
+    def save(self, *args, **kwargs):
+        """Guardar y mantener sincronizada la ruta materializada (propia y de los descendientes)"""
+        with transaction.atomic():
+            # La ruta guardada se lee (y bloquea) antes de escribir: la de esta
+            # instancia puede estar desactualizada y no sirve para saber si cambió
+            ruta_anterior, nivel_anterior = '', 0
+            if self.pk:
+                ruta_anterior, nivel_anterior = type(self).objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('ruta', 'nivel').first() or ('', 0)
+            self.ruta, self.nivel = ruta_anterior, nivel_anterior
+            super().save(*args, **kwargs)
+            ruta_padre, nivel_padre = '', -1
+            if self.id_padre_id:
+                ruta_padre, nivel_padre = type(self).objects.select_for_update().filter(
+                    pk=self.id_padre_id
+                ).values_list('ruta', 'nivel').get()
+            nueva_ruta = f'{ruta_padre}{self.pk:0{self.ANCHO_SEGMENTO_RUTA}d}/'
+            if nueva_ruta == ruta_anterior:
+                return
+            if nueva_ruta.startswith(ruta_anterior) and ruta_anterior:
+                raise ValueError('Una categoría no puede ser su propio ancestro')
+
+            self.ruta, self.nivel = nueva_ruta, nivel_padre + 1
+            type(self).objects.filter(pk=self.pk).update(ruta=self.ruta, nivel=self.nivel)
+            if ruta_anterior:
+                # Reubicar el subárbol completo con un único UPDATE
+                delta_nivel = self.nivel - (len(ruta_anterior) // (self.ANCHO_SEGMENTO_RUTA + 1) - 1)
+                type(self).objects.filter(ruta__startswith=ruta_anterior).exclude(pk=self.pk).update(
+                    ruta=Concat(Value(nueva_ruta), Substr('ruta', len(ruta_anterior) + 1)),
+                    nivel=F('nivel') + delta_nivel
+                )
+
+def filtro_categoria_con_descendientes(categoria_id, campo='Categoria'):
+    """
+    Q para filtrar por una categoría incluyendo todas sus subcategorías.
+    Se resuelve en la misma consulta con ruta LIKE '<ruta de la categoría>%'.
+    """
+    ruta = Categoria.objects.filter(pk=categoria_id).values('ruta')[:1]
+    return Q(**{f'{campo}__ruta__startswith': Subquery(ruta)})
 
 class Producto_Variantes(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -26,6 +79,14 @@ class Producto_Variantes(models.Model):
     activo = models.BooleanField(default=True)
     Inventario_id = models.ForeignKey('Inventario', on_delete=models.CASCADE , null=True)
 
+    class Meta:
+        # Filtros y agrupaciones de facetas (ver facetas.py)
+        indexes = [
+            models.Index(fields=['color'], name='variante_color_idx'),
+            models.Index(fields=['talla'], name='variante_talla_idx'),
+            models.Index(fields=['precio_unitario'], name='variante_precio_idx'),
+        ]
+
 
 class Comentarios(models.Model):
     calificacion = models.IntegerField()
@@ -34,19 +95,80 @@ class Comentarios(models.Model):
     Producto_categoria = models.ForeignKey(Producto_Variantes, on_delete=models.CASCADE)
     Cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
 
+class ResumenCalificacion(models.Model):
+    """
+    Resumen desnormalizado de las reseñas (cantidad, suma e histograma 1-5).
+    Se mantiene de forma incremental desde las señales de Comentarios
+    (ver calificaciones.py), así los listados no necesitan agregar reseñas.
+    """
+    total = models.PositiveIntegerField(default=0)
+    suma = models.PositiveIntegerField(default=0)
+    estrellas_1 = models.PositiveIntegerField(default=0)
+    estrellas_2 = models.PositiveIntegerField(default=0)
+    estrellas_3 = models.PositiveIntegerField(default=0)
+    estrellas_4 = models.PositiveIntegerField(default=0)
+    estrellas_5 = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def promedio(self):
+        return round(self.suma / self.total, 2) if self.total else 0
+
+    def como_dict(self):
+        return {
+            'total': self.total,
+            'promedio': self.promedio,
+            'histograma': {str(n): getattr(self, f'estrellas_{n}') for n in range(1, 6)},
+        }
+
+class CalificacionVariante(ResumenCalificacion):
+    variante = models.OneToOneField(Producto_Variantes, primary_key=True, related_name='calificacion', on_delete=models.CASCADE)
+
+class CalificacionProducto(ResumenCalificacion):
+    producto = models.OneToOneField(Producto, primary_key=True, related_name='calificacion', on_delete=models.CASCADE)
+
+ESTADOS_SUBIDA = [
+    ('pendiente', 'Pendiente'),
+    ('procesando', 'Procesando'),
+    ('completada', 'Completada'),
+    ('error', 'Error'),
+]
+
 class Imagen_Producto(models.Model):
     imagen = models.ImageField(upload_to='productos/' , null=True, blank=True)
     texto = models.CharField(max_length=200)
     es_principal = models.BooleanField(default=False)
     Producto_categoria = models.ForeignKey(Producto_Variantes, on_delete=models.CASCADE)
+    # Subida asíncrona (ver subidas.py): el archivo espera en almacenamiento
+    # temporal hasta que un worker lo sube al storage por defecto (S3)
+    estado_subida = models.CharField(max_length=20, choices=ESTADOS_SUBIDA, default='completada', db_index=True)
+    archivo_temporal = models.CharField(max_length=255, null=True, blank=True)
+    intentos_subida = models.PositiveSmallIntegerField(default=0)
+    error_subida = models.TextField(null=True, blank=True)
+    fecha_estado_subida = models.DateTimeField(null=True, blank=True)
+    # Miniaturas y formatos livianos: {formato: {ancho: nombre}} (ver derivados.py)
+    derivados = models.JSONField(default=dict, blank=True)
 
 class item_pedido(models.Model):
     Producto_variante = models.ForeignKey(Producto_Variantes, on_delete=models.CASCADE)
-    pedido = models.ForeignKey(compra, on_delete=models.CASCADE)
+    pedido = models.ForeignKey('app_pedidos.Pedido', related_name='items', on_delete=models.CASCADE)
     cantidad = models.IntegerField()
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2 , null=True)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2 , null=True)
 
+    class Meta:
+        indexes = [
+            # Índice cubriente: la analítica de ventas agrega por pedido sin leer la tabla
+            models.Index(
+                fields=['pedido'],
+                include=['Producto_variante', 'cantidad', 'subtotal', 'precio_unitario'],
+                name='item_pedido_cubre_idx'
+            ),
+        ]
+
 
 class item_compras(models.Model):
     producto_variante = models.ForeignKey(Producto_Variantes, on_delete=models.CASCADE)
@@ -63,3 +185,96 @@ class Inventario (models.Model):
     ubicacion_almacen = models.CharField(max_length=100)
     ultima_actualizacion = models.DateTimeField(auto_now=True)
 
+
+class MovimientoStock(models.Model):
+    """
+    Movimiento de stock de un inventario (solo se agregan, nunca se editan).
+    cantidad > 0 entra mercadería, cantidad < 0 sale.
+    El stock en cualquier momento es el último SnapshotStock anterior más
+    los movimientos posteriores (ver historial.py).
+    """
+    TIPOS = [
+        ('compra', 'Recepción de compra'),
+        ('venta', 'Venta'),
+        ('ajuste', 'Ajuste manual'),
+        ('reserva', 'Reserva de carrito'),
+        ('liberacion', 'Liberación de reserva'),
+    ]
+
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='movimientos')
+    producto_variante = models.ForeignKey(Producto_Variantes, on_delete=models.SET_NULL, null=True, blank=True)
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    cantidad = models.IntegerField()
+    # Origen del movimiento, ej. "compra:15"
+    referencia = models.CharField(max_length=100, blank=True, default='')
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Consultas por rango de fechas de un inventario o una variante
+            models.Index(fields=['inventario', 'fecha'], name='movimiento_inventario_fecha'),
+            models.Index(fields=['producto_variante', 'fecha'], name='movimiento_variante_fecha'),
+        ]
+
+
+class SnapshotStock(models.Model):
+    """Stock de un inventario en un momento dado (se toman periódicamente con `snapshot_stock`)"""
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='snapshots')
+    stock = models.IntegerField()
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inventario', 'fecha'], name='snapshot_inventario_fecha'),
+        ]
+
+
+class AlertaStock(models.Model):
+    """
+    Alerta de stock de un inventario (stock < stock_minimo o stock > stock_maximo).
+    Se abren y resuelven solas con cada cambio de stock (ver alertas.py); un
+    inventario tiene a lo sumo una alerta activa. `notificada` indica si el
+    último cambio de estado ya se envió al webhook / cola.
+    """
+    TIPOS = [
+        ('stock_bajo', 'Stock bajo'),
+        ('stock_alto', 'Stock alto'),
+    ]
+
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='alertas')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    # Stock y umbral al abrirse la alerta
+    stock = models.IntegerField()
+    umbral = models.IntegerField()
+    activa = models.BooleanField(default=True)
+    fecha_inicio = models.DateTimeField(default=timezone.now)
+    fecha_resolucion = models.DateTimeField(null=True, blank=True)
+    notificada = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['inventario'], condition=Q(activa=True), name='alerta_activa_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['tipo', 'fecha_inicio'], condition=Q(activa=True), name='alerta_activa_tipo'),
+            models.Index(fields=['id'], condition=Q(notificada=False), name='alerta_pendiente'),
+        ]
+
+
+class ImportacionCatalogo(models.Model):
+    """
+    Importación de catálogo encolada desde la API (ver importacion.py): el
+    archivo espera en almacenamiento temporal hasta que el comando
+    `procesar_importaciones` la ejecuta y guarda el resumen en `resultado`.
+    """
+    archivo_temporal = models.CharField(max_length=255)
+    nombre_archivo = models.CharField(max_length=255)
+    formato = models.CharField(max_length=10)
+    tamano_lote = models.PositiveIntegerField()
+    simular = models.BooleanField(default=False)
+    estado = models.CharField(max_length=20, choices=ESTADOS_SUBIDA, default='pendiente', db_index=True)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    usuario = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_estado = models.DateTimeField(default=timezone.now)
@@ -1,10 +1,17 @@
+import logging
+
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import (
     Producto, Categoria, Producto_Variantes , Comentarios, 
-    Imagen_Producto, item_pedido, item_compras, Inventario
+    Imagen_Producto, item_pedido, item_compras, Inventario, MovimientoStock
 )
 from app_Cliente.serializers import ClienteSerializer
 from app_compras.serializers import CompraSerializer
+from .derivados import srcset
+from .calificaciones import resumen
+
+logger = logging.getLogger(__name__)
 
 class CategoriaSerializer(serializers.ModelSerializer):
     """Serializer para categorías con subcategorías"""
@@ -12,10 +19,27 @@ class CategoriaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Categoria
-        fields = ['id', 'nombre', 'descripcion', 'activo', 'id_padre', 'fecha_creacion', 'subcategorias']
-    
+        fields = ['id', 'nombre', 'descripcion', 'activo', 'id_padre', 'fecha_creacion', 'nivel', 'subcategorias']
+        read_only_fields = ['nivel']
+
+    def validate_id_padre(self, value):
+        """Una categoría no puede moverse debajo de sí misma ni de sus descendientes"""
+        instance = self.instance
+        if value is not None and instance is not None and (
+            value.pk == instance.pk or (instance.ruta and value.ruta.startswith(instance.ruta))
+        ):
+            raise serializers.ValidationError("Una categoría no puede ser su propio ancestro")
+        return value
+
     def get_subcategorias(self, obj):
-        """Obtener subcategorías hijas"""
+        """
+        Obtener subcategorías hijas.
+        Si el contexto trae el árbol precargado ('hijos': {id_padre: [categorías]})
+        se devuelve el subárbol completo sin consultas adicionales.
+        """
+        hijos = self.context.get('hijos')
+        if hijos is not None:
+            return CategoriaArbolSerializer(hijos.get(obj.id, []), many=True, context=self.context).data
         subcategorias = obj.subcategorias.filter(activo=True)
         return CategoriaBasicaSerializer(subcategorias, many=True).data
 
@@ -25,27 +49,50 @@ class CategoriaBasicaSerializer(serializers.ModelSerializer):
         model = Categoria
         fields = ['id', 'nombre', 'descripcion', 'activo']
 
+class CategoriaArbolSerializer(serializers.ModelSerializer):
+    """Serializer recursivo para el árbol de categorías precargado en el contexto"""
+    subcategorias = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Categoria
+        fields = ['id', 'nombre', 'descripcion', 'activo', 'nivel', 'subcategorias']
+    
+    def get_subcategorias(self, obj):
+        hijos = self.context.get('hijos', {})
+        return CategoriaArbolSerializer(hijos.get(obj.id, []), many=True, context=self.context).data
+
 class ImagenProductoSerializer(serializers.ModelSerializer):
     """Serializer para imágenes de productos"""
     imagen_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Imagen_Producto
-        fields = ['id', 'imagen', 'imagen_url', 'texto', 'es_principal', 'Producto_categoria']
+        fields = ['id', 'imagen', 'imagen_url', 'srcset', 'texto', 'es_principal', 'Producto_categoria', 'estado_subida', 'error_subida']
+        read_only_fields = ['estado_subida', 'error_subida']
     
     def get_imagen_url(self, obj):
         """Obtener URL completa de la imagen en S3"""
         if obj.imagen:
             return obj.imagen.url
         return None
+    
+    def get_srcset(self, obj):
+        """Miniaturas y versiones WebP/AVIF: {formato: {ancho: url}}"""
+        return srcset(obj)
 
 class ProductoBasicoSerializer(serializers.ModelSerializer):
     """Serializer básico para productos"""
     categoria_info = CategoriaBasicaSerializer(source='Categoria', read_only=True)
+    calificacion = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
-        fields = ['id', 'nombre', 'Categoria', 'descripcion', 'activo', 'fecha_creacion', 'categoria_info']
+        fields = ['id', 'nombre', 'Categoria', 'descripcion', 'activo', 'fecha_creacion', 'categoria_info', 'calificacion']
+    
+    def get_calificacion(self, obj):
+        """Resumen precalculado (usar select_related('calificacion') para evitar la consulta)"""
+        return resumen(obj)
 
 class ProductoCategoriaSerializer(serializers.ModelSerializer):
     """Serializer completo para variantes de productos"""
@@ -55,13 +102,15 @@ class ProductoCategoriaSerializer(serializers.ModelSerializer):
     imagen_principal = serializers.SerializerMethodField()
     stock = serializers.SerializerMethodField()
     inventario_info = serializers.SerializerMethodField()
+    calificacion = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto_Variantes
         fields = [
             'id', 'producto', 'color', 'talla', 'precio_unitario', 
             'fecha_creacion', 'activo', 'Inventario_id', 'producto_info', 
-            'categoria_info', 'imagenes', 'imagen_principal', 'stock', 'inventario_info'
+            'categoria_info', 'imagenes', 'imagen_principal', 'stock', 'inventario_info',
+            'calificacion'
         ]
     
     def get_categoria_info(self, obj):
@@ -92,17 +141,46 @@ class ProductoCategoriaSerializer(serializers.ModelSerializer):
             }
         return None
     
+    RELACIONES = ('producto', 'producto__Categoria', 'producto__calificacion', 'Inventario_id', 'calificacion')
+    
+    @staticmethod
+    def setup_eager_loading(queryset, prefijo=''):
+        """
+        Precargar relaciones usadas por el serializer.
+        `prefijo` permite reutilizarlo desde un Prefetch anidado (ej. 'producto_variantes_set__').
+        """
+        if not prefijo:
+            queryset = queryset.select_related(*ProductoCategoriaSerializer.RELACIONES)
+        return queryset.prefetch_related(
+            Prefetch(f'{prefijo}imagen_producto_set'),
+            Prefetch(
+                f'{prefijo}imagen_producto_set',
+                queryset=Imagen_Producto.objects.filter(es_principal=True),
+                to_attr='imagenes_principales'
+            ),
+        )
+    
+    def get_calificacion(self, obj):
+        """Resumen precalculado de las reseñas de la variante"""
+        return resumen(obj)
+    
     def get_imagenes(self, obj):
-        """Obtener todas las imágenes del producto"""
-        imagenes = Imagen_Producto.objects.filter(Producto_categoria=obj)
+        """Obtener todas las imágenes del producto (usa el prefetch si existe)"""
+        if 'imagen_producto_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            imagenes = obj.imagen_producto_set.all()
+        else:
+            imagenes = Imagen_Producto.objects.filter(Producto_categoria=obj)
         return ImagenProductoSerializer(imagenes, many=True).data
     
     def get_imagen_principal(self, obj):
-        """Obtener la imagen principal del producto"""
-        imagen_principal = Imagen_Producto.objects.filter(
-            Producto_categoria=obj, 
-            es_principal=True
-        ).first()
+        """Obtener la imagen principal del producto (usa el prefetch si existe)"""
+        if hasattr(obj, 'imagenes_principales'):
+            imagen_principal = obj.imagenes_principales[0] if obj.imagenes_principales else None
+        else:
+            imagen_principal = Imagen_Producto.objects.filter(
+                Producto_categoria=obj, 
+                es_principal=True
+            ).first()
         if imagen_principal:
             return ImagenProductoSerializer(imagen_principal).data
         return None
@@ -140,6 +218,8 @@ class ReseñaCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comentarios
         fields = ['calificacion', 'comentario', 'Producto_categoria', 'Cliente']
+        # Si el usuario es cliente se toma de la petición (ver ReseñaViewSet.perform_create)
+        extra_kwargs = {'Cliente': {'required': False}}
     
     def validate_calificacion(self, value):
         if value < 1 or value > 5:
@@ -150,27 +230,44 @@ class ProductoCompletoSerializer(serializers.ModelSerializer):
     """Serializer completo para productos con todas sus variantes"""
     variantes = serializers.SerializerMethodField()
     categoria_info = CategoriaBasicaSerializer(source='Categoria', read_only=True)
+    calificacion = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
         fields = [
             'id', 'nombre', 'Categoria', 'descripcion', 'activo', 'fecha_creacion', 
-            'categoria_info', 'variantes'
+            'categoria_info', 'calificacion', 'variantes'
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Precargar variantes, inventario e imágenes para evitar N+1 en el listado"""
+        variantes = Producto_Variantes.objects.select_related('Inventario_id', 'calificacion')
+        return ProductoCategoriaSerializer.setup_eager_loading(
+            queryset.select_related('Categoria', 'calificacion').prefetch_related(
+                Prefetch('producto_variantes_set', queryset=variantes)
+            ),
+            prefijo='producto_variantes_set__'
+        )
+    
+    def get_calificacion(self, obj):
+        """Resumen precalculado de las reseñas de todas las variantes"""
+        return resumen(obj)
+    
     def get_variantes(self, obj):
-        """Obtener todas las variantes del producto"""
-        variantes = Producto_Variantes.objects.filter(producto=obj)
-        print(f"🎨 Serializando variantes para {obj.nombre}: {variantes.count()} variantes")
-        
+        """Obtener todas las variantes del producto (usa el prefetch si existe)"""
+        if 'producto_variantes_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            variantes = obj.producto_variantes_set.all()
+        else:
+            variantes = Producto_Variantes.objects.filter(producto=obj)
         serialized_data = ProductoCategoriaSerializer(variantes, many=True).data
         
-        # Debug de imágenes
-        for i, variante_data in enumerate(serialized_data):
-            imagenes = variante_data.get('imagenes', [])
-            print(f"   Variante {i+1}: {len(imagenes)} imágenes")
-            for j, img in enumerate(imagenes):
-                print(f"     Imagen {j+1}: {img.get('imagen_url', 'Sin URL')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                'Variantes serializadas del producto %s', obj.pk,
+                extra={'variantes': len(serialized_data),
+                       'imagenes': sum(len(v.get('imagenes', [])) for v in serialized_data)}
+            )
         
         return serialized_data
     
@@ -181,6 +278,13 @@ class ProductoCompletoSerializer(serializers.ModelSerializer):
         ).distinct()
         return CategoriaBasicaSerializer(categorias, many=True).data
 
+def precargar_variante(queryset, campo):
+    """Precargar la variante del FK `campo` con todo lo que usa ProductoCategoriaSerializer"""
+    return ProductoCategoriaSerializer.setup_eager_loading(
+        queryset.select_related(*[f'{campo}__{relacion}' for relacion in ProductoCategoriaSerializer.RELACIONES]),
+        prefijo=f'{campo}__'
+    )
+
 class ItemPedidoSerializer(serializers.ModelSerializer):
     """Serializer para items de pedido"""
     producto_info = ProductoCategoriaSerializer(source='Producto_variante', read_only=True)
@@ -189,6 +293,10 @@ class ItemPedidoSerializer(serializers.ModelSerializer):
         model = item_pedido
         fields = ['id', 'Producto_variante', 'pedido', 'cantidad', 'producto_info']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return precargar_variante(queryset, 'Producto_variante')
+    
     def validate_cantidad(self, value):
         if value <= 0:
             raise serializers.ValidationError("La cantidad debe ser mayor a 0")
@@ -203,11 +311,24 @@ class ItemComprasSerializer(serializers.ModelSerializer):
         model = item_compras
         fields = ['id', 'producto_variante', 'compra', 'cantidad', 'producto_info', 'compra_info']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return precargar_variante(queryset.select_related('compra'), 'producto_variante')
+    
     def validate_cantidad(self, value):
         if value <= 0:
             raise serializers.ValidationError("La cantidad debe ser mayor a 0")
         return value
 
+class MovimientoStockSerializer(serializers.ModelSerializer):
+    """Serializer de solo lectura para el historial de stock"""
+
+    class Meta:
+        model = MovimientoStock
+        fields = ['id', 'inventario', 'producto_variante', 'tipo', 'cantidad', 'referencia', 'fecha']
+        read_only_fields = fields
+
+
 class InventarioSerializer(serializers.ModelSerializer):
     """Serializer para inventario de productos"""
     variantes = serializers.SerializerMethodField()
@@ -220,9 +341,25 @@ class InventarioSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['ultima_actualizacion']
     
+    @staticmethod
+    def setup_eager_loading(queryset, prefijo=''):
+        """
+        Precargar las variantes de cada inventario con su producto.
+        `prefijo` permite precargarlas desde otro modelo (ej. 'Inventario_id__', 'inventario__').
+        """
+        return queryset.prefetch_related(
+            Prefetch(
+                f'{prefijo}producto_variantes_set',
+                queryset=Producto_Variantes.objects.select_related('producto').order_by('id')
+            )
+        )
+    
     def get_variantes(self, obj):
-        """Obtener todas las variantes que usan este inventario"""
-        variantes = Producto_Variantes.objects.filter(Inventario_id=obj)
+        """Obtener todas las variantes que usan este inventario (usa el prefetch si existe)"""
+        if 'producto_variantes_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            variantes = obj.producto_variantes_set.all()
+        else:
+            variantes = Producto_Variantes.objects.filter(Inventario_id=obj).select_related('producto')
         # Usar un serializer simple para evitar recursión infinita
         return [{
             'id': v.id,
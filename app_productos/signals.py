@@ -0,0 +1,137 @@
+"""
+Señales de app_productos.
+Cualquier cambio en los modelos del catálogo invalida la caché de respuestas al
+confirmarse la transacción: invalidar antes dejaría que una petición concurrente
+vuelva a guardar en la versión nueva los datos sin confirmar.
+Las reseñas mantienen además los resúmenes de calificación (ver calificaciones.py)
+y los cambios de productos, variantes y categorías el vector de búsqueda (ver busqueda.py).
+Las imágenes nuevas o con archivo reemplazado programan sus derivados
+(ver derivados.py); las de la subida asíncrona los generan al subirse.
+Los cambios de stock guardados con save() (InventarioViewSet, admin) se registran
+como movimientos de ajuste (ver historial.py) y reevalúan sus alertas (ver alertas.py).
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+
+from . import alertas, busqueda, cache, calificaciones
+from .stock import registrar_movimientos
+from .subidas import programar_derivados
+from .models import Producto, Producto_Variantes, Imagen_Producto, Inventario, Categoria, Comentarios
+
+MODELOS_CATALOGO = (Producto, Producto_Variantes, Imagen_Producto, Inventario, Categoria)
+
+
+def invalidar_al_confirmar():
+    transaction.on_commit(cache.invalidar, robust=True)
+
+
+def invalidar_cache_catalogo(sender, **kwargs):
+    """Incrementar la versión del catálogo al guardar o eliminar un modelo del catálogo"""
+    if not kwargs.get('raw', False):
+        invalidar_al_confirmar()
+
+
+for modelo in MODELOS_CATALOGO:
+    post_save.connect(invalidar_cache_catalogo, sender=modelo, dispatch_uid=f'catalogo_save_{modelo.__name__}')
+    post_delete.connect(invalidar_cache_catalogo, sender=modelo, dispatch_uid=f'catalogo_delete_{modelo.__name__}')
+
+
+def recordar_calificacion_anterior(sender, instance, raw=False, **kwargs):
+    """Guardar (calificación, variante) previos para descontarlos si la reseña cambia"""
+    instance._calificacion_anterior = None
+    if instance.pk and not raw:
+        instance._calificacion_anterior = Comentarios.objects.filter(pk=instance.pk).values_list(
+            'calificacion', 'Producto_categoria_id'
+        ).first()
+
+
+def actualizar_calificacion(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    actual = (instance.calificacion, instance.Producto_categoria_id)
+    anterior = getattr(instance, '_calificacion_anterior', None)
+    if not created and anterior == actual:
+        return
+    if anterior:
+        calificaciones.aplicar(anterior[1], anterior[0], -1)
+    calificaciones.aplicar(actual[1], actual[0], 1)
+    invalidar_al_confirmar()
+
+
+def descontar_calificacion(sender, instance, **kwargs):
+    calificaciones.aplicar(instance.Producto_categoria_id, instance.calificacion, -1)
+    invalidar_al_confirmar()
+
+
+pre_save.connect(recordar_calificacion_anterior, sender=Comentarios, dispatch_uid='calificacion_pre_save')
+post_save.connect(actualizar_calificacion, sender=Comentarios, dispatch_uid='calificacion_post_save')
+post_delete.connect(descontar_calificacion, sender=Comentarios, dispatch_uid='calificacion_post_delete')
+
+
+def reindexar_producto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busqueda.actualizar_vectores([instance.pk])
+
+
+def reindexar_producto_de_variante(sender, instance, raw=False, **kwargs):
+    if not raw and instance.producto_id:
+        busqueda.actualizar_vectores([instance.producto_id])
+
+
+def reindexar_productos_de_categoria(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busqueda.actualizar_vectores(Producto.objects.filter(Categoria=instance).values('pk'))
+
+
+post_save.connect(reindexar_producto, sender=Producto, dispatch_uid='busqueda_producto_save')
+post_save.connect(reindexar_producto_de_variante, sender=Producto_Variantes, dispatch_uid='busqueda_variante_save')
+post_delete.connect(reindexar_producto_de_variante, sender=Producto_Variantes, dispatch_uid='busqueda_variante_delete')
+post_save.connect(reindexar_productos_de_categoria, sender=Categoria, dispatch_uid='busqueda_categoria_save')
+
+
+def recordar_imagen_anterior(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._imagen_anterior = None
+    if instance.pk and not raw and (update_fields is None or 'imagen' in update_fields):
+        instance._imagen_anterior = Imagen_Producto.objects.filter(pk=instance.pk).values_list(
+            'imagen', flat=True
+        ).first()
+
+
+def programar_derivados_imagen(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Derivados al confirmar, si el archivo es nuevo y nadie los generó todavía"""
+    if raw or (update_fields is not None and 'imagen' not in update_fields):
+        return
+    nombre = instance.imagen.name
+    if not nombre or instance.estado_subida != 'completada':
+        return
+    if nombre == getattr(instance, '_imagen_anterior', None) or nombre == getattr(instance, '_derivados_de', None):
+        return
+    imagen_id = instance.pk
+    transaction.on_commit(lambda: programar_derivados(imagen_id), robust=True)
+
+
+pre_save.connect(recordar_imagen_anterior, sender=Imagen_Producto, dispatch_uid='derivados_imagen_pre_save')
+post_save.connect(programar_derivados_imagen, sender=Imagen_Producto, dispatch_uid='derivados_imagen_post_save')
+
+
+def recordar_stock_anterior(sender, instance, raw=False, **kwargs):
+    instance._stock_anterior = None
+    if instance.pk and not raw:
+        instance._stock_anterior = Inventario.objects.filter(pk=instance.pk).values_list('stock', flat=True).first()
+
+
+def registrar_ajuste_stock(sender, instance, created, raw=False, **kwargs):
+    """El alta cuenta como ajuste por el stock inicial; después, por la diferencia"""
+    if raw:
+        return
+    anterior = getattr(instance, '_stock_anterior', None) or 0
+    delta = instance.stock - anterior
+    if delta:
+        referencia = 'alta' if created else 'inventario'
+        registrar_movimientos({instance.pk: delta}, 'ajuste', referencia)
+    # También cuando sólo cambian stock_minimo / stock_maximo
+    alertas.programar([instance.pk])
+
+
+pre_save.connect(recordar_stock_anterior, sender=Inventario, dispatch_uid='historial_inventario_pre_save')
+post_save.connect(registrar_ajuste_stock, sender=Inventario, dispatch_uid='historial_inventario_post_save')
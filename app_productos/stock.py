@@ -0,0 +1,140 @@
+"""
+Operaciones atómicas sobre Inventario.stock.
+
+Las modificaciones individuales se hacen con UPDATE condicionales
+(`stock = stock - n WHERE stock >= n`) para que dos peticiones
+concurrentes nunca puedan dejar el stock en negativo, sin necesidad
+de bloquear la fila desde Python. Las operaciones por lote bloquean
+las filas involucradas y aplican un único UPDATE con CASE.
+
+Cada operación registra además sus MovimientoStock en la misma
+transacción (ver historial.py), de modo que el libro de movimientos
+siempre coincide con el stock, y programa la reevaluación de las alertas
+de stock de los inventarios tocados (ver alertas.py).
+
+Nota: estos UPDATE no disparan señales de Django, por lo que no invalidan
+la caché del catálogo; el stock mostrado en el catálogo puede tener el
+retraso de CATALOGO_CACHE_TIMEOUT, pero la disponibilidad real siempre
+se verifica aquí.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+
+from . import alertas
+from .models import Inventario, MovimientoStock
+
+
+class StockInsuficiente(Exception):
+    """No hay stock suficiente en un inventario para la cantidad pedida"""
+
+    def __init__(self, inventario_id, solicitado, disponible):
+        self.inventario_id = inventario_id
+        self.solicitado = solicitado
+        self.disponible = disponible
+        super().__init__(
+            f'Stock insuficiente en inventario {inventario_id}. '
+            f'Solicitado: {solicitado}, disponible: {disponible}'
+        )
+
+
+def registrar_movimientos(deltas, tipo, referencia='', variantes=None, fecha=None):
+    """
+    Registrar un MovimientoStock por cada {inventario_id: delta} distinto de cero.
+    `variantes` ({inventario_id: variante_id}) completa la variante si se conoce.
+    """
+    fecha = fecha or timezone.now()
+    variantes = variantes or {}
+    MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            inventario_id=inventario_id,
+            producto_variante_id=variantes.get(inventario_id),
+            tipo=tipo,
+            cantidad=delta,
+            referencia=referencia,
+            fecha=fecha,
+        )
+        for inventario_id, delta in deltas.items() if delta
+    ], batch_size=1000)
+
+
+def descontar_stock(inventario_id, cantidad, tipo='reserva', referencia='', variante_id=None):
+    """
+    Descontar `cantidad` unidades solo si hay stock suficiente.
+    Lanza StockInsuficiente si la condición no se cumple.
+    """
+    if cantidad <= 0:
+        return
+    with transaction.atomic():
+        actualizados = Inventario.objects.filter(pk=inventario_id, stock__gte=cantidad).update(
+            stock=F('stock') - cantidad,
+            ultima_actualizacion=timezone.now()
+        )
+        if not actualizados:
+            disponible = Inventario.objects.filter(pk=inventario_id).values_list('stock', flat=True).first()
+            raise StockInsuficiente(inventario_id, cantidad, disponible or 0)
+        registrar_movimientos({inventario_id: -cantidad}, tipo, referencia, {inventario_id: variante_id})
+        alertas.programar([inventario_id])
+
+
+def reponer_stock(inventario_id, cantidad, tipo='liberacion', referencia='', variante_id=None):
+    """Devolver `cantidad` unidades al inventario"""
+    if cantidad <= 0:
+        return
+    with transaction.atomic():
+        Inventario.objects.filter(pk=inventario_id).update(
+            stock=F('stock') + cantidad,
+            ultima_actualizacion=timezone.now()
+        )
+        registrar_movimientos({inventario_id: cantidad}, tipo, referencia, {inventario_id: variante_id})
+        alertas.programar([inventario_id])
+
+
+def stock_disponible(inventario_id):
+    return Inventario.objects.filter(pk=inventario_id).values_list('stock', flat=True).first() or 0
+
+
+def descontar_stock_lote(cantidades, tipo='venta', referencia=''):
+    """
+    Descontar varias cantidades {inventario_id: unidades} en dos consultas:
+    bloquea las filas (SELECT ... FOR UPDATE, en orden de id para evitar
+    deadlocks), verifica que todas alcancen y aplica un único UPDATE con CASE.
+    Debe llamarse dentro de una transacción. Si alguna no alcanza lanza
+    StockInsuficiente y no se modifica nada.
+    """
+    cantidades = {inv_id: n for inv_id, n in cantidades.items() if n > 0}
+    if not cantidades:
+        return
+    disponibles = dict(
+        Inventario.objects.select_for_update()
+        .filter(pk__in=cantidades.keys())
+        .order_by('pk')
+        .values_list('pk', 'stock')
+    )
+    for inventario_id, cantidad in cantidades.items():
+        disponible = disponibles.get(inventario_id, 0)
+        if disponible < cantidad:
+            raise StockInsuficiente(inventario_id, cantidad, disponible)
+    _actualizar_stock_lote({inv_id: -n for inv_id, n in cantidades.items()}, tipo, referencia)
+
+
+def reponer_stock_lote(cantidades, tipo='liberacion', referencia=''):
+    """Devolver varias cantidades {inventario_id: unidades} con un único UPDATE"""
+    _actualizar_stock_lote({inv_id: n for inv_id, n in cantidades.items() if n > 0}, tipo, referencia)
+
+
+def _actualizar_stock_lote(deltas, tipo, referencia=''):
+    """Sumar {inventario_id: delta} al stock con un único UPDATE ... SET stock = CASE ..."""
+    if not deltas:
+        return
+    with transaction.atomic():
+        Inventario.objects.filter(pk__in=deltas.keys()).update(
+            stock=Case(
+                *[When(pk=inventario_id, then=F('stock') + delta) for inventario_id, delta in deltas.items()],
+                default=F('stock'),
+                output_field=IntegerField()
+            ),
+            ultima_actualizacion=timezone.now()
+        )
+        registrar_movimientos(deltas, tipo, referencia)
+        alertas.programar(deltas.keys())
@@ -0,0 +1,223 @@
+"""
+Subida asíncrona de imágenes de producto.
+
+La vista guarda el archivo en un almacenamiento temporal local
+(SUBIDAS_TEMP_DIR), crea el registro Imagen_Producto en estado
+'pendiente' y responde de inmediato. Un pool de hilos del propio proceso
+hace un intento de subir el archivo al storage por defecto (S3) y generar
+sus derivados (ver derivados.py), de modo que una escritura lenta en S3 no
+bloquea a los workers que atienden peticiones.
+
+Si el intento falla la imagen queda en 'error' y ningún hilo espera: el
+comando `procesar_subidas` (cron o worker dedicado con --loop) la reintenta
+cuando venció su backoff exponencial (SUBIDAS_REINTENTO_SEGUNDOS * 2^(n-1))
+hasta SUBIDAS_MAX_INTENTOS. También retoma las pendientes que quedaron tras
+un reinicio del proceso.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .derivados import generar_derivados_seguro
+from .models import Imagen_Producto
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_storage_temporal():
+    return FileSystemStorage(location=getattr(settings, 'SUBIDAS_TEMP_DIR', '/tmp/subidas'))
+
+
+def get_max_intentos():
+    return getattr(settings, 'SUBIDAS_MAX_INTENTOS', 3)
+
+
+def get_espera_reintento():
+    return getattr(settings, 'SUBIDAS_REINTENTO_SEGUNDOS', 30)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SUBIDAS_WORKERS', 2),
+                thread_name_prefix='subidas'
+            )
+    return _executor
+
+
+def encolar_subida(archivo, producto_variante, texto='', es_principal=False):
+    """
+    Guardar el archivo en el almacenamiento temporal y registrar la imagen
+    como pendiente. La subida a S3 se programa al confirmar la transacción.
+    """
+    nombre_temporal = get_storage_temporal().save(os.path.basename(archivo.name), archivo)
+    with transaction.atomic():
+        if es_principal:
+            Imagen_Producto.objects.filter(
+                Producto_categoria=producto_variante,
+                es_principal=True
+            ).update(es_principal=False)
+        imagen = Imagen_Producto.objects.create(
+            texto=texto,
+            es_principal=es_principal,
+            Producto_categoria=producto_variante,
+            estado_subida='pendiente',
+            archivo_temporal=nombre_temporal,
+            fecha_estado_subida=timezone.now(),
+        )
+        transaction.on_commit(lambda: programar_subida(imagen.id))
+    return imagen
+
+
+def programar_subida(imagen_id):
+    """Enviar la subida al pool de workers (o ejecutarla ya si SUBIDAS_ASINCRONAS=False)"""
+    if getattr(settings, 'SUBIDAS_ASINCRONAS', True):
+        _get_executor().submit(_ejecutar_en_hilo, imagen_id)
+    else:
+        procesar_subida(imagen_id)
+
+
+def programar_derivados(imagen_id):
+    """Generar los derivados de una imagen ya guardada en el pool (o ya mismo)"""
+    if getattr(settings, 'SUBIDAS_ASINCRONAS', True):
+        _get_executor().submit(_derivados_en_hilo, imagen_id)
+    else:
+        _generar_derivados(imagen_id)
+
+
+def _generar_derivados(imagen_id):
+    imagen = Imagen_Producto.objects.filter(pk=imagen_id).first()
+    if imagen is not None and imagen.imagen:
+        generar_derivados_seguro(imagen)
+
+
+def _derivados_en_hilo(imagen_id):
+    try:
+        _generar_derivados(imagen_id)
+    finally:
+        close_old_connections()
+
+
+def _ejecutar_en_hilo(imagen_id):
+    try:
+        procesar_subida(imagen_id)
+    except Exception:
+        logger.exception('Error inesperado subiendo la imagen %s', imagen_id)
+    finally:
+        close_old_connections()
+
+
+def _tomar(imagen_id):
+    """
+    Marcar la imagen como 'procesando' con un UPDATE condicional, para que
+    un mismo archivo no lo suban a la vez el pool y el comando.
+    """
+    return Imagen_Producto.objects.filter(
+        pk=imagen_id,
+        estado_subida__in=['pendiente', 'error'],
+        intentos_subida__lt=get_max_intentos()
+    ).update(estado_subida='procesando', fecha_estado_subida=timezone.now())
+
+
+def procesar_subida(imagen_id):
+    """
+    Hacer un intento de subir el archivo temporal al storage por defecto.
+    Si falla, la imagen queda en 'error' con el intento contado y la
+    reintenta `procesar_pendientes` cuando vence su backoff.
+    Devuelve True si la imagen quedó completada.
+    """
+    if not _tomar(imagen_id):
+        return False
+
+    imagen = Imagen_Producto.objects.get(pk=imagen_id)
+    temporal = get_storage_temporal()
+
+    try:
+        with temporal.open(imagen.archivo_temporal, 'rb') as f:
+            # Guarda en default_storage (S3) sin tocar todavía la base de datos
+            imagen.imagen.save(os.path.basename(imagen.archivo_temporal), File(f), save=False)
+            # Derivados desde el archivo local, sin volver a descargarlo de S3
+            f.seek(0)
+            generar_derivados_seguro(imagen, f)
+    except Exception as e:
+        intentos = imagen.intentos_subida + 1
+        error = f'{type(e).__name__}: {e}'
+        Imagen_Producto.objects.filter(pk=imagen_id).update(
+            intentos_subida=intentos,
+            error_subida=error,
+            estado_subida='error',
+            fecha_estado_subida=timezone.now()
+        )
+        logger.warning('Subida de imagen %s falló (intento %s de %s): %s',
+                       imagen_id, intentos, get_max_intentos(), error)
+        return False
+
+    nombre_temporal = imagen.archivo_temporal
+    imagen.estado_subida = 'completada'
+    imagen.archivo_temporal = None
+    imagen.error_subida = None
+    imagen.fecha_estado_subida = timezone.now()
+    imagen.save(update_fields=['imagen', 'estado_subida', 'archivo_temporal', 'error_subida', 'fecha_estado_subida'])
+    temporal.delete(nombre_temporal)
+    return True
+
+
+def _reintento_vencido(ahora):
+    """Q de las subidas fallidas cuyo backoff (espera * 2^(intentos-1)) ya pasó"""
+    espera = get_espera_reintento()
+    condicion = Q(pk__in=[])
+    for intentos in range(1, get_max_intentos()):
+        condicion |= Q(
+            intentos_subida=intentos,
+            fecha_estado_subida__lte=ahora - timedelta(seconds=espera * 2 ** (intentos - 1))
+        )
+    return condicion
+
+
+def procesar_pendientes(lote=100, procesando_desde_minutos=10, reintentar_errores=False):
+    """
+    Procesar imágenes pendientes y las fallidas con reintentos disponibles
+    cuyo backoff ya venció. Las que quedaron en 'procesando' más de
+    `procesando_desde_minutos` (proceso caído a mitad de la subida) vuelven
+    a 'pendiente'. Con reintentar_errores=True se reinicia el contador de
+    las fallidas. Retorna (completadas, fallidas).
+    """
+    ahora = timezone.now()
+    limite = ahora - timedelta(minutes=procesando_desde_minutos)
+    Imagen_Producto.objects.filter(
+        estado_subida='procesando',
+        fecha_estado_subida__lt=limite
+    ).update(estado_subida='pendiente')
+    if reintentar_errores:
+        Imagen_Producto.objects.filter(estado_subida='error').exclude(archivo_temporal=None).update(
+            estado_subida='pendiente',
+            intentos_subida=0
+        )
+
+    ids = list(
+        Imagen_Producto.objects.filter(
+            Q(estado_subida='pendiente') | Q(_reintento_vencido(ahora), estado_subida='error'),
+            intentos_subida__lt=get_max_intentos()
+        ).order_by('id').values_list('id', flat=True)[:lote]
+    )
+    completadas = fallidas = 0
+    for imagen_id in ids:
+        if procesar_subida(imagen_id):
+            completadas += 1
+        else:
+            fallidas += 1
+    return completadas, fallidas
@@ -1,3 +1,616 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import alertas, cache, facetas, historial, importacion, subidas
+from .busqueda import buscar
+from .stock import descontar_stock, reponer_stock
+from app_compras.models import compra
+from app_pedidos.models import Pedido
+from .models import (
+    AlertaStock, Categoria, Imagen_Producto, ImportacionCatalogo, Inventario, MovimientoStock, Producto, Producto_Variantes,
+    item_compras, item_pedido
+)
+
+
+def crear_catalogo(productos, variantes=3, imagenes=2, stock=10):
+    """Productos con variantes (cada una con su Inventario) e imágenes; retorna las variantes"""
+    categoria = Categoria.objects.create(nombre='Categoría', descripcion='Categoría')
+    creadas = []
+    for i in range(productos):
+        producto = Producto.objects.create(nombre=f'Producto {i}', descripcion='Descripción', Categoria=categoria)
+        for j in range(variantes):
+            inventario = Inventario.objects.create(
+                stock=stock, stock_minimo=5, stock_maximo=100, ubicacion_almacen='A'
+            )
+            variante = Producto_Variantes.objects.create(
+                producto=producto, color=f'color {j}', talla='M', precio_unitario=10, Inventario_id=inventario
+            )
+            Imagen_Producto.objects.bulk_create([
+                Imagen_Producto(imagen=f'productos/{variante.pk}_{k}.jpg', texto='Imagen',
+                                es_principal=k == 0, Producto_categoria=variante)
+                for k in range(imagenes)
+            ])
+            creadas.append(variante)
+    return creadas
+
+
+class ConsultasConstantesMixin:
+    """Comparar las consultas de un endpoint con dos tamaños de datos"""
+
+    def consultas(self, url):
+        cache.invalidar()
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(capturadas)
+
+    def assertConsultasConstantes(self, url, agrandar):
+        """Las consultas de `url` no cambian después de llamar a `agrandar()`"""
+        esperadas = self.consultas(url)
+        agrandar()
+        cache.invalidar()
+        with self.assertNumQueries(esperadas):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class CategoriaRutaTest(TestCase):
+    def test_mover_con_instancia_desactualizada_reubica_descendientes(self):
+        raiz = Categoria.objects.create(nombre='Raíz', descripcion='Raíz')
+        otra = Categoria.objects.create(nombre='Otra', descripcion='Otra')
+        hija = Categoria.objects.create(nombre='Hija', descripcion='Hija', id_padre=raiz)
+        nieta = Categoria.objects.create(nombre='Nieta', descripcion='Nieta', id_padre=hija)
+
+        # Instancia leída antes de que otra petición moviera la categoría
+        desactualizada = Categoria.objects.get(pk=hija.pk)
+        hija.id_padre = otra
+        hija.save()
+        desactualizada.id_padre = raiz
+        desactualizada.save()
+
+        nieta.refresh_from_db()
+        self.assertEqual(nieta.ruta, f'{raiz.ruta}{hija.pk:06d}/{nieta.pk:06d}/')
+        self.assertEqual(nieta.nivel, 2)
+
+    def test_no_puede_moverse_bajo_un_descendiente(self):
+        raiz = Categoria.objects.create(nombre='Raíz', descripcion='Raíz')
+        hija = Categoria.objects.create(nombre='Hija', descripcion='Hija', id_padre=raiz)
+        raiz.id_padre = hija
+        with self.assertRaises(ValueError):
+            raiz.save()
+
+
+class InvalidacionCatalogoTest(TestCase):
+    def test_invalida_al_confirmar(self):
+        version = cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre='Nueva', descripcion='Nueva')
+            self.assertEqual(cache.get_version(), version)
+        self.assertEqual(cache.get_version(), version + 1)
+
+
+def archivo_imagen(nombre='foto.png', ancho=400, alto=300):
+    buffer = io.BytesIO()
+    Image.new('RGB', (ancho, alto), 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/png')
+
+
+class ArchivosTemporalesMixin:
+    """Storage por defecto y temporal de subidas en un directorio propio del test"""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                            'OPTIONS': {'location': directorio}},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            SUBIDAS_TEMP_DIR=f'{directorio}/temporal',
+            SUBIDAS_ASINCRONAS=False,
+            IMAGENES_ANCHOS=(160,),
+            IMAGENES_FORMATOS=('jpeg',),
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+class DerivadosImagenTest(ArchivosTemporalesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.variante = crear_catalogo(1, variantes=1, imagenes=0)[0]
+
+    def test_imagen_creada_por_la_api_tiene_derivados(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/productos/imagenes/', {
+                'imagen': archivo_imagen(), 'texto': 'Foto', 'Producto_categoria': self.variante.pk,
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        imagen = Imagen_Producto.objects.get()
+        self.assertEqual(set(imagen.derivados['jpeg']), {'160', '400'})
+
+    def test_reemplazar_el_archivo_regenera(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            imagen = Imagen_Producto.objects.create(imagen=archivo_imagen(), texto='Foto',
+                                                    Producto_categoria=self.variante)
+        imagen.refresh_from_db()
+        self.assertEqual(set(imagen.derivados['jpeg']), {'160', '400'})
+
+        with mock.patch('app_productos.signals.programar_derivados') as programar:
+            with self.captureOnCommitCallbacks(execute=True):
+                imagen.texto = 'Solo cambia el texto'
+                imagen.save()
+        programar.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            imagen.imagen = archivo_imagen('otra.png', ancho=100, alto=100)
+            imagen.save()
+        imagen.refresh_from_db()
+        self.assertEqual(set(imagen.derivados['jpeg']), {'100'})
+
+
+class SubidaImagenTest(ArchivosTemporalesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.variante = crear_catalogo(1, variantes=1, imagenes=0)[0]
+
+    def subir(self):
+        return APIClient().post('/api/productos/upload-imagen/', {
+            'imagen': archivo_imagen(), 'Producto_categoria': self.variante.pk, 'texto': 'Foto',
+        }, format='multipart')
+
+    def test_responde_202_con_la_imagen_pendiente(self):
+        response = self.subir()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('debug', response.data)
+        imagen = Imagen_Producto.objects.get()
+        self.assertEqual(imagen.estado_subida, 'pendiente')
+        self.assertTrue(subidas.get_storage_temporal().exists(imagen.archivo_temporal))
+
+    def test_pendiente_a_completada(self):
+        with mock.patch('app_productos.signals.programar_derivados') as programar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.subir()
+        # Los derivados se generan en la subida, no otra vez desde la señal
+        programar.assert_not_called()
+
+        imagen = Imagen_Producto.objects.get()
+        self.assertEqual((imagen.estado_subida, imagen.archivo_temporal), ('completada', None))
+        self.assertEqual(set(imagen.derivados['jpeg']), {'160', '400'})
+
+    @override_settings(SUBIDAS_REINTENTO_SEGUNDOS=30)
+    def test_reintento_despues_del_backoff(self):
+        with mock.patch('app_productos.subidas.generar_derivados_seguro', side_effect=OSError('S3 caído')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.subir()
+        imagen = Imagen_Producto.objects.get()
+        self.assertEqual((imagen.estado_subida, imagen.intentos_subida), ('error', 1))
+
+        self.assertEqual(subidas.procesar_pendientes(), (0, 0))
+        Imagen_Producto.objects.update(fecha_estado_subida=imagen.fecha_estado_subida - timedelta(seconds=31))
+        self.assertEqual(subidas.procesar_pendientes(), (1, 0))
+        self.assertEqual(Imagen_Producto.objects.get().estado_subida, 'completada')
+
+
+class FacetasTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ropa = Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        cls.camisas = Categoria.objects.create(nombre='Camisas', descripcion='Camisas', id_padre=cls.ropa)
+        cls.zapatos = Categoria.objects.create(nombre='Zapatos', descripcion='Zapatos')
+        camisa = Producto.objects.create(nombre='Camisa', descripcion='Camisa', Categoria=cls.camisas)
+        zapato = Producto.objects.create(nombre='Zapato', descripcion='Zapato', Categoria=cls.zapatos)
+        retirado = Producto.objects.create(nombre='Retirado', descripcion='Retirado', Categoria=cls.ropa,
+                                           activo=False)
+        for producto, color, talla, precio, activo in [
+            (camisa, 'rojo', 'M', 30, True),
+            (camisa, 'azul', 'M', 60, True),
+            (camisa, 'rojo', 'L', 150, True),
+            (camisa, 'verde', 'M', 20, False),
+            (zapato, 'rojo', '40', 40, True),
+            (zapato, 'negro', '42', 250, True),
+            (retirado, 'rojo', 'M', 10, True),
+        ]:
+            Producto_Variantes.objects.create(producto=producto, color=color, talla=talla,
+                                              precio_unitario=precio, activo=activo)
+
+    def conteos(self, resultado, faceta):
+        return {fila['valor']: fila['count'] for fila in resultado['facetas'][faceta] if fila['count']}
+
+    def test_una_sola_consulta(self):
+        seleccion = {'categoria': [str(self.ropa.pk)], 'color': ['rojo', 'azul'], 'talla': ['M'],
+                     'precio': ['0-50', '50-100']}
+        with self.assertNumQueries(1):
+            resultado = facetas.contar(seleccion)
+        self.assertEqual(resultado['total'], 2)
+
+    def test_cada_faceta_excluye_su_propio_filtro(self):
+        resultado = facetas.contar({'color': ['rojo']})
+        self.assertEqual(resultado['total'], 3)
+        # Los colores se cuentan sin el filtro de color...
+        self.assertEqual(self.conteos(resultado, 'color'), {'rojo': 3, 'azul': 1, 'negro': 1})
+        # ...y el resto de las facetas con él
+        self.assertEqual(self.conteos(resultado, 'talla'), {'M': 1, 'L': 1, '40': 1})
+
+    def test_seleccion_multiple_es_or_dentro_de_la_faceta(self):
+        self.assertEqual(facetas.contar({'color': ['rojo', 'azul']})['total'], 4)
+        resultado = facetas.contar({'color': ['rojo', 'azul'], 'precio': ['0-50', '50-100']})
+        self.assertEqual(resultado['total'], 3)
+        self.assertEqual(self.conteos(resultado, 'precio'), {'0-50': 2, '50-100': 1, '100-200': 1})
+
+    def test_categorias_acumulan_por_ruta(self):
+        resultado = facetas.contar({})
+        categorias = {fila['id']: fila for fila in resultado['facetas']['categoria']}
+        self.assertEqual(categorias[self.ropa.pk]['count'], 3)
+        self.assertEqual(categorias[self.camisas.pk]['count'], 3)
+        self.assertEqual(categorias[self.camisas.pk]['id_padre'], self.ropa.pk)
+        self.assertEqual(categorias[self.zapatos.pk]['count'], 2)
+
+        resultado = facetas.contar({'categoria': [str(self.ropa.pk)]})
+        self.assertEqual(resultado['total'], 3)
+        self.assertEqual(self.conteos(resultado, 'categoria')[str(self.zapatos.pk)], 2)
+
+    def test_total_coincide_con_el_listado(self):
+        client = APIClient()
+        for parametros in ({}, {'color': 'rojo'}, {'color': ['rojo', 'azul'], 'precio': '0-50'},
+                           {'categoria': self.ropa.pk}):
+            cache.invalidar()
+            listado = client.get('/api/productos/variantes/', parametros)
+            conteo = client.get('/api/productos/variantes/facetas/', parametros)
+            self.assertEqual(listado.data['count'], conteo.data['total'], parametros)
+
+
+class CatalogoConsultasTest(ConsultasConstantesMixin, TestCase):
+    """El listado del catálogo no hace consultas por producto, variante ni imagen"""
+
+    # Ambos tamaños entran en una página (page_size 50), así el conteo no agrega consultas
+    def setUp(self):
+        crear_catalogo(2)
+
+    def test_listado_de_productos(self):
+        response = self.assertConsultasConstantes('/api/productos/productos/', lambda: crear_catalogo(14))
+        self.assertEqual(len(response.data['productos']), 16)
+
+    def test_listado_de_variantes(self):
+        response = self.assertConsultasConstantes('/api/productos/variantes/', lambda: crear_catalogo(14))
+        self.assertEqual(response.data['count'], 48)
+
+
+class InventarioConsultasTest(ConsultasConstantesMixin, TestCase):
+    """InventarioViewSet precarga las variantes de cada inventario"""
+
+    def crear_inventarios(self, productos):
+        # Stock bajo, en rango y alto, para que haya alertas de ambos tipos
+        for stock in (1, 10, 500):
+            crear_catalogo(productos, variantes=2, imagenes=0, stock=stock)
+        alertas.recalcular()
+
+    def setUp(self):
+        self.crear_inventarios(1)
+
+    def test_listado(self):
+        response = self.assertConsultasConstantes('/api/productos/inventario/', lambda: self.crear_inventarios(7))
+        self.assertEqual(response.data['count'], 48)
+
+    def test_stock_bajo(self):
+        response = self.assertConsultasConstantes(
+            '/api/productos/inventario/stock_bajo/', lambda: self.crear_inventarios(7)
+        )
+        self.assertEqual(response.data['count'], 16)
+
+    def test_alertas(self):
+        response = self.assertConsultasConstantes(
+            '/api/productos/inventario/alertas/', lambda: self.crear_inventarios(7)
+        )
+        self.assertEqual(response.data['alertas']['stock_alto']['count'], 16)
+
+    def test_por_variante(self):
+        variante = Producto_Variantes.objects.order_by('pk').first()
+
+        def compartir_inventario():
+            # Más variantes apuntando al mismo inventario
+            Producto_Variantes.objects.bulk_create([
+                Producto_Variantes(producto=variante.producto, color=f'otro {i}', talla='L',
+                                   precio_unitario=10, Inventario_id=variante.Inventario_id)
+                for i in range(10)
+            ])
+
+        response = self.assertConsultasConstantes(
+            f'/api/productos/inventario/por_variante/?variante={variante.pk}', compartir_inventario
+        )
+        self.assertEqual(len(response.data['inventario']['variantes']), 11)
+
+
+class ItemsConsultasTest(ConsultasConstantesMixin, TestCase):
+    """Los items de pedido y de compra precargan su variante (con calificación e imágenes)"""
+
+    def setUp(self):
+        self.pedido = Pedido.objects.create(estado='pendiente', numero_pedido='PED-1', monto_total=0)
+        self.compra = compra.objects.create(monto_total=10)
+        self.agregar_items(2)
+        token = Token.objects.create(user=User.objects.create_user('admin', is_staff=True))
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        # Llenar la caché de autenticación antes de contar consultas
+        self.client.get('/api/productos/items-compras/')
+
+    def agregar_items(self, productos):
+        for variante in crear_catalogo(productos, variantes=1):
+            item_pedido.objects.create(Producto_variante=variante, pedido=self.pedido, cantidad=1)
+            item_compras.objects.create(producto_variante=variante, compra=self.compra, cantidad=1)
+
+    def test_items_de_pedido(self):
+        response = self.assertConsultasConstantes('/api/productos/items-pedido/', lambda: self.agregar_items(20))
+        self.assertEqual(len(response.data), 22)
+        self.assertIn('calificacion', response.data[0]['producto_info'])
+
+    def test_items_de_compra(self):
+        response = self.assertConsultasConstantes('/api/productos/items-compras/', lambda: self.agregar_items(20))
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(response.data[0]['compra_info']['id'], self.compra.pk)
+
+
+class HistorialStockTest(TestCase):
+    def setUp(self):
+        self.inicio = timezone.now() - timedelta(days=10)
+
+    def en(self, dia):
+        return mock.patch('django.utils.timezone.now', return_value=self.inicio + timedelta(days=dia))
+
+    def dia(self, dia):
+        return self.inicio + timedelta(days=dia)
+
+    def crear_historial(self):
+        with self.en(0):
+            remera = Inventario.objects.create(stock=10, stock_minimo=0, stock_maximo=100, ubicacion_almacen='A')
+            pantalon = Inventario.objects.create(stock=3, stock_minimo=0, stock_maximo=100, ubicacion_almacen='A')
+        with self.en(1):
+            descontar_stock(remera.pk, 4)
+        with self.en(2):
+            historial.tomar_snapshot()
+        with self.en(3):
+            reponer_stock(remera.pk, 1)
+            descontar_stock(pantalon.pk, 2)
+        with self.en(4):
+            remera.refresh_from_db()
+            remera.stock = 20
+            remera.save()
+        return remera, pantalon
+
+    def test_snapshot_mas_movimientos_es_el_stock_actual(self):
+        remera, pantalon = self.crear_historial()
+
+        with self.assertNumQueries(1):
+            actual = historial.stocks_en(timezone.now())
+        self.assertEqual(actual, {remera.pk: 20, pantalon.pk: 1})
+        self.assertEqual(historial.verificar(), [])
+
+        # Los movimientos anteriores al snapshot ya no hacen falta
+        MovimientoStock.objects.filter(fecha__lte=self.dia(2)).delete()
+        self.assertEqual(historial.stocks_en(timezone.now()), actual)
+
+    def test_stock_en_fechas_pasadas(self):
+        remera, pantalon = self.crear_historial()
+
+        self.assertEqual(historial.stocks_en(self.dia(-1)), {remera.pk: 0, pantalon.pk: 0})
+        self.assertEqual(historial.stocks_en(self.dia(1.5)), {remera.pk: 6, pantalon.pk: 3})
+        self.assertEqual(historial.stocks_en(self.dia(3.5)), {remera.pk: 7, pantalon.pk: 1})
+        self.assertEqual(historial.stock_en(remera.pk, self.dia(4)), 20)
+
+    def test_verificar_detecta_cambios_sin_movimiento(self):
+        remera, pantalon = self.crear_historial()
+        Inventario.objects.filter(pk=pantalon.pk).update(stock=50)
+
+        self.assertEqual(historial.verificar(), [(pantalon.pk, 50, 1)])
+
+
+class AlertasStockTest(TestCase):
+    def inventario(self, stock, stock_minimo=5, stock_maximo=50):
+        return Inventario.objects.create(stock=stock, stock_minimo=stock_minimo, stock_maximo=stock_maximo,
+                                         ubicacion_almacen='A')
+
+    def activas(self):
+        return dict(AlertaStock.objects.filter(activa=True).values_list('inventario_id', 'tipo'))
+
+    def test_abre_y_resuelve(self):
+        bajo, normal = self.inventario(2), self.inventario(10)
+
+        self.assertEqual(alertas.evaluar([bajo.pk, normal.pk]), (1, 0))
+        self.assertEqual(self.activas(), {bajo.pk: 'stock_bajo'})
+        self.assertEqual(AlertaStock.objects.values_list('stock', 'umbral').get(), (2, 5))
+        self.assertEqual(alertas.evaluar([bajo.pk, normal.pk]), (0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reponer_stock(bajo.pk, 8)
+        self.assertEqual(self.activas(), {})
+        self.assertIsNotNone(AlertaStock.objects.get().fecha_resolucion)
+
+    def test_cambio_de_tipo_resuelve_y_abre(self):
+        inventario = self.inventario(2)
+        alertas.evaluar([inventario.pk])
+
+        Inventario.objects.filter(pk=inventario.pk).update(stock=80)
+        self.assertEqual(alertas.evaluar([inventario.pk]), (1, 1))
+        self.assertEqual(self.activas(), {inventario.pk: 'stock_alto'})
+        self.assertEqual(AlertaStock.objects.count(), 2)
+
+    def test_cambio_de_umbral_desde_save(self):
+        inventario = self.inventario(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            inventario.stock_minimo = 20
+            inventario.save()
+        self.assertEqual(self.activas(), {inventario.pk: 'stock_bajo'})
+
+    def test_consultas_constantes(self):
+        pocos = [self.inventario(stock).pk for stock in (1, 10, 90)]
+        muchos = [self.inventario(stock).pk for stock in (1, 10, 90) * 10]
+
+        with CaptureQueriesContext(connection) as capturadas:
+            alertas.evaluar(pocos)
+        with self.assertNumQueries(len(capturadas)):
+            alertas.evaluar(muchos)
+
+    @override_settings(ALERTAS_STOCK_WEBHOOK_URL='http://alertas.invalid/', ALERTAS_STOCK_ASINCRONAS=False)
+    def test_notificacion_con_reintento(self):
+        inventario = self.inventario(2)
+        with mock.patch('app_productos.alertas.enviar', side_effect=OSError('sin conexión')):
+            with self.captureOnCommitCallbacks(execute=True):
+                alertas.evaluar([inventario.pk])
+        self.assertFalse(AlertaStock.objects.get().notificada)
+
+        with mock.patch('app_productos.alertas.enviar') as enviar:
+            self.assertEqual(alertas.notificar_pendientes(), 1)
+        eventos = enviar.call_args.args[0]
+        self.assertEqual([(e['inventario_id'], e['tipo'], e['estado']) for e in eventos],
+                         [(inventario.pk, 'stock_bajo', 'activa')])
+        self.assertTrue(AlertaStock.objects.get().notificada)
+
+
+def archivo_csv(*filas, nombre='catalogo.csv'):
+    encabezado = 'producto,categoria,color,talla,precio_unitario,stock\n'
+    return SimpleUploadedFile(nombre, (encabezado + ''.join(f'{fila}\n' for fila in filas)).encode(),
+                              content_type='text/csv')
+
+
+class ImportacionCatalogoTest(ArchivosTemporalesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def importar(self, *filas):
+        return importacion.importar(archivo_csv(*filas), 'csv', tamano_lote=2)
+
+    def test_crea_productos_variantes_e_inventarios(self):
+        resultado = self.importar('Remera,Ropa,rojo,M,10.50,5', 'Remera,Ropa,azul,M,10.50,3',
+                                  'Pantalón,Ropa,negro,L,20,0')
+
+        self.assertEqual((resultado.productos_creados, resultado.variantes_creadas), (2, 3))
+        variante = Producto_Variantes.objects.get(color='rojo')
+        self.assertEqual(variante.Inventario_id.stock, 5)
+        self.assertEqual(
+            list(MovimientoStock.objects.filter(inventario=variante.Inventario_id).values_list('tipo', 'cantidad')),
+            [('ajuste', 5)]
+        )
+
+    def test_actualiza_el_stock_con_un_ajuste(self):
+        self.importar('Remera,Ropa,rojo,M,10,5')
+        resultado = self.importar('Remera,Ropa,rojo,M,12,2')
+
+        self.assertEqual((resultado.variantes_creadas, resultado.variantes_actualizadas), (0, 1))
+        variante = Producto_Variantes.objects.get()
+        self.assertEqual((variante.precio_unitario, variante.Inventario_id.stock), (12, 2))
+        self.assertEqual(
+            list(MovimientoStock.objects.order_by('id').values_list('cantidad', flat=True)), [5, -3]
+        )
+
+    def test_variante_sin_inventario_recibe_uno(self):
+        producto = Producto.objects.create(nombre='Remera', descripcion='', Categoria=Categoria.objects.get())
+        variante = Producto_Variantes.objects.create(producto=producto, color='rojo', talla='M', precio_unitario=10)
+
+        self.importar('Remera,Ropa,rojo,M,10,7')
+
+        variante.refresh_from_db()
+        self.assertEqual(variante.Inventario_id.stock, 7)
+        self.assertEqual(MovimientoStock.objects.get().cantidad, 7)
+
+    def test_filas_con_error(self):
+        resultado = self.importar('Remera,Ropa,rojo,M,10,5', 'Remera,Otra,azul,M,abc,-1')
+
+        self.assertEqual((resultado.variantes_creadas, resultado.filas_con_error), (1, 1))
+        self.assertEqual(resultado.errores[0]['fila'], 3)
+        self.assertEqual(set(resultado.errores[0]['errores']), {'categoria', 'precio_unitario', 'stock'})
+
+    def test_api_encola_y_responde_202(self):
+        response = self.admin.post('/api/productos/importar/', {'archivo': archivo_csv('Remera,Ropa,rojo,M,10,5')},
+                                   format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['importacion']['estado'], 'pendiente')
+        self.assertFalse(Producto_Variantes.objects.exists())
+
+        call_command('procesar_importaciones', stdout=io.StringIO())
+        registro = ImportacionCatalogo.objects.get()
+        self.assertEqual(registro.estado, 'completada')
+        self.assertEqual(registro.resultado['variantes_creadas'], 1)
+        estado = self.admin.get(response.data['importacion']['url_estado'])
+        self.assertEqual(estado.data['importacion']['resultado']['variantes_creadas'], 1)
+
+    @override_settings(IMPORTACION_ASINCRONA=False)
+    def test_api_sin_worker_procesa_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin.post('/api/productos/importar/', {
+                'archivo': archivo_csv('Remera,Ropa,rojo,M,10,5'), 'simular': 'true'
+            }, format='multipart')
+        self.assertEqual(response.status_code, 202)
+
+        registro = ImportacionCatalogo.objects.get()
+        self.assertEqual((registro.estado, registro.resultado['variantes_creadas']), ('completada', 1))
+        self.assertFalse(Producto_Variantes.objects.exists())
+
+    def test_api_solo_administradores(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('cliente'))
+        response = client.post('/api/productos/importar/', {'archivo': archivo_csv('Remera,Ropa,rojo,M,10,5')},
+                               format='multipart')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ImportacionCatalogo.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'La búsqueda por texto completo requiere PostgreSQL')
+class BusquedaProductosTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        cls.camisa = Producto.objects.create(nombre='Camisa de lino', descripcion='Fresca', Categoria=cls.categoria)
+        cls.pantalon = Producto.objects.create(
+            nombre='Pantalón', descripcion='Combina con cualquier camisa', Categoria=cls.categoria
+        )
+        Producto_Variantes.objects.create(producto=cls.pantalon, color='turquesa', talla='M', precio_unitario=10)
+
+    def setUp(self):
+        cache.invalidar()
+
+    def test_ordena_por_relevancia(self):
+        resultados = list(buscar('camisa'))
+        self.assertEqual(resultados[:2], [self.camisa, self.pantalon])
+
+    def test_tolera_errores_de_tipeo(self):
+        self.assertIn(self.camisa, buscar('camisas de lnio'))
+
+    def test_vector_incluye_variantes_y_se_mantiene(self):
+        self.assertEqual(list(buscar('turquesa')), [self.pantalon])
+        Producto_Variantes.objects.create(producto=self.camisa, color='coral', talla='S', precio_unitario=10)
+        self.assertEqual(list(buscar('coral')), [self.camisa])
+
+    def test_endpoint_buscar(self):
+        response = APIClient().get('/api/productos/buscar/', {'q': 'camisa'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['productos'][0]['id'], self.camisa.pk)
+
+    def test_icontains_usa_indice_de_trigramas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan_producto = Producto.objects.filter(nombre__icontains='amis').explain()
+            plan_variante = Producto_Variantes.objects.filter(color__icontains='rques').explain()
+        self.assertIn('producto_nombre_upper_trgm', plan_producto)
+        self.assertIn('variante_color_upper_trgm', plan_variante)
@@ -8,8 +8,14 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.core.files.storage import default_storage
 from app_productos.models import Imagen_Producto, Producto_Variantes
 from app_productos.serializers import ImagenProductoSerializer
+from app_productos.subidas import encolar_subida
+from app_productos.derivados import srcset
+from django.urls import reverse
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class ImageUploadAPIView(APIView):
     """
     API específica para subir imágenes directamente a S3
@@ -19,15 +25,12 @@ class ImageUploadAPIView(APIView):
     
     def dispatch(self, request, *args, **kwargs):
         """Override dispatch para capturar errores de parsing"""
-        print(f"🔍 Dispatch - Method: {request.method}")
-        print(f"🔍 Content-Type: {request.content_type}")
-        print(f"🔍 Headers: {dict(request.headers)}")
+        # Sin headers: incluyen el token de autorización
+        logger.debug('Subida de imagen %s', request.method, extra={'content_type': request.content_type})
         try:
             return super().dispatch(request, *args, **kwargs)
         except Exception as e:
-            print(f"❌ Error en dispatch: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error en dispatch de la subida de imagen')
             return Response({
                 'success': False,
                 'error': f'Error en dispatch: {str(e)}',
@@ -36,7 +39,7 @@ class ImageUploadAPIView(APIView):
     
     def post(self, request, *args, **kwargs):
         """
-        Subir imagen a S3
+        Recibir una imagen y encolar su subida a S3 (responde 202)
         
         Parámetros esperados:
         - imagen: archivo de imagen
@@ -45,21 +48,15 @@ class ImageUploadAPIView(APIView):
         - es_principal: si es la imagen principal (opcional, default: false)
         """
         try:
-            # DEBUG: Imprimir lo que llega
-            print(f"📥 FILES recibidos: {request.FILES}")
-            print(f"📥 DATA recibido: {request.data}")
-            print(f"📥 POST recibido: {request.POST}")
+            logger.debug('Subida recibida', extra={
+                'archivos': list(request.FILES), 'campos': list(request.POST)
+            })
             
             # Validar que se envió un archivo
             if 'imagen' not in request.FILES:
                 return Response({
                     'success': False,
-                    'error': 'No se envió ningún archivo',
-                    'debug': {
-                        'files_keys': list(request.FILES.keys()),
-                        'data_keys': list(request.data.keys()),
-                        'post_keys': list(request.POST.keys())
-                    }
+                    'error': 'No se envió ningún archivo'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             imagen_file = request.FILES['imagen']
@@ -69,12 +66,7 @@ class ImageUploadAPIView(APIView):
             if not producto_categoria_id:
                 return Response({
                     'success': False,
-                    'error': 'Se requiere el ID de Producto_categoria',
-                    'debug': {
-                        'data_recibido': dict(request.data),
-                        'post_recibido': dict(request.POST),
-                        'campos_esperados': ['imagen', 'Producto_categoria', 'texto', 'es_principal']
-                    }
+                    'error': 'Se requiere el ID de Producto_categoria'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Validar que existe el producto_categoria
@@ -90,37 +82,25 @@ class ImageUploadAPIView(APIView):
             texto = request.data.get('texto', '')
             es_principal = request.data.get('es_principal', 'false').lower() == 'true'
             
-            # Si es principal, desmarcar otras imágenes principales
-            if es_principal:
-                Imagen_Producto.objects.filter(
-                    Producto_categoria=producto_categoria,
-                    es_principal=True
-                ).update(es_principal=False)
-            
-            # Crear registro de imagen (esto automáticamente sube a S3)
-            imagen_producto = Imagen_Producto.objects.create(
-                imagen=imagen_file,
+            # El archivo queda en almacenamiento temporal; la subida a S3 la
+            # hace un worker en segundo plano (ver app_productos/subidas.py)
+            imagen_producto = encolar_subida(
+                imagen_file,
+                producto_categoria,
                 texto=texto,
-                es_principal=es_principal,
-                Producto_categoria=producto_categoria
+                es_principal=es_principal
             )
             
-            # Serializar respuesta
             serializer = ImagenProductoSerializer(imagen_producto)
             
-            # Información de debug
-            debug_info = {
-                'storage_backend': default_storage.__class__.__name__,
-                'archivo_guardado_en': imagen_producto.imagen.name,
-                'url_completa': imagen_producto.imagen.url,
-            }
-            
             return Response({
                 'success': True,
-                'message': 'Imagen subida exitosamente a S3',
+                'message': 'Imagen recibida, la subida a S3 está en proceso',
                 'imagen': serializer.data,
-                'debug': debug_info
-            }, status=status.HTTP_201_CREATED)
+                'estado_url': request.build_absolute_uri(
+                    reverse('imagen-producto-detail', args=[imagen_producto.id])
+                )
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             return Response({
@@ -210,7 +190,7 @@ class ImageDisplayAPIView(APIView):
                 imagen_info = self._format_image_data(imagen)
                 imagenes_data.append(imagen_info)
             
-            print(f"🖼️ API Display: Devolviendo {len(imagenes_data)} imágenes")
+            logger.debug('Devolviendo %s imágenes', len(imagenes_data))
             
             return Response({
                 'success': True,
@@ -244,6 +224,7 @@ class ImageDisplayAPIView(APIView):
                 'id': imagen.id,
                 'imagen_url': imagen.imagen.url if imagen.imagen else None,
                 'imagen_name': imagen.imagen.name if imagen.imagen else None,
+                'srcset': srcset(imagen),
                 'texto': imagen.texto,
                 'es_principal': imagen.es_principal,
                 'producto_categoria_id': producto_categoria.id,
@@ -273,7 +254,7 @@ class ImageDisplayAPIView(APIView):
                 }
             }
         except Exception as e:
-            print(f"⚠️ Error formateando imagen {imagen.id}: {str(e)}")
+            logger.warning('Error formateando imagen %s: %s', imagen.id, e)
             return {
                 'id': imagen.id,
                 'error': f'Error al formatear imagen: {str(e)}',
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .api import (
     ProductoViewSet, CategoriaViewSet, ProductoCategoriaViewSet,
     ReseñaViewSet, ImagenProductoViewSet, ItemPedidoViewSet, ItemComprasViewSet,
-    InventarioViewSet
+    InventarioViewSet, CatalogoCacheStatsAPIView, BusquedaProductosAPIView,
+    ImportacionCatalogoAPIView
 )
 from .upload_api import ImageUploadAPIView, ImageDisplayAPIView, ImageStatsAPIView
 
@@ -19,7 +20,11 @@ router.register(r'inventario', InventarioViewSet, basename='inventario')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('buscar/', BusquedaProductosAPIView.as_view(), name='buscar-productos'),
+    path('importar/', ImportacionCatalogoAPIView.as_view(), name='importar-catalogo'),
+    path('importar/<int:pk>/', ImportacionCatalogoAPIView.as_view(), name='importacion-catalogo-detalle'),
     path('upload-imagen/', ImageUploadAPIView.as_view(), name='upload-imagen'),
     path('mostrar-imagenes/', ImageDisplayAPIView.as_view(), name='mostrar-imagenes'),
     path('estadisticas-imagenes/', ImageStatsAPIView.as_view(), name='estadisticas-imagenes'),
+    path('cache-catalogo/', CatalogoCacheStatsAPIView.as_view(), name='cache-catalogo'),
 ]
@@ -1,3 +1,5 @@
+import logging
+
 from .serializers import (
     UserSerializer, GroupSerializer, PermissionSerializer, 
     LoginSerializer, RegisterSerializer, UserGroupSerializer,
@@ -11,6 +13,8 @@ from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+logger = logging.getLogger(__name__)
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -217,20 +221,20 @@ def register_view(request):
                 if cliente_group in user.groups.all():
                     group_id = cliente_group.id
                     group_name = cliente_group.name
-                    print(f"✅ Usuario {user.username} agregado exitosamente al grupo {group_name}")
+                    logger.info('Usuario %s agregado al grupo %s', user.pk, group_name)
                 else:
-                    print(f"⚠️ ADVERTENCIA: No se pudo verificar que el usuario {user.username} fue agregado al grupo")
+                    logger.warning('No se pudo verificar que el usuario %s fue agregado al grupo', user.pk)
             except Group.DoesNotExist:
                 # Si no existe el grupo con id=3, intentar crearlo
-                print("⚠️ ADVERTENCIA: Grupo 'cliente' (id=3) no existe en la base de datos")
+                logger.warning("Grupo 'cliente' (id=3) no existe en la base de datos; se crea")
                 cliente_group = Group.objects.create(id=3, name='cliente')
                 user.groups.add(cliente_group)
                 user.save()
                 group_id = cliente_group.id
                 group_name = cliente_group.name
-                print(f"✅ Grupo 'cliente' creado y usuario {user.username} agregado")
-            except Exception as group_error:
-                print(f"❌ ERROR al agregar usuario al grupo: {str(group_error)}")
+                logger.info("Grupo 'cliente' creado y usuario %s agregado", user.pk)
+            except Exception:
+                logger.exception('Error al agregar el usuario %s al grupo', user.pk)
             
             return Response({
                 'success': True,
@@ -246,7 +250,7 @@ def register_view(request):
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
-            print(f"❌ ERROR al crear el usuario: {str(e)}")
+            logger.exception('Error al crear el usuario')
             return Response({
                 'success': False,
                 'message': 'Error al crear el usuario',
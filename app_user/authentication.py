@@ -0,0 +1,99 @@
+"""
+Autenticación por token con caché.
+
+TokenAuthentication hace en cada petición un SELECT de authtoken_token con
+JOIN a auth_user, y las vistas del carrito buscan además el Cliente del
+usuario. CachedTokenAuthentication guarda token -> (usuario, cliente_id)
+en el alias AUTH_TOKEN_CACHE_ALIAS de CACHES.
+
+El caché solo se usa si AUTH_TOKEN_CACHE_ACTIVA: en producción hace falta
+un caché compartido (AUTH_TOKEN_CACHE_URL), porque con memoria local un
+logout o una desactivación solo se borraría en el worker que la atendió y
+los demás seguirían aceptando el token. Sin él se autentica sin caché.
+
+Las entradas expiran a los AUTH_TOKEN_CACHE_TIMEOUT segundos y se borran al
+eliminar el token (logout), al guardar el usuario (ej. desactivarlo) y al
+crear o eliminar su Cliente (ver signals.py), también al confirmarse la
+transacción. Una entrada se escribe con `add` y se vuelve a validar el
+token después: si un logout concurrente lo borró entre la lectura y la
+escritura, se descarta. Las claves usan el hash del token, nunca el token
+en claro.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from app_Cliente.models import Cliente
+
+PREFIJO = 'auth:token'
+# Distingue "sin Cliente" (None) de "no se consultó"
+SIN_CONSULTAR = object()
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_activa():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_ACTIVA', False)
+
+
+def get_timeout():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60)
+
+
+def clave_token(key):
+    return f"{PREFIJO}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+
+def invalidar_token(key):
+    get_cache().delete(clave_token(key))
+
+
+def invalidar_usuario(user_id):
+    """Borrar del caché los tokens de un usuario"""
+    if not cache_activa():
+        return
+    claves = [clave_token(key) for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True)]
+    if claves:
+        get_cache().delete_many(claves)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication que evita las consultas mientras el token está en caché"""
+
+    def authenticate_credentials(self, key):
+        if not cache_activa():
+            return super().authenticate_credentials(key)
+        cache = get_cache()
+        clave = clave_token(key)
+        token = cache.get(clave)
+        if token is None:
+            # Valida el token y el usuario activo; lanza AuthenticationFailed si no
+            user, token = super().authenticate_credentials(key)
+            token.cliente_id = Cliente.objects.filter(usuario_id=user.pk).values_list('id', flat=True).first()
+            if cache.add(clave, token, get_timeout()) and not Token.objects.filter(
+                key=key, user__is_active=True
+            ).exists():
+                # Un logout o una desactivación llegó entre la lectura y la escritura
+                cache.delete(clave)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return token.user, token
+
+
+def get_cliente_id(request):
+    """
+    id del Cliente del usuario autenticado, o None si no tiene.
+    Usa el valor del caché de tokens cuando la petición se autenticó con él.
+    """
+    if not request.user or not request.user.is_authenticated:
+        return None
+    cliente_id = getattr(request.auth, 'cliente_id', SIN_CONSULTAR)
+    if cliente_id is SIN_CONSULTAR:
+        cliente_id = Cliente.objects.filter(usuario_id=request.user.pk).values_list('id', flat=True).first()
+    return cliente_id
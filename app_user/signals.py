@@ -0,0 +1,40 @@
+"""
+Señales de app_user.
+Mantienen al día el caché de tokens (ver authentication.py): se invalida al
+eliminar un token (logout), al guardar un usuario (activar/desactivar,
+cambio de permisos) y al crear o eliminar su Cliente. Se invalida en el
+momento y otra vez al confirmar la transacción, por si una petición leyó
+los datos anteriores al commit y los volvió a guardar en el caché.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from app_Cliente.models import Cliente
+from .authentication import invalidar_token, invalidar_usuario
+
+
+def _invalidar(funcion, valor):
+    funcion(valor)
+    transaction.on_commit(lambda: funcion(valor), robust=True)
+
+
+def invalidar_token_eliminado(sender, instance, **kwargs):
+    _invalidar(invalidar_token, instance.key)
+
+
+def invalidar_tokens_usuario(sender, instance, created=False, raw=False, **kwargs):
+    if not raw and not created:
+        _invalidar(invalidar_usuario, instance.pk)
+
+
+def invalidar_tokens_cliente(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidar(invalidar_usuario, instance.usuario_id)
+
+
+post_delete.connect(invalidar_token_eliminado, sender=Token, dispatch_uid='auth_token_delete')
+post_save.connect(invalidar_tokens_usuario, sender=User, dispatch_uid='auth_token_user_save')
+post_save.connect(invalidar_tokens_cliente, sender=Cliente, dispatch_uid='auth_token_cliente_save')
+post_delete.connect(invalidar_tokens_cliente, sender=Cliente, dispatch_uid='auth_token_cliente_delete')
@@ -1,3 +1,58 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app_Cliente.models import Cliente
+from .authentication import CachedTokenAuthentication, get_cache
+
+
+@override_settings(AUTH_TOKEN_CACHE_ACTIVA=True)
+class CacheTokensTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('cliente', password='clave')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def autenticar(self):
+        return self.auth.authenticate_credentials(self.token.key)
+
+    def test_segunda_peticion_sin_consultas(self):
+        self.autenticar()
+        with self.assertNumQueries(0):
+            user, token = self.autenticar()
+        self.assertEqual((user.pk, token.cliente_id), (self.user.pk, None))
+
+    def test_logout_invalida(self):
+        self.autenticar()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post('/api/users/logout/').status_code, 200)
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.autenticar()
+        self.assertEqual(client.get('/api/carrito/carritos/').status_code, 401)
+
+    def test_desactivar_invalida(self):
+        self.autenticar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.autenticar()
+
+    def test_guardar_cliente_invalida(self):
+        self.autenticar()
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente = Cliente.objects.create(usuario=self.user, telefono='123', fecha_nacimiento=date(1990, 1, 1))
+        self.assertEqual(self.autenticar()[1].cliente_id, cliente.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente.delete()
+        self.assertIsNone(self.autenticar()[1].cliente_id)
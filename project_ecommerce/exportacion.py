@@ -0,0 +1,220 @@
+"""
+Exportación en streaming de tablas completas como CSV o NDJSON.
+
+Las filas se leen con `.values_list().iterator(chunk_size=...)` (cursor del
+lado del servidor en PostgreSQL) y se escriben a medida que llegan, tanto
+en la respuesta HTTP (StreamingHttpResponse) como en el comando
+`exportar_datos`. La memoria usada no depende del tamaño de la tabla.
+Opcionalmente la salida se comprime con gzip al vuelo.
+
+Cada exportación declara el modelo, el campo de fecha para filtrar por
+rango y las columnas (encabezado, lookup del ORM).
+"""
+import csv
+import datetime
+import decimal
+import json
+import zlib
+
+from django.apps import apps
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORTACIONES = {
+    'pedidos': {
+        'modelo': 'app_pedidos.Pedido',
+        'campo_fecha': 'fecha_pedido',
+        'columnas': (
+            ('id', 'id'),
+            ('numero_pedido', 'numero_pedido'),
+            ('fecha_pedido', 'fecha_pedido'),
+            ('estado', 'estado'),
+            ('tipo_pedido', 'tipo_pedido'),
+            ('subtotal', 'subtotal'),
+            ('costo_envio', 'costo_envio'),
+            ('monto_total', 'monto_total'),
+            ('metodo_pago_id', 'metodo_pago_id'),
+            ('direccion_envio_id', 'direccion_envio_id'),
+            ('transaccion_id', 'transaccion_id'),
+        ),
+    },
+    'items_pedido': {
+        'modelo': 'app_productos.item_pedido',
+        'campo_fecha': 'pedido__fecha_pedido',
+        'columnas': (
+            ('id', 'id'),
+            ('pedido_id', 'pedido_id'),
+            ('numero_pedido', 'pedido__numero_pedido'),
+            ('fecha_pedido', 'pedido__fecha_pedido'),
+            ('estado_pedido', 'pedido__estado'),
+            ('variante_id', 'Producto_variante_id'),
+            ('producto', 'Producto_variante__producto__nombre'),
+            ('color', 'Producto_variante__color'),
+            ('talla', 'Producto_variante__talla'),
+            ('cantidad', 'cantidad'),
+            ('precio_unitario', 'precio_unitario'),
+            ('subtotal', 'subtotal'),
+        ),
+    },
+    'items_compras': {
+        'modelo': 'app_productos.item_compras',
+        'campo_fecha': 'compra__fecha_compra',
+        'columnas': (
+            ('id', 'id'),
+            ('compra_id', 'compra_id'),
+            ('numero_compra', 'compra__numero_compra'),
+            ('fecha_compra', 'compra__fecha_compra'),
+            ('proveedor_id', 'compra__Proveedor_id'),
+            ('variante_id', 'producto_variante_id'),
+            ('producto', 'producto_variante__producto__nombre'),
+            ('color', 'producto_variante__color'),
+            ('talla', 'producto_variante__talla'),
+            ('cantidad', 'cantidad'),
+            ('costo_unitario', 'costo_unitario'),
+            ('costo_total', 'costo_total'),
+        ),
+    },
+}
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORTACION_CHUNK_SIZE', 2000)
+
+
+def consulta(nombre, base=None, desde=None, hasta=None):
+    """values_list de la exportación `nombre` ordenado por id (opcionalmente sobre un queryset filtrado)"""
+    definicion = EXPORTACIONES[nombre]
+    if base is None:
+        base = apps.get_model(definicion['modelo']).objects.all()
+    campo_fecha = definicion['campo_fecha']
+    if desde:
+        base = base.filter(**{f'{campo_fecha}__gte': desde})
+    if hasta:
+        base = base.filter(**{f'{campo_fecha}__lte': hasta})
+    lookups = [lookup for _, lookup in definicion['columnas']]
+    return base.order_by('id').values_list(*lookups)
+
+
+# ----------------------------------------------------------------------
+# Serialización
+# ----------------------------------------------------------------------
+def _valor_json(valor):
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    raise TypeError(f'Tipo no serializable: {type(valor).__name__}')
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def _agrupar(partes, tamano=64 * 1024):
+    """Juntar las líneas en bloques de ~64 KB para no emitir un chunk HTTP por fila"""
+    bloque = []
+    acumulado = 0
+    for parte in partes:
+        bloque.append(parte)
+        acumulado += len(parte)
+        if acumulado >= tamano:
+            yield ''.join(bloque)
+            bloque = []
+            acumulado = 0
+    if bloque:
+        yield ''.join(bloque)
+
+
+def lineas_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def lineas_ndjson(encabezados, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(encabezados, fila)), default=_valor_json, ensure_ascii=False) + '\n'
+
+
+def comprimir(bloques):
+    """gzip incremental de un iterable de bytes"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def generar(nombre, queryset, formato='csv', gzip=False):
+    """Iterador de bytes con el contenido de la exportación"""
+    encabezados = [encabezado for encabezado, _ in EXPORTACIONES[nombre]['columnas']]
+    filas = queryset.iterator(chunk_size=get_chunk_size())
+    lineas = lineas_ndjson(encabezados, filas) if formato == 'ndjson' else lineas_csv(encabezados, filas)
+    bloques = (bloque.encode('utf-8') for bloque in _agrupar(lineas))
+    return comprimir(bloques) if gzip else bloques
+
+
+def nombre_archivo(nombre, formato, gzip=False):
+    return f"{nombre}_{timezone.now():%Y%m%d_%H%M%S}.{formato}" + ('.gz' if gzip else '')
+
+
+# ----------------------------------------------------------------------
+# Vistas y comando
+# ----------------------------------------------------------------------
+def respuesta(request, nombre, base=None):
+    """
+    StreamingHttpResponse de la exportación `nombre`.
+    Parámetros: formato=csv|ndjson, gzip=1, fecha_desde, fecha_hasta (YYYY-MM-DD).
+    `base` puede ser un queryset o una función que lo construye (se llama
+    después de validar los parámetros, ej. `self.get_queryset`).
+    """
+    formato = request.query_params.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return Response({
+            'success': False,
+            'message': f"formato debe ser uno de: {', '.join(FORMATOS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    gzip = request.query_params.get('gzip', '').lower() in ('1', 'true', 'si')
+
+    try:
+        desde = request.query_params.get('fecha_desde')
+        hasta = request.query_params.get('fecha_hasta')
+        desde = datetime.date.fromisoformat(desde) if desde else None
+        hasta = datetime.date.fromisoformat(hasta) if hasta else None
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'fecha_desde y fecha_hasta deben tener el formato YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if callable(base):
+        base = base()
+    queryset = consulta(nombre, base=base, desde=desde, hasta=hasta)
+    response = StreamingHttpResponse(
+        generar(nombre, queryset, formato, gzip),
+        content_type='application/gzip' if gzip else FORMATOS[formato]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo(nombre, formato, gzip)}"'
+    return response
+
+
+def escribir(nombre, destino, formato='csv', gzip=False, desde=None, hasta=None):
+    """Escribir la exportación en un archivo binario abierto. Retorna los bytes escritos."""
+    escritos = 0
+    for bloque in generar(nombre, consulta(nombre, desde=desde, hasta=hasta), formato, gzip):
+        destino.write(bloque)
+        escritos += len(bloque)
+    return escritos
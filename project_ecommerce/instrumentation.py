@@ -0,0 +1,293 @@
+"""
+Instrumentación de peticiones: consultas SQL, tiempo de base de datos,
+tiempo de renderizado, duración total y tamaño de la respuesta.
+
+InstrumentacionMiddleware mide cada petición y:
+    - agrega el header Server-Timing (visible en las DevTools del navegador):
+        Server-Timing: db;dur=12.4;desc="9 consultas", render;dur=3.1, total;dur=25.0
+    - acumula histogramas por vista (view_name de la ruta) y método HTTP,
+      expuestos en formato de texto de Prometheus en /api/metricas/
+      (sólo administradores; ?formato=json da un resumen con p50/p95).
+
+Las consultas se cuentan con `connection.execute_wrapper` (fuera de una
+petición instrumentada el envoltorio sólo lee una ContextVar). El
+renderizado es la fase en que una TemplateResponse (la Response de DRF)
+se convierte en bytes: empieza en process_template_response y termina en
+un post-render callback. Los serializers que la vista evalúa antes de
+retornar (serializer.data) cuentan en el total y no en render. En
+respuestas en streaming (exportaciones) se mide hasta que la vista
+retorna: el cuerpo se genera después y su tamaño no se registra.
+
+Los histogramas viven en memoria de cada proceso: con varios workers cada
+uno expone los suyos (Prometheus los distingue por instancia).
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Límites de los buckets (le) de cada métrica
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICAS = {
+    # nombre: (descripción, buckets)
+    'http_request_duration_seconds': ('Duración total de la petición', BUCKETS_SEGUNDOS),
+    'http_request_db_seconds': ('Tiempo en consultas SQL por petición', BUCKETS_SEGUNDOS),
+    'http_request_render_seconds': ('Tiempo renderizando la respuesta', BUCKETS_SEGUNDOS),
+    'http_request_queries': ('Consultas SQL por petición', BUCKETS_CONSULTAS),
+    'http_response_size_bytes': ('Tamaño del cuerpo de la respuesta', BUCKETS_BYTES),
+}
+
+_medicion = contextvars.ContextVar('instrumentacion_medicion', default=None)
+
+
+def esta_activa():
+    return getattr(settings, 'INSTRUMENTACION_ACTIVA', True)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'db', 'render', 'inicio_render')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.inicio_render = None
+
+    def terminar_render(self, response):
+        # Post-render callback: retornar None para no reemplazar la respuesta
+        if self.inicio_render is not None:
+            self.render += time.perf_counter() - self.inicio_render
+            self.inicio_render = None
+
+
+# ----------------------------------------------------------------------
+# Histogramas
+# ----------------------------------------------------------------------
+class Histograma:
+    __slots__ = ('limites', 'cuentas', 'suma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        # Una cuenta por bucket más la de +Inf
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        acumulado = 0
+        for limite, cuenta in zip(self.limites + (float('inf'),), self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+
+    def percentil(self, q):
+        """Límite superior del bucket donde cae el percentil q (estimación)"""
+        if not self.total:
+            return None
+        for limite, acumulado in self.acumulados():
+            if acumulado >= q * self.total:
+                return limite
+        return None
+
+
+class Registro:
+    """Histogramas por (vista, método), protegidos por un lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, vista, metodo, valores):
+        clave = (vista, metodo)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {
+                    nombre: Histograma(buckets) for nombre, (_, buckets) in METRICAS.items()
+                }
+            for nombre, valor in valores.items():
+                if valor is not None:
+                    serie[nombre].observar(valor)
+
+    def series(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+
+
+registro = Registro()
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formato_prometheus():
+    series = registro.series()
+    lineas = []
+    for nombre, (descripcion, _) in METRICAS.items():
+        lineas.append(f'# HELP {nombre} {descripcion}')
+        lineas.append(f'# TYPE {nombre} histogram')
+        for (vista, metodo), histogramas in series:
+            histograma = histogramas[nombre]
+            if not histograma.total:
+                continue
+            etiquetas = f'vista="{_etiqueta(vista)}",metodo="{_etiqueta(metodo)}"'
+            for limite, acumulado in histograma.acumulados():
+                lineas.append(f'{nombre}_bucket{{{etiquetas},le="{_numero(limite)}"}} {acumulado}')
+            lineas.append(f'{nombre}_sum{{{etiquetas}}} {_numero(histograma.suma)}')
+            lineas.append(f'{nombre}_count{{{etiquetas}}} {histograma.total}')
+    return '\n'.join(lineas) + '\n'
+
+
+def resumen():
+    """Reporte por endpoint: peticiones, promedios y p50/p95 (límite del bucket)"""
+    reporte = []
+    for (vista, metodo), histogramas in registro.series():
+        duracion = histogramas['http_request_duration_seconds']
+        if not duracion.total:
+            continue
+        consultas = histogramas['http_request_queries']
+        reporte.append({
+            'vista': vista,
+            'metodo': metodo,
+            'peticiones': duracion.total,
+            'duracion_promedio_ms': round(duracion.suma / duracion.total * 1000, 2),
+            'duracion_p50_ms': _a_ms(duracion.percentil(0.5)),
+            'duracion_p95_ms': _a_ms(duracion.percentil(0.95)),
+            'consultas_promedio': round(consultas.suma / consultas.total, 2) if consultas.total else None,
+            'consultas_p95': _limite(consultas.percentil(0.95)),
+            'db_promedio_ms': _promedio_ms(histogramas['http_request_db_seconds']),
+            'render_promedio_ms': _promedio_ms(histogramas['http_request_render_seconds']),
+            'bytes_promedio': _promedio(histogramas['http_response_size_bytes']),
+        })
+    return sorted(reporte, key=lambda fila: fila['duracion_promedio_ms'] * fila['peticiones'], reverse=True)
+
+
+def _limite(valor):
+    # Por encima del último bucket sólo se sabe que supera su límite
+    return '+Inf' if valor == float('inf') else valor
+
+
+def _a_ms(segundos):
+    if segundos is None or segundos == float('inf'):
+        return _limite(segundos)
+    return round(segundos * 1000, 2)
+
+
+def _promedio(histograma):
+    return round(histograma.suma / histograma.total, 2) if histograma.total else None
+
+
+def _promedio_ms(histograma):
+    return round(histograma.suma / histograma.total * 1000, 2) if histograma.total else None
+
+
+# ----------------------------------------------------------------------
+# Medición
+# ----------------------------------------------------------------------
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.db += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+def _tamano(response):
+    if getattr(response, 'streaming', False):
+        return None
+    return len(response.content)
+
+
+class InstrumentacionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if not esta_activa():
+            return self.get_response(request)
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for conexion in connections.all():
+                    stack.enter_context(conexion.execute_wrapper(_medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        total = time.perf_counter() - inicio
+
+        tamano = _tamano(response)
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={medicion.db * 1000:.1f};desc="{medicion.consultas} consultas", '
+                f'render;dur={medicion.render * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        vista = (resolver_match.view_name if resolver_match else None) or 'sin_ruta'
+        registro.observar(vista, request.method, {
+            'http_request_duration_seconds': total,
+            'http_request_db_seconds': medicion.db,
+            'http_request_render_seconds': medicion.render,
+            'http_request_queries': medicion.consultas,
+            'http_response_size_bytes': tamano,
+        })
+        return response
+
+    def process_template_response(self, request, response):
+        # Es el último process_template_response (el middleware va primero):
+        # lo siguiente que ocurre es response.render()
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.inicio_render = time.perf_counter()
+            response.add_post_render_callback(medicion.terminar_render)
+        return response
+
+
+class MetricasAPIView(APIView):
+    """
+    Métricas por endpoint de esta instancia.
+
+    GET /api/metricas/               formato de texto de Prometheus
+    GET /api/metricas/?formato=json  resumen por endpoint (más lentos primero)
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get('formato') == 'json':
+            return Response({'success': True, 'endpoints': resumen()})
+        return HttpResponse(formato_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,53 @@
+"""
+Formato y filtros de logging (se configuran en settings.LOGGING).
+
+FormatoJSON escribe un objeto JSON por línea con la fecha, el nivel, el
+logger, el mensaje y los campos pasados en `extra=` (además del traceback
+si lo hay), listo para un agregador de logs. LOG_FORMATO=texto usa un
+formato legible para desarrollo.
+
+FiltroMuestreo deja pasar sólo una fracción (LOG_MUESTREO) de los registros
+DEBUG/INFO; WARNING o más siempre pasan. Los registros por debajo del nivel
+del logger ni siquiera se crean, y los mensajes costosos de armar se
+protegen con `logger.isEnabledFor(logging.DEBUG)`, así que con DEBUG
+desactivado no cuestan nada.
+"""
+import json
+import logging
+import random
+from datetime import datetime, timezone
+
+# Atributos propios de LogRecord: el resto son los campos de `extra=`
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'fecha': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'modulo': f'{record.module}:{record.lineno}',
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            datos['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """Dejar pasar una fracción `tasa` (0-1) de los registros por debajo de WARNING"""
+
+    def __init__(self, tasa=1.0):
+        super().__init__()
+        self.tasa = float(tasa)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.tasa >= 1:
+            return True
+        return random.random() < self.tasa
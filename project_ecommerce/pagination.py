@@ -0,0 +1,158 @@
+"""
+Paginación por cursor (keyset) compartida por los endpoints de listado.
+
+Cada vista declara un `ordering` estable cuyo último campo es único
+(ej. ('-fecha_creacion', 'id')). El cursor codifica los valores de la
+última fila entregada, de modo que la página siguiente se obtiene con un
+WHERE sobre esas columnas en lugar de un OFFSET: el costo de cualquier
+página es O(tamaño de página) sin importar qué tan profunda sea.
+"""
+import base64
+import datetime
+import decimal
+import json
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginador keyset que conserva el envelope `success`/`count` de la API.
+
+    Parámetros de consulta:
+    - cursor: cursor opaco devuelto en `next`
+    - page_size: tamaño de página (máximo `max_page_size`)
+    - count: 'estimado' (por defecto), 'exacto' o 'ninguno'
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    page_size = 50
+    max_page_size = 500
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        self.page_size = self.get_page_size(request)
+        self.count_mode = request.query_params.get(self.count_query_param, 'estimado')
+        self.queryset = queryset.order_by(*self.ordering)
+
+        posicion = self.decode_cursor(request)
+        pagina = self.queryset
+        if posicion is not None:
+            pagina = pagina.filter(self._filtro_desde(posicion))
+
+        # Se pide una fila extra para saber si existe página siguiente
+        resultados = list(pagina[:self.page_size + 1])
+        self.has_next = len(resultados) > self.page_size
+        self.page = resultados[:self.page_size]
+        self.is_first_page = posicion is None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_count(self):
+        """Devuelve (count, es_exacto) según el modo solicitado"""
+        if self.count_mode == 'ninguno':
+            return None, False
+        if self.count_mode == 'exacto':
+            return self.queryset.count(), True
+        if self.is_first_page and not self.has_next:
+            return len(self.page), True
+        return estimar_count(self.queryset)
+
+    def get_envelope(self, key, data):
+        """Construir la respuesta con el formato habitual de la API"""
+        count, exacto = self.get_count()
+        return {
+            'success': True,
+            'count': count,
+            'count_exacto': exacto,
+            'page_size': self.page_size,
+            'next': self.get_next_link(),
+            key: data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(self.get_envelope('results', data))
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+    def _campos(self):
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in self.ordering]
+
+    def _filtro_desde(self, posicion):
+        """
+        Filtro "fila > posición" para el orden compuesto:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        filtro = Q()
+        iguales = Q()
+        for (campo, descendente), valor in zip(self._campos(), posicion):
+            lookup = 'lt' if descendente else 'gt'
+            filtro |= iguales & Q(**{f'{campo}__{lookup}': valor})
+            iguales &= Q(**{campo: valor})
+        return filtro
+
+    def encode_cursor(self, instancia):
+        valores = [_a_json(getattr(instancia, campo)) for campo, _ in self._campos()]
+        crudo = json.dumps(valores, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(crudo).decode('ascii')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound('Cursor inválido')
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise NotFound('Cursor inválido')
+        return valores
+
+
+def _a_json(valor):
+    """Convertir el valor de una columna de orden a algo serializable"""
+    if isinstance(valor, (datetime.date, datetime.datetime, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    return valor
+
+
+def estimar_count(queryset):
+    """
+    Estimar el número de filas usando el planificador de PostgreSQL
+    (EXPLAIN), que no recorre la tabla. En otros motores se usa count().
+    Devuelve (count, es_exacto).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), True
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), False
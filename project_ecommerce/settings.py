@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -48,23 +49,28 @@ INSTALLED_APPS = [
     'app_productos',
     'app_carrito',
     'app_pedidos',
+    'app_benchmark',
     'storages',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication con caché token -> (usuario, cliente) (ver app_user/authentication.py)
+        'app_user.authentication.CachedTokenAuthentication',
         # ... otros métodos si los usas
     ]
 }
 
 MIDDLEWARE = [
+    # Primero, para medir toda la petición (ver project_ecommerce/instrumentation.py)
+    'project_ecommerce.instrumentation.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # ⬅️ Debe ir ANTES de CommonMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app_Cliente.middleware.ClienteMiddleware',  # request.cliente_actual (ver app_Cliente/middleware.py)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -128,6 +134,58 @@ DATABASES = {
 }
 
 
+# Los índices cubrientes (Index(include=...)) de Pedido e item_pedido son
+# para PostgreSQL. Los motores sin INCLUDE (SQLite en tests y desarrollo)
+# crean el índice solo con las columnas clave y avisan con models.W040
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# El catálogo público y los tokens usan su propio alias: memoria local en
+# desarrollo/tests, Redis (o compatible) en producción definiendo
+# CATALOGO_CACHE_URL / AUTH_TOKEN_CACHE_URL en el .env
+
+CATALOGO_CACHE_URL = config('CATALOGO_CACHE_URL', default='')
+AUTH_TOKEN_CACHE_URL = config('AUTH_TOKEN_CACHE_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CATALOGO_CACHE_URL,
+    } if CATALOGO_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogo',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': AUTH_TOKEN_CACHE_URL,
+    } if AUTH_TOKEN_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+CATALOGO_CACHE_ALIAS = 'catalogo'
+CATALOGO_CACHE_TIMEOUT = config('CATALOGO_CACHE_TIMEOUT', default=300, cast=int)
+
+# Caché de autenticación por token. Requiere un caché compartido
+# (AUTH_TOKEN_CACHE_URL): con memoria local un logout o una desactivación solo
+# llegaría al worker que la atendió. Sin él solo se usa con DEBUG (un proceso);
+# en producción se autentica sin caché.
+AUTH_TOKEN_CACHE_ACTIVA = bool(AUTH_TOKEN_CACHE_URL) or DEBUG
+AUTH_TOKEN_CACHE_ALIAS = 'tokens'
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+
+# Reservas de stock del carrito: minutos que se mantienen apartadas las unidades
+# (el comando `expirar_reservas` devuelve al inventario las vencidas)
+RESERVA_STOCK_MINUTOS = config('RESERVA_STOCK_MINUTOS', default=15, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -209,3 +267,89 @@ STORAGES = {
     },
 }
 
+
+# ============================================================
+# SUBIDA ASÍNCRONA DE IMÁGENES
+# ============================================================
+# Las imágenes se guardan primero en disco local y un pool de hilos las
+# sube a S3 (ver app_productos/subidas.py). Las fallidas las reintenta el
+# comando procesar_subidas tras SUBIDAS_REINTENTO_SEGUNDOS * 2^(intento-1).
+# En pruebas se puede usar FileSystemStorage como "default" y
+# SUBIDAS_ASINCRONAS=False.
+SUBIDAS_TEMP_DIR = config('SUBIDAS_TEMP_DIR', default=str(BASE_DIR / 'tmp_subidas'))
+SUBIDAS_ASINCRONAS = config('SUBIDAS_ASINCRONAS', default=True, cast=bool)
+SUBIDAS_WORKERS = config('SUBIDAS_WORKERS', default=2, cast=int)
+SUBIDAS_MAX_INTENTOS = config('SUBIDAS_MAX_INTENTOS', default=3, cast=int)
+SUBIDAS_REINTENTO_SEGUNDOS = config('SUBIDAS_REINTENTO_SEGUNDOS', default=30, cast=int)
+
+# Derivados responsivos de cada imagen (ver app_productos/derivados.py)
+IMAGENES_ANCHOS = (160, 320, 640, 1024)
+IMAGENES_FORMATOS = ('jpeg', 'webp', 'avif')
+
+# Rangos de precio de la faceta "precio": [desde, hasta), None = sin tope
+FACETAS_BANDAS_PRECIO = ((0, 50), (50, 100), (100, 200), (200, None))
+
+# Analítica de ventas (ver app_pedidos/analitica.py): TTL en segundos de los
+# rangos ya cerrados y de los que incluyen el día de hoy
+ANALITICA_CACHE_ALIAS = 'default'
+ANALITICA_TTL_HISTORICO = config('ANALITICA_TTL_HISTORICO', default=60 * 60 * 24, cast=int)
+ANALITICA_TTL_RECIENTE = config('ANALITICA_TTL_RECIENTE', default=60, cast=int)
+
+# Importación masiva de catálogo (ver app_productos/importacion.py). Con
+# IMPORTACION_ASINCRONA=False la importación encolada desde la API se ejecuta
+# al confirmar la petición en lugar de esperar a `procesar_importaciones`
+IMPORTACION_ASINCRONA = config('IMPORTACION_ASINCRONA', default=True, cast=bool)
+IMPORTACION_TAMANO_LOTE = config('IMPORTACION_TAMANO_LOTE', default=1000, cast=int)
+IMPORTACION_MAX_ERRORES = 1000
+
+# Exportaciones en streaming (ver project_ecommerce/exportacion.py): filas por viaje al servidor
+EXPORTACION_CHUNK_SIZE = config('EXPORTACION_CHUNK_SIZE', default=2000, cast=int)
+
+# Alertas de stock (ver app_productos/alertas.py): cada apertura/resolución se
+# envía al webhook y/o se agrega a una lista de Redis (vacío = desactivado)
+ALERTAS_STOCK_WEBHOOK_URL = config('ALERTAS_STOCK_WEBHOOK_URL', default='')
+ALERTAS_STOCK_WEBHOOK_TIMEOUT = config('ALERTAS_STOCK_WEBHOOK_TIMEOUT', default=5, cast=int)
+ALERTAS_STOCK_COLA_URL = config('ALERTAS_STOCK_COLA_URL', default='')
+ALERTAS_STOCK_COLA_CLAVE = config('ALERTAS_STOCK_COLA_CLAVE', default='alertas_stock')
+ALERTAS_STOCK_ASINCRONAS = config('ALERTAS_STOCK_ASINCRONAS', default=True, cast=bool)
+
+# Instrumentación de peticiones (ver project_ecommerce/instrumentation.py):
+# Server-Timing en cada respuesta e histogramas por endpoint en /api/metricas/
+INSTRUMENTACION_ACTIVA = config('INSTRUMENTACION_ACTIVA', default=True, cast=bool)
+INSTRUMENTACION_SERVER_TIMING = config('INSTRUMENTACION_SERVER_TIMING', default=True, cast=bool)
+
+# Logging estructurado (ver project_ecommerce/logs.py): JSON por línea en
+# stdout (LOG_FORMATO=texto para desarrollo), nivel por defecto de las apps
+# LOG_NIVEL y muestreo LOG_MUESTREO (0-1) de los registros DEBUG/INFO
+LOG_FORMATO = config('LOG_FORMATO', default='json')
+LOG_NIVEL = config('LOG_NIVEL', default='INFO')
+LOG_MUESTREO = config('LOG_MUESTREO', default=1.0, cast=float)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'project_ecommerce.logs.FormatoJSON'},
+        'texto': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'filters': {
+        'muestreo': {'()': 'project_ecommerce.logs.FiltroMuestreo', 'tasa': LOG_MUESTREO},
+    },
+    'handlers': {
+        'consola': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json' if LOG_FORMATO == 'json' else 'texto',
+            'filters': ['muestreo'],
+        },
+    },
+    'root': {'handlers': ['consola'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+        **{
+            app: {'handlers': ['consola'], 'level': config(f'LOG_NIVEL_{app.upper()}', default=LOG_NIVEL),
+                  'propagate': False}
+            for app in ('app_user', 'app_Cliente', 'app_compras', 'app_productos',
+                        'app_carrito', 'app_pedidos', 'app_benchmark', 'project_ecommerce')
+        },
+    },
+}
@@ -0,0 +1,195 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+from app_pedidos.models import Pedido
+from app_productos.models import Categoria, Producto, Producto_Variantes, item_pedido
+
+from . import exportacion, instrumentation, logs
+
+
+class InstrumentacionTest(TestCase):
+    def setUp(self):
+        instrumentation.registro.reiniciar()
+
+    def test_server_timing(self):
+        response = self.client.get('/api/productos/productos/')
+        self.assertEqual(response.status_code, 200)
+        metricas = dict(
+            parte.strip().split(';', 1)[0:2] for parte in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(metricas), {'db', 'render', 'total'})
+        self.assertRegex(metricas['db'], r'^dur=[\d.]+;desc="\d+ consultas"$')
+
+    def test_no_modifica_drf(self):
+        self.client.get('/api/productos/productos/')
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+
+    def test_histogramas_por_vista(self):
+        self.client.get('/api/productos/productos/')
+        self.client.get('/api/productos/productos/')
+
+        series = dict(instrumentation.registro.series())
+        duracion = series[('producto-list', 'GET')]['http_request_duration_seconds']
+        self.assertEqual(duracion.total, 2)
+        texto = instrumentation.formato_prometheus()
+        self.assertIn('http_request_queries_count{vista="producto-list",metodo="GET"} 2', texto)
+        self.assertIn('http_request_render_seconds_bucket{vista="producto-list",metodo="GET",le="+Inf"} 2', texto)
+
+    def test_percentil_del_histograma(self):
+        histograma = instrumentation.Histograma((1, 5, 10))
+        for valor in (0, 1, 2, 3, 20):
+            histograma.observar(valor)
+        self.assertEqual(histograma.percentil(0.4), 1)
+        self.assertEqual(histograma.percentil(0.8), 5)
+        self.assertEqual(histograma.percentil(1), float('inf'))
+
+    def test_metricas_solo_administradores(self):
+        client = APIClient()
+        self.assertIn(client.get('/api/metricas/').status_code, (401, 403))
+        client.force_authenticate(User.objects.create_user('cliente'))
+        self.assertEqual(client.get('/api/metricas/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        response = client.get('/api/metricas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        response = client.get('/api/metricas/', {'formato': 'json'})
+        self.assertEqual(response.data['endpoints'][0]['vista'], 'metricas')
+
+
+class ExportacionTest(TestCase):
+    def setUp(self):
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        categoria = Categoria.objects.create(nombre='Ropa', descripcion='Ropa')
+        producto = Producto.objects.create(nombre='Remera, básica', descripcion='', Categoria=categoria)
+        self.variante = Producto_Variantes.objects.create(producto=producto, color='rojo', talla='M',
+                                                          precio_unitario=10)
+        self.viejo = Pedido.objects.create(numero_pedido='P-1', estado='pagado', monto_total=Decimal('10.50'))
+        self.viejo.fecha_pedido = timezone.now().date() - timedelta(days=10)
+        self.viejo.save()
+        self.nuevo = Pedido.objects.create(numero_pedido='P-2', estado='pendiente', monto_total=Decimal('20'))
+        item_pedido.objects.create(pedido=self.nuevo, Producto_variante=self.variante, cantidad=2,
+                                   precio_unitario=10, subtotal=20)
+
+    def contenido(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.admin.get('/api/pedidos/pedidos/exportar/')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="pedidos_', response['Content-Disposition'])
+        filas = list(csv.DictReader(io.StringIO(self.contenido(response).decode())))
+        self.assertEqual([(f['numero_pedido'], f['monto_total']) for f in filas], [('P-1', '10.50'), ('P-2', '20.00')])
+
+    def test_ndjson_con_columnas_relacionadas(self):
+        response = self.admin.get('/api/productos/items-pedido/exportar/', {'formato': 'ndjson'})
+
+        filas = [json.loads(linea) for linea in self.contenido(response).decode().splitlines()]
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(
+            (filas[0]['numero_pedido'], filas[0]['producto'], filas[0]['cantidad'], filas[0]['subtotal']),
+            ('P-2', 'Remera, básica', 2, '20.00')
+        )
+
+    def test_gzip_y_rango_de_fechas(self):
+        hoy = timezone.now().date().isoformat()
+        response = self.admin.get('/api/pedidos/pedidos/exportar/', {'gzip': '1', 'fecha_desde': hoy})
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        filas = list(csv.DictReader(io.StringIO(gzip.decompress(self.contenido(response)).decode())))
+        self.assertEqual([f['numero_pedido'] for f in filas], ['P-2'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.admin.get('/api/pedidos/pedidos/exportar/', {'formato': 'xml'}).status_code, 400)
+        self.assertEqual(
+            self.admin.get('/api/pedidos/pedidos/exportar/', {'fecha_desde': '18/10/2026'}).status_code, 400
+        )
+
+    def test_solo_administradores(self):
+        client = APIClient()
+        for url in ('/api/pedidos/pedidos/exportar/', '/api/productos/items-pedido/exportar/',
+                    '/api/productos/items-compras/exportar/'):
+            self.assertIn(client.get(url).status_code, (401, 403))
+        client.force_authenticate(User.objects.create_user('cliente'))
+        self.assertEqual(client.get('/api/productos/items-pedido/exportar/').status_code, 403)
+
+    def test_comando_con_gzip(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        salida = os.path.join(directorio, 'pedidos.ndjson.gz')
+
+        call_command('exportar_datos', 'pedidos', '--formato', 'ndjson', '--gzip', '--salida', salida,
+                     stderr=io.StringIO())
+
+        with gzip.open(salida, 'rt') as archivo:
+            self.assertEqual([json.loads(linea)['numero_pedido'] for linea in archivo], ['P-1', 'P-2'])
+
+    def test_bloques_de_la_respuesta(self):
+        encabezados = [encabezado for encabezado, _ in exportacion.EXPORTACIONES['pedidos']['columnas']]
+        bloques = list(exportacion._agrupar(exportacion.lineas_csv(encabezados, [[1] * len(encabezados)] * 5000)))
+        self.assertGreater(len(bloques), 1)
+        self.assertTrue(all(bloque.endswith('\r\n') for bloque in bloques))
+
+
+class LogsTest(SimpleTestCase):
+    def registro(self, nivel=logging.INFO, mensaje='Pedido %s creado', args=(7,), **extra):
+        registro = logging.LogRecord('app_pedidos.api', nivel, __file__, 10, mensaje, args, None)
+        registro.__dict__.update(extra)
+        return registro
+
+    def test_formato_json_con_extra(self):
+        datos = json.loads(logs.FormatoJSON().format(self.registro(pedido_id=7, monto=Decimal('10.50'))))
+
+        self.assertEqual(
+            {clave: datos[clave] for clave in ('nivel', 'logger', 'mensaje', 'pedido_id', 'monto')},
+            {'nivel': 'INFO', 'logger': 'app_pedidos.api', 'mensaje': 'Pedido 7 creado', 'pedido_id': 7,
+             'monto': '10.50'}
+        )
+        self.assertTrue(datos['fecha'].endswith('+00:00'))
+        self.assertNotIn('args', datos)
+        self.assertNotIn('excepcion', datos)
+
+    def test_formato_json_con_excepcion(self):
+        try:
+            raise ValueError('sin stock')
+        except ValueError:
+            registro = logging.LogRecord('app_pedidos.api', logging.ERROR, __file__, 10, 'Error', (),
+                                         sys.exc_info())
+        datos = json.loads(logs.FormatoJSON().format(registro))
+        self.assertIn('ValueError: sin stock', datos['excepcion'])
+
+    def test_muestreo_solo_debajo_de_warning(self):
+        filtro = logs.FiltroMuestreo(tasa=0.25)
+        with mock.patch('project_ecommerce.logs.random.random', return_value=0.5):
+            self.assertFalse(filtro.filter(self.registro(logging.INFO)))
+            self.assertFalse(filtro.filter(self.registro(logging.DEBUG)))
+            self.assertTrue(filtro.filter(self.registro(logging.WARNING)))
+            self.assertTrue(filtro.filter(self.registro(logging.ERROR)))
+        with mock.patch('project_ecommerce.logs.random.random', return_value=0.1):
+            self.assertTrue(filtro.filter(self.registro(logging.INFO)))
+
+    def test_muestreo_completo_deja_pasar_todo(self):
+        filtro = logs.FiltroMuestreo()
+        with mock.patch('project_ecommerce.logs.random.random') as aleatorio:
+            self.assertTrue(filtro.filter(self.registro(logging.DEBUG)))
+        aleatorio.assert_not_called()
@@ -1,6 +1,7 @@
 
 from django.contrib import admin
 from django.urls import path , include
+from .instrumentation import MetricasAPIView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,4 +11,5 @@ urlpatterns = [
     path('api/compras/', include('app_compras.urls')),
     path('api/pedidos/', include('app_pedidos.urls')),
     path('api/productos/', include('app_productos.urls')),
+    path('api/metricas/', MetricasAPIView.as_view(), name='metricas'),
 ]